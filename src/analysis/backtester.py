@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Backtester - Reproducción vectorizada de los generadores de señales
+Aplica las reglas exactas de QuotexDual, QuotexHistoricalAnalyzer y
+QuotexAnalyzer sobre un archivo de velas y reporta win rate, EV y drawdown
+"""
+
+import sys
+import os
+import json
+import time
+import logging
+import sqlite3
+from collections import deque
+import numpy as np
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.analysis.patternMatcher import decode_pattern
+from src.analysis.patternMiner import DEFAULT_DB_PATH
+from src.analysis.patternTable import SIGNAL_HORIZON
+from src.data.candleArchive import CandleArchive
+
+NO_SIGNAL = -1
+
+# Clave temporal usada para evaluar las reglas de cada generador sobre historiales sintéticos
+SCRATCH_ASSET = "__backtest__"
+
+
+def rolling_window_sum(values, window):
+    """Suma de las últimas `window` posiciones a lo largo del eje del tiempo"""
+    cumulative = np.cumsum(values, axis=1, dtype=np.int32)
+    result = cumulative.copy()
+    result[:, window:] -= cumulative[:, :-window]
+    return result
+
+
+class SignalBacktester:
+    def __init__(self, payout=0.8, stake=1.0):
+        self.payout = payout
+        self.stake = stake
+
+        self.assets = []
+        self.timestamps = None
+        self.valid = None        # Vela presente en la posición
+        self.directions = None   # 1 = UP (close > open), 0 = DOWN
+        self.candle_sign = None  # +1 UP, -1 DOWN, 0 empate (para resultado de la opción)
+        self.close_rise = None   # close[t] > close[t-1] (tendencia de precios de QuotexAnalyzer)
+        self.runs = None         # Velas consecutivas disponibles terminando en t
+
+    def prepare(self, assets, opens, closes, timestamps=None):
+        """Preparar matrices alineadas [activos x tiempo] (NaN = vela faltante)"""
+        opens = np.atleast_2d(np.asarray(opens, dtype=np.float64))
+        closes = np.atleast_2d(np.asarray(closes, dtype=np.float64))
+
+        self._allocate(assets, opens.shape[1], timestamps)
+        for row in range(len(self.assets)):
+            self._fill_row(row, np.arange(opens.shape[1]), opens[row], closes[row])
+
+        self._finish()
+        return self
+
+    def prepare_columns(self, candle_source):
+        """Preparar desde (asset, timestamps, opens, closes) por activo, alineando a una grilla común"""
+        columns = list(candle_source)
+        if not columns:
+            raise ValueError("No hay velas para el backtest")
+
+        grid = np.unique(np.concatenate([column[1] for column in columns]))
+        self._allocate([column[0] for column in columns], len(grid), grid)
+
+        for row, (asset, timestamps, opens, closes) in enumerate(columns):
+            self._fill_row(row, np.searchsorted(grid, timestamps), opens, closes)
+
+        self._finish()
+        return self
+
+    def _allocate(self, assets, length, timestamps):
+        """Reservar matrices compactas (int8/bool) para años de velas de 1 minuto"""
+        shape = (len(assets), length)
+        self.assets = list(assets)
+        self.timestamps = timestamps if timestamps is not None else np.arange(length)
+        self.valid = np.zeros(shape, dtype=bool)
+        self.directions = np.zeros(shape, dtype=np.int8)
+        self.candle_sign = np.zeros(shape, dtype=np.int8)
+        self.close_rise = np.zeros(shape, dtype=np.int8)
+
+    def _fill_row(self, row, positions, opens, closes):
+        """Convertir OHLC de un activo a direcciones sin guardar los precios"""
+        opens = np.asarray(opens, dtype=np.float64)
+        closes = np.asarray(closes, dtype=np.float64)
+        present = ~(np.isnan(opens) | np.isnan(closes))
+        positions, opens, closes = positions[present], opens[present], closes[present]
+
+        self.valid[row, positions] = True
+        self.directions[row, positions] = closes > opens
+        self.candle_sign[row, positions] = np.sign(closes - opens)
+        rises = np.zeros(len(closes), dtype=np.int8)
+        rises[1:] = closes[1:] > closes[:-1]
+        self.close_rise[row, positions] = rises
+
+    def _finish(self):
+        """Calcular rachas de velas consecutivas por activo"""
+        index = np.arange(self.valid.shape[1], dtype=np.int32)
+        last_gap = np.maximum.accumulate(np.where(self.valid, -1, index), axis=1)
+        self.runs = np.where(self.valid, index - last_gap, 0).astype(np.int32)
+
+    def rolling_codes(self, length):
+        """Código de bits de las últimas `length` velas (la más reciente es el bit 0)"""
+        codes = np.zeros(self.directions.shape, dtype=np.int32)
+        for shift in range(length):
+            codes[:, shift:] |= self.directions[:, :codes.shape[1] - shift].astype(np.int32) << shift
+        return codes
+
+    def dual_predictions(self, dual):
+        """Reglas de QuotexDual.generate_signal: patrones 3/4/5/7 + boost de tendencia + umbral"""
+        matcher = dual.pattern_matcher
+        length = matcher.max_length
+
+        available = np.minimum(self.runs, length)
+        lookup = (available << length) | (self.rolling_codes(length) & ((1 << length) - 1))
+        probability = np.zeros(lookup.shape, dtype=np.float64)
+        prediction = np.full(lookup.shape, NO_SIGNAL, dtype=np.int8)
+
+        # Cada activo se resuelve con su tabla (la propia si el minero la generó)
+        for row, asset in enumerate(self.assets):
+            table = matcher.table_for(asset)
+            probabilities = np.zeros(len(table), dtype=np.float64)
+            directions = np.full(len(table), NO_SIGNAL, dtype=np.int8)
+            for index, entry in enumerate(table):
+                if entry:
+                    probabilities[index] = entry[0]
+                    directions[index] = 1 if entry[1] == "UP" else 0
+
+            probability[row] = probabilities[lookup[row]]
+            prediction[row] = directions[lookup[row]]
+
+        # Boost de tendencia con las últimas 10 velas (la propia regla del generador por cada conteo)
+        trend_lut = np.zeros(11, dtype=np.float64)
+        for up_count in range(11):
+            matcher.reset(SCRATCH_ASSET, ["DOWN"] * (10 - up_count) + ["UP"] * up_count)
+            trend_lut[up_count] = dual.analyze_trend_strength(SCRATCH_ASSET)
+        matcher.states.pop(SCRATCH_ASSET, None)
+
+        up_counts = rolling_window_sum(self.directions, 10)
+        trend_boost = np.where(self.runs >= 10, trend_lut[np.clip(up_counts, 0, 10)], 0)
+        probability = np.minimum(probability + trend_boost, dual.max_probability)
+
+        # El boost de correlación se aplica después del umbral: no cambia la decisión
+        return np.where((prediction != NO_SIGNAL) & (probability >= dual.signal_threshold), prediction, NO_SIGNAL)
+
+    def historical_predictions(self, analyzer):
+        """Reglas de QuotexHistoricalAnalyzer.generate_signal: secuencia de 3 + correlaciones"""
+        # Tabla de cada activo evaluada con su propio historial (el del analizador se restaura después)
+        sequence_probability = np.zeros((len(self.assets), 8), dtype=np.float64)
+        sequence_direction = np.full((len(self.assets), 8), NO_SIGNAL, dtype=np.int8)
+        for row, asset in enumerate(self.assets):
+            saved_history = analyzer.candle_history.get(asset)
+            for code in range(8):
+                analyzer.candle_history[asset] = deque(decode_pattern(code, 3))
+                direction, probability = analyzer.analyze_sequence_pattern(asset)
+                if direction and probability >= analyzer.sequence_threshold:
+                    sequence_probability[row, code] = probability
+                    sequence_direction[row, code] = 1 if direction == "UP" else 0
+
+            if saved_history is None:
+                analyzer.candle_history.pop(asset, None)
+            else:
+                analyzer.candle_history[asset] = saved_history
+
+        codes = self.rolling_codes(3) & 7
+        row_index = np.arange(len(self.assets))[:, None]
+        probability = np.where(self.runs >= 3, sequence_probability[row_index, codes], 0)
+        prediction = np.where(self.runs >= 3, sequence_direction[row_index, codes], NO_SIGNAL).astype(np.int8)
+
+        # Correlaciones: promedio de |correlación| de los pares que apoyan la predicción
+        boost = np.zeros(prediction.shape, dtype=np.float64)
+        rows = {asset: row for row, asset in enumerate(self.assets)}
+        for row, asset in enumerate(self.assets):
+            support_sum = np.zeros(prediction.shape[1], dtype=np.float64)
+            support_count = np.zeros(prediction.shape[1], dtype=np.int32)
+            for other_asset, strength in analyzer.correlations.get(asset, {}).items():
+                other = rows.get(other_asset)
+                if other is None:
+                    continue
+                if strength > 0:
+                    supports = self.directions[other] == prediction[row]
+                else:
+                    supports = self.directions[other] != prediction[row]
+                supports &= self.valid[other]
+                support_sum += supports * abs(strength)
+                support_count += supports
+            boost[row] = np.divide(support_sum, support_count, out=np.zeros_like(support_sum), where=support_count > 0)
+
+        combined = np.minimum(probability + boost * analyzer.correlation_weight, analyzer.max_probability)
+        return np.where((prediction != NO_SIGNAL) & (combined >= analyzer.signal_threshold), prediction, NO_SIGNAL)
+
+    def analyzer_predictions(self, analyzer):
+        """Reglas de QuotexAnalyzer._generate_prediction: patrón de 3 + tendencia de 10 precios"""
+        base_confidence = np.zeros(8, dtype=np.float64)
+        pattern_direction = np.full(8, NO_SIGNAL, dtype=np.int8)
+        for code in range(8):
+            pattern = decode_pattern(code, 3)
+            if pattern in analyzer.patterns:
+                base_confidence[code] = analyzer.patterns[pattern]
+                pattern_direction[code] = 1 if analyzer._predict_direction(pattern, SCRATCH_ASSET) == "UP" else 0
+
+        # Boost por número de subidas entre los últimos 10 precios (9 comparaciones)
+        trend_lut = np.zeros(10, dtype=np.float64)
+        for rises in range(10):
+            prices = [100.0]
+            for step in range(9):
+                prices.append(prices[-1] + (1 if step < rises else -1))
+            analyzer.price_history[SCRATCH_ASSET] = deque(prices)
+            trend_lut[rises] = analyzer._analyze_trend(SCRATCH_ASSET)
+        analyzer.price_history.pop(SCRATCH_ASSET, None)
+
+        codes = self.rolling_codes(3) & 7
+        rises = rolling_window_sum(self.close_rise, 9)
+        trend_boost = np.where(self.runs >= 10, trend_lut[np.clip(rises, 0, 9)], 0)
+
+        confidence = np.minimum(base_confidence[codes] + trend_boost, analyzer.max_confidence)
+        prediction = np.where(self.runs >= 3, pattern_direction[codes], NO_SIGNAL)
+        min_confidence = analyzer.trading_config["min_confidence"] / 100
+        return np.where((prediction != NO_SIGNAL) & (confidence >= min_confidence), prediction, NO_SIGNAL)
+
+    def evaluate(self, predictions, horizon=SIGNAL_HORIZON):
+        """Resultado de cada señal en la vela que se opera (t + horizon): win rate, EV y drawdown"""
+        predictions = np.asarray(predictions)[:, :-horizon]
+        outcome = self.candle_sign[:, horizon:]
+        trades = (predictions != NO_SIGNAL) & self.valid[:, horizon:]
+
+        wins = trades & (((predictions == 1) & (outcome > 0)) | ((predictions == 0) & (outcome < 0)))
+        ties = trades & (outcome == 0)
+        losses = trades & ~wins & ~ties
+
+        pnl = wins * (self.payout * self.stake) - losses * self.stake
+        equity = np.cumsum(pnl.sum(axis=0))
+        drawdown = np.maximum.accumulate(np.maximum(equity, 0)) - equity
+
+        def summarize(trade_count, win_count, loss_count, tie_count, total_pnl):
+            decided = win_count + loss_count
+            return {
+                "trades": int(trade_count),
+                "wins": int(win_count),
+                "losses": int(loss_count),
+                "ties": int(tie_count),
+                "win_rate": round(float(win_count / decided), 4) if decided else 0,
+                "ev_per_trade": round(float(total_pnl / trade_count), 4) if trade_count else 0,
+                "pnl": round(float(total_pnl), 2)
+            }
+
+        report = summarize(trades.sum(), wins.sum(), losses.sum(), ties.sum(), pnl.sum())
+        report["payout"] = self.payout
+        report["breakeven_win_rate"] = round(1 / (1 + self.payout), 4)
+        report["max_drawdown"] = round(float(drawdown.max()) if len(drawdown) else 0, 2)
+        report["per_asset"] = {
+            asset: summarize(trades[row].sum(), wins[row].sum(), losses[row].sum(), ties[row].sum(), pnl[row].sum())
+            for row, asset in enumerate(self.assets)
+        }
+        return report
+
+    def run(self, generators):
+        """Ejecutar el backtest para {nombre: (función_de_predicción, generador)}"""
+        reports = {}
+        for name, (predict, generator) in generators.items():
+            start = time.perf_counter()
+            reports[name] = self.evaluate(predict(generator))
+            reports[name]["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+
+            report = reports[name]
+            logging.info(f"📊 {name}: {report['trades']:,} ops | win rate {report['win_rate']*100:.1f}% | "
+                         f"EV {report['ev_per_trade']:+.4f} | drawdown {report['max_drawdown']:.2f}")
+        return reports
+
+
+def load_sqlite_candles(db_path=DEFAULT_DB_PATH, assets=None):
+    """Cargar (asset, timestamps, opens, closes) por activo desde la base histórica"""
+    connection = sqlite3.connect(db_path)
+    try:
+        if not assets:
+            assets = [row[0] for row in connection.execute("SELECT DISTINCT asset FROM candles")]
+
+        for asset in assets:
+            cursor = connection.execute(
+                "SELECT timestamp, open, close FROM candles WHERE asset = ? ORDER BY timestamp",
+                (asset,)
+            )
+            rows = np.fromiter(cursor, dtype=[("timestamp", np.int64), ("open", np.float64), ("close", np.float64)])
+            if len(rows):
+                yield asset, rows["timestamp"], rows["open"], rows["close"]
+    finally:
+        connection.close()
+
+
+def load_archive_candles(archive_dir, assets=None):
+    """Cargar (asset, timestamps, opens, closes) por activo desde el archivo columnar de velas"""
+    archive = CandleArchive(archive_dir, readonly=True)
+    for asset in assets or archive.assets():
+        columns = archive.range(asset)
+        if len(columns["timestamp"]):
+            yield asset, columns["timestamp"], columns["open"], columns["close"]
+
+
+def main():
+    """Función principal: backtester.py [historical.db | carpeta de velas] [payout]"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH
+    payout = float(sys.argv[2]) if len(sys.argv) > 2 else 0.8
+
+    if not os.path.exists(db_path):
+        logging.error(f"❌ No se encontró la base histórica: {db_path}")
+        return
+
+    backtester = SignalBacktester(payout=payout)
+    source = load_archive_candles(db_path) if os.path.isdir(db_path) else load_sqlite_candles(db_path)
+    backtester.prepare_columns(source)
+    logging.info(f"🕯️ {len(backtester.assets)} activos x {len(backtester.timestamps):,} velas preparados")
+
+    # Cada generador se importa por separado: los que dependen de Selenium pueden no estar instalados
+    generators = {}
+    try:
+        from src.automation.quotexDual import QuotexDual
+        generators["QuotexDual"] = (backtester.dual_predictions, QuotexDual())
+    except ImportError as e:
+        logging.warning(f"⚠️ QuotexDual no disponible: {e}")
+
+    try:
+        from src.analysis.quotexHistoricalAnalyzer import QuotexHistoricalAnalyzer
+        generators["QuotexHistoricalAnalyzer"] = (backtester.historical_predictions, QuotexHistoricalAnalyzer())
+    except ImportError as e:
+        logging.warning(f"⚠️ QuotexHistoricalAnalyzer no disponible: {e}")
+
+    try:
+        from src.quotexAnalyzer import QuotexAnalyzer
+        generators["QuotexAnalyzer"] = (backtester.analyzer_predictions, QuotexAnalyzer())
+    except ImportError as e:
+        logging.warning(f"⚠️ QuotexAnalyzer no disponible: {e}")
+
+    reports = backtester.run(generators)
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
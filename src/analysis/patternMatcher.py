@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Pattern Matcher - Motor de patrones compilado
+Codifica UP/DOWN como bits en un entero por activo y resuelve
+todas las longitudes de patrón con una sola consulta de tabla
+"""
+
+# Codificación de direcciones (la vela más reciente es el bit menos significativo)
+DIRECTION_BITS = {"UP": 1, "DOWN": 0, "CALL": 1, "PUT": 0}
+
+
+def encode_pattern(pattern):
+    """Convertir una tupla de direcciones en su entero de bits"""
+    bits = 0
+    for direction in pattern:
+        bits = (bits << 1) | DIRECTION_BITS[direction]
+    return bits
+
+
+def decode_pattern(bits, length):
+    """Convertir un entero de bits en la tupla de direcciones original"""
+    return tuple("UP" if (bits >> shift) & 1 else "DOWN" for shift in range(length - 1, -1, -1))
+
+
+class CompiledPatternMatcher:
+    def __init__(self, pattern_tables, max_history=20):
+        """
+        pattern_tables: lista ordenada por prioridad de (analysis_type, patrones)
+        donde patrones es {(dir1, dir2, ...): (probabilidad, dirección)}
+        """
+        self.max_history = max_history
+        self.history_mask = (1 << max_history) - 1
+
+        # Estado por activo: [bits, velas_acumuladas]
+        self.states = {}
+
+        self.compile(pattern_tables)
+
+    def compile(self, pattern_tables):
+        """Precalcular la mejor coincidencia para cada estado posible"""
+        compiled = self._entries(pattern_tables)
+
+        self.max_length = max([entry[0] for entry in compiled], default=0)
+        if self.max_length > self.max_history:
+            raise ValueError(f"Patrón de {self.max_length} velas excede el historial de {self.max_history}")
+
+        self.pattern_mask = (1 << self.max_length) - 1
+        self.table = self._build_table(compiled)
+
+        # Tablas propias de activos concretos (misma longitud máxima que la general)
+        self.asset_tables = {}
+
+    def compile_asset(self, asset, pattern_tables):
+        """Tabla específica de un activo; el resto de activos siguen usando la general"""
+        compiled = self._entries(pattern_tables)
+        longest = max([entry[0] for entry in compiled], default=0)
+        if longest > self.max_length:
+            raise ValueError(f"Patrón de {longest} velas excede la longitud compilada de {self.max_length}")
+
+        self.asset_tables[asset] = self._build_table(compiled)
+
+    def table_for(self, asset):
+        """Tabla plana que resuelve las coincidencias del activo"""
+        return self.asset_tables.get(asset, self.table)
+
+    def _entries(self, pattern_tables):
+        compiled = []
+        for analysis_type, patterns in pattern_tables:
+            for pattern, (probability, direction) in patterns.items():
+                compiled.append((len(pattern), encode_pattern(pattern), probability, direction, tuple(pattern), analysis_type))
+        return compiled
+
+    def _build_table(self, compiled):
+        # Tabla plana indexada por (velas_disponibles << max_length) | bits_recientes.
+        # Se respeta el orden de prioridad: solo una probabilidad estrictamente
+        # mayor desplaza a la coincidencia anterior.
+        table = [None] * ((self.max_length + 1) << self.max_length)
+        for available in range(self.max_length + 1):
+            for state in range(1 << available):
+                best = None
+                for length, bits, probability, direction, pattern, analysis_type in compiled:
+                    if length > available or (state & ((1 << length) - 1)) != bits:
+                        continue
+                    if best is None or probability > best[0]:
+                        best = (probability, direction, pattern, analysis_type)
+                table[(available << self.max_length) | state] = best
+        return table
+
+    def reset(self, asset, directions=()):
+        """Reiniciar el estado de un activo (opcionalmente desde un historial)"""
+        self.states[asset] = [0, 0]
+        for direction in directions:
+            self.push(asset, direction)
+
+    def push(self, asset, direction):
+        """Agregar una vela cerrada al estado del activo - O(1)"""
+        state = self.states.get(asset)
+        if state is None:
+            state = self.states[asset] = [0, 0]
+
+        state[0] = ((state[0] << 1) | DIRECTION_BITS[direction]) & self.history_mask
+        if state[1] < self.max_history:
+            state[1] += 1
+
+    def match(self, asset):
+        """Mejor patrón para el estado actual: (probabilidad, dirección, patrón, tipo) o None"""
+        state = self.states.get(asset)
+        if state is None:
+            return None
+
+        available = state[1] if state[1] < self.max_length else self.max_length
+        return self.table_for(asset)[(available << self.max_length) | (state[0] & self.pattern_mask)]
+
+    def count(self, asset):
+        """Número de velas acumuladas para el activo"""
+        state = self.states.get(asset)
+        return state[1] if state else 0
+
+    def trend_counts(self, asset, window=10):
+        """Contar velas UP/DOWN en las últimas `window` velas sin recorrer el historial"""
+        state = self.states.get(asset)
+        if state is None or state[1] < window:
+            return None
+
+        up_count = bin(state[0] & ((1 << window) - 1)).count("1")
+        return up_count, window - up_count
+
+    def recent(self, asset, length):
+        """Últimas `length` velas del activo como tupla de direcciones"""
+        state = self.states.get(asset)
+        if state is None:
+            return ()
+
+        length = min(length, state[1])
+        return decode_pattern(state[0] & ((1 << length) - 1), length)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Pattern Miner - Minería offline de probabilidades de patrones
+Cuenta con NumPy vectorizado el resultado de la vela que se opera
+(SIGNAL_HORIZON velas después del patrón) para cada secuencia de
+direcciones de 3 a 12 velas, por activo y global
+"""
+
+import sys
+import os
+import json
+import time
+import logging
+import sqlite3
+from datetime import datetime
+import numpy as np
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.analysis.patternTable import ROOT_DIR, DEFAULT_TABLE_PATH, SIGNAL_HORIZON
+from src.data.candleArchive import CandleArchive
+
+DEFAULT_DB_PATH = os.path.join(ROOT_DIR, "data", "historical.db")
+
+MIN_LENGTH = 3
+MAX_LENGTH = 12
+
+
+def candle_directions(opens, closes):
+    """Dirección de cada vela como bit (UP=1, DOWN=0), igual que close > open en los analizadores"""
+    return (np.asarray(closes) > np.asarray(opens)).astype(np.int64)
+
+
+def contiguous_runs(timestamps, interval=None):
+    """Longitud de la racha de velas consecutivas (sin huecos) que termina en cada vela"""
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    n = len(timestamps)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    deltas = np.diff(timestamps)
+    if interval is None:
+        interval = int(np.median(deltas)) if len(deltas) else 0
+
+    index = np.arange(n, dtype=np.int64)
+    breaks = np.ones(n, dtype=bool)
+    breaks[1:] = deltas != interval
+    run_start = np.maximum.accumulate(np.where(breaks, index, 0))
+    return index - run_start + 1
+
+
+def rolling_codes(directions, max_length=MAX_LENGTH):
+    """Código de bits de las últimas `max_length` velas en cada posición (la más reciente es el bit 0)"""
+    n = len(directions)
+    codes = np.zeros(n, dtype=np.int64)
+    for shift in range(min(max_length, n)):
+        codes[shift:] |= directions[:n - shift] << shift
+    return codes
+
+
+def count_patterns(directions, runs, min_length=MIN_LENGTH, max_length=MAX_LENGTH, horizon=SIGNAL_HORIZON):
+    """
+    Contar resultados UP/DOWN de la vela `horizon` posiciones después de cada patrón
+    Devuelve {longitud: (up_counts, down_counts)} indexados por código de patrón
+    """
+    directions = np.asarray(directions, dtype=np.int64)
+    runs = np.asarray(runs, dtype=np.int64)
+
+    counts = {}
+    if len(directions) <= horizon:
+        for length in range(min_length, max_length + 1):
+            counts[length] = (np.zeros(1 << length, dtype=np.int64), np.zeros(1 << length, dtype=np.int64))
+        return counts
+
+    codes = rolling_codes(directions, max_length)[:-horizon]
+    outcomes = directions[horizon:]
+    window_runs = runs[:-horizon]
+    outcome_contiguous = runs[horizon:] > horizon
+
+    for length in range(min_length, max_length + 1):
+        valid = (window_runs >= length) & outcome_contiguous
+        keys = ((codes[valid] & ((1 << length) - 1)) << 1) | outcomes[valid]
+        tally = np.bincount(keys, minlength=2 << length).reshape(-1, 2)
+        counts[length] = (tally[:, 1], tally[:, 0])
+
+    return counts
+
+
+def mine_directions(timestamps, directions, interval=None, min_length=MIN_LENGTH, max_length=MAX_LENGTH):
+    """Minar patrones de un activo a partir de sus direcciones (bits) ordenadas por tiempo"""
+    runs = contiguous_runs(timestamps, interval)
+    return count_patterns(directions, runs, min_length, max_length)
+
+
+def mine_candles(timestamps, opens, closes, interval=None, min_length=MIN_LENGTH, max_length=MAX_LENGTH):
+    """Minar patrones de un activo a partir de sus columnas OHLC ordenadas por tiempo"""
+    return mine_directions(timestamps, candle_directions(opens, closes), interval, min_length, max_length)
+
+
+def load_sqlite_directions(db_path=DEFAULT_DB_PATH):
+    """Cargar (asset, timestamps, direcciones) por activo desde la base histórica (tabla candles)"""
+    connection = sqlite3.connect(db_path)
+    try:
+        assets = [row[0] for row in connection.execute("SELECT DISTINCT asset FROM candles")]
+
+        for asset in assets:
+            # La dirección se calcula en SQLite y las filas van directo a un array sin listas intermedias
+            cursor = connection.execute(
+                "SELECT timestamp, close > open FROM candles WHERE asset = ? ORDER BY timestamp",
+                (asset,)
+            )
+            rows = np.fromiter(cursor, dtype=[("timestamp", np.int64), ("direction", np.int64)])
+
+            if len(rows) == 0:
+                continue
+
+            yield asset, rows["timestamp"], rows["direction"]
+    finally:
+        connection.close()
+
+
+def load_archive_directions(archive_dir):
+    """Cargar (asset, timestamps, direcciones) por activo desde el archivo columnar de velas"""
+    archive = CandleArchive(archive_dir, readonly=True)
+    for asset in archive.assets():
+        columns = archive.range(asset)
+        if len(columns["timestamp"]) == 0:
+            continue
+
+        yield asset, columns["timestamp"], candle_directions(columns["open"], columns["close"])
+
+
+def mine_archive(direction_source, min_length=MIN_LENGTH, max_length=MAX_LENGTH):
+    """Minar todos los activos de una fuente (asset, timestamps, direcciones) y acumular el total"""
+    overall = {length: (np.zeros(1 << length, dtype=np.int64), np.zeros(1 << length, dtype=np.int64))
+               for length in range(min_length, max_length + 1)}
+    per_asset = {}
+    candle_counts = {}
+
+    for asset, timestamps, directions in direction_source:
+        counts = mine_directions(timestamps, directions, None, min_length, max_length)
+        per_asset[asset] = counts
+        candle_counts[asset] = len(timestamps)
+
+        for length, (up, down) in counts.items():
+            overall[length][0][:] += up
+            overall[length][1][:] += down
+
+        logging.info(f"⛏️ {asset}: {len(timestamps):,} velas minadas")
+
+    return overall, per_asset, candle_counts
+
+
+def build_table(overall, per_asset, candle_counts, source=None):
+    """Construir la tabla serializable (cuentas UP/DOWN por código de patrón)"""
+    def serialize(counts, candles):
+        return {
+            "candles": int(candles),
+            "lengths": {
+                str(length): {"up": up.tolist(), "down": down.tolist()}
+                for length, (up, down) in counts.items()
+            }
+        }
+
+    lengths = sorted(overall.keys())
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "source": source,
+        "min_length": lengths[0] if lengths else MIN_LENGTH,
+        "max_length": lengths[-1] if lengths else MAX_LENGTH,
+        "encoding": "bit 0 = vela más reciente, UP=1 DOWN=0",
+        "horizon": SIGNAL_HORIZON,
+        "overall": serialize(overall, sum(candle_counts.values())),
+        "assets": {asset: serialize(counts, candle_counts[asset]) for asset, counts in per_asset.items()}
+    }
+
+
+def save_table(table, output_path=DEFAULT_TABLE_PATH):
+    """Guardar la tabla de forma atómica (nunca queda un archivo a medio escribir)"""
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump(table, f)
+    os.replace(temp_path, output_path)
+
+
+def main():
+    """Función principal: patternMiner.py [historical.db | carpeta de velas] [pattern_table.json]"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
+
+    db_path = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_DB_PATH
+    output_path = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_TABLE_PATH
+
+    if not os.path.exists(db_path):
+        logging.error(f"❌ No se encontró la base histórica: {db_path}")
+        return
+
+    start = time.perf_counter()
+    logging.info(f"⛏️ Minando patrones {MIN_LENGTH}-{MAX_LENGTH} velas desde {db_path}...")
+
+    source = load_archive_directions(db_path) if os.path.isdir(db_path) else load_sqlite_directions(db_path)
+    overall, per_asset, candle_counts = mine_archive(source)
+    table = build_table(overall, per_asset, candle_counts, source=db_path)
+    save_table(table, output_path)
+
+    elapsed = time.perf_counter() - start
+    logging.info(f"✅ {sum(candle_counts.values()):,} velas de {len(per_asset)} activos en {elapsed:.2f}s")
+    logging.info(f"💾 Tabla guardada en {output_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Pattern Table - Tabla de probabilidades minada desde velas históricas
+Carga la tabla generada por patternMiner.py en el formato de los analizadores
+"""
+
+import os
+import json
+import logging
+
+from src.analysis.patternMatcher import decode_pattern
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_TABLE_PATH = os.path.join(ROOT_DIR, "data", "pattern_table.json")
+
+# Muestras mínimas para confiar en la probabilidad empírica de un patrón
+DEFAULT_MIN_SAMPLES = 200
+
+# Probabilidad mínima: por debajo el patrón es prácticamente una moneda al aire
+DEFAULT_MIN_PROBABILITY = 0.6
+
+# Velas entre la última vela del patrón y la que se opera: la señal sale al cerrar la vela t
+# y la orden entra al inicio del minuto siguiente, cuando la vela t+1 ya está en curso
+SIGNAL_HORIZON = 2
+
+# Sufijo del timeframe con el que el archivo de velas nombra cada activo (BRENT_otc_60)
+DEFAULT_TIMEFRAME = 60
+
+
+def _read_table(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        table = json.load(f)
+
+    # Tablas minadas con otro horizonte describen operaciones que el sistema no hace
+    horizon = table.get("horizon", 1)
+    if horizon != SIGNAL_HORIZON:
+        logging.warning(f"⚠️ Tabla de patrones {path} minada con horizonte {horizon} "
+                        f"(se opera t+{SIGNAL_HORIZON}) - se ignora hasta volver a minar")
+        return None
+    return table
+
+
+def _section_patterns(section, lengths, min_samples, min_probability):
+    """Sección de la tabla (overall o un activo) -> {longitud: {patrón: (probabilidad, dirección)}}"""
+    patterns_by_length = {}
+    for length_key, counts in section["lengths"].items():
+        length = int(length_key)
+        if lengths and length not in lengths:
+            continue
+
+        patterns = {}
+        for code, (up, down) in enumerate(zip(counts["up"], counts["down"])):
+            total = up + down
+            if total < min_samples or up == down:
+                continue
+
+            probability = max(up, down) / total
+            if probability < min_probability:
+                continue
+
+            direction = "UP" if up > down else "DOWN"
+            patterns[decode_pattern(code, length)] = (round(probability, 4), direction)
+
+        patterns_by_length[length] = patterns
+    return patterns_by_length
+
+
+def load_pattern_table(path=DEFAULT_TABLE_PATH, lengths=None, asset=None,
+                       min_samples=DEFAULT_MIN_SAMPLES, min_probability=DEFAULT_MIN_PROBABILITY):
+    """
+    Cargar la tabla minada como {longitud: {patrón: (probabilidad, dirección)}}
+    Usa las cuentas del activo si existen, si no las globales.
+    Devuelve {} si la tabla no existe (los analizadores mantienen sus constantes).
+    """
+    try:
+        table = _read_table(path)
+        if table is None:
+            return {}
+
+        section = table.get("assets", {}).get(asset) if asset else None
+        if not section:
+            section = table["overall"]
+
+        patterns_by_length = _section_patterns(section, lengths, min_samples, min_probability)
+        logging.info(f"📚 Tabla de patrones cargada: {path} ({asset or 'global'})")
+        return patterns_by_length
+
+    except Exception as e:
+        logging.error(f"❌ Error cargando tabla de patrones {path}: {e}")
+        return {}
+
+
+def load_asset_pattern_tables(assets, path=DEFAULT_TABLE_PATH, lengths=None,
+                              min_samples=DEFAULT_MIN_SAMPLES, min_probability=DEFAULT_MIN_PROBABILITY,
+                              timeframe=DEFAULT_TIMEFRAME):
+    """
+    Tablas propias de cada activo: {nombre: {longitud: {patrón: (probabilidad, dirección)}}}
+    assets es {nombre interno: ID del broker o None}; la sección se busca por el
+    nombre, el ID y el ID con timeframe (como nombra el archivo de velas).
+    Solo incluye los activos que tienen sección en la tabla.
+    """
+    try:
+        table = _read_table(path)
+        if table is None:
+            return {}
+
+        sections = table.get("assets", {})
+        tables = {}
+        for name, broker_id in assets.items():
+            keys = [name] + ([broker_id, f"{broker_id}_{timeframe}"] if broker_id else [])
+            section = next((sections[key] for key in keys if key in sections), None)
+            if section:
+                tables[name] = _section_patterns(section, lengths, min_samples, min_probability)
+
+        if tables:
+            logging.info(f"📚 Tablas de patrones por activo: {', '.join(tables)}")
+        return tables
+
+    except Exception as e:
+        logging.error(f"❌ Error cargando tablas por activo {path}: {e}")
+        return {}
+
+
+def merge_patterns(constants, mined):
+    """Constantes escritas a mano + patrones minados (lo minado prevalece en los patrones comunes)"""
+    merged = dict(constants)
+    merged.update(mined or {})
+    return merged
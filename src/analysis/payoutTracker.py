@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Payout Tracker - Tabla viva de payouts por activo y vencimiento
+Se actualiza de forma incremental (escaneo de página o mensajes del
+WebSocket), calcula el EV de cada activo con la tasa de acierto esperada y
+publica a los suscriptores la lista ordenada de activos que superan el
+umbral, solo cuando esa lista cambia
+"""
+
+import time
+import logging
+import threading
+
+from src.utils.timerScheduler import shared_scheduler
+
+# Vencimiento desconocido (la fuente no indica el timeframe)
+ANY_EXPIRY = None
+
+# Timeframes de la página -> segundos de vencimiento
+TIMEFRAME_EXPIRIES = {"1m": 60, "5m": 300, "15m": 900}
+
+
+def normalize_payout(value):
+    """92 o 0.92 -> 0.92 (fracción de ganancia sobre el monto)"""
+    value = float(value)
+    return value / 100 if value > 1 else value
+
+
+def expected_value(payout, win_rate):
+    """EV por unidad apostada de una opción binaria: gana payout con win_rate, pierde el monto si no"""
+    return win_rate * payout - (1 - win_rate)
+
+
+class PayoutTracker:
+    def __init__(self, win_rate=0.6, min_ev=0.0, expiry=60, max_age=300):
+        self.win_rate = win_rate
+        self.min_ev = min_ev
+        self.expiry = expiry
+        self.max_age = max_age
+
+        # activo -> {vencimiento: (payout, actualizado)}
+        self.table = {}
+        self.lock = threading.Lock()
+
+        self.subscribers = []
+        self.ranked = []
+        self.publish_lock = threading.Lock()
+        self.published_state = ([], frozenset())
+        self.updates = 0
+        self.changes = 0
+        self.publications = 0
+        self.refreshing = False
+        self.refresh_event = None
+
+    @property
+    def min_payout(self):
+        """Payout mínimo para que el EV supere el umbral con la tasa de acierto configurada"""
+        return (self.min_ev + 1 - self.win_rate) / self.win_rate
+
+    def observe(self, asset, payout, expiry=ANY_EXPIRY, timestamp=None):
+        """Registrar un payout; devuelve True si cambió (no publica)"""
+        payout = normalize_payout(payout)
+        timestamp = timestamp or time.time()
+
+        with self.lock:
+            self.updates += 1
+            expiries = self.table.setdefault(asset, {})
+            previous = expiries.get(expiry)
+            expiries[expiry] = (payout, timestamp)
+
+            changed = previous is None or previous[0] != payout
+            if changed:
+                self.changes += 1
+            return changed
+
+    def update(self, asset, payout, expiry=ANY_EXPIRY):
+        """Payout suelto (p. ej. un mensaje del WebSocket): registrar y publicar si cambió el ranking"""
+        if self.observe(asset, payout, expiry):
+            self.publish()
+
+    def update_rows(self, rows):
+        """Filas (activo, payout, timeframe) de un escaneo de página; una sola publicación por lote"""
+        changed = 0
+        now = time.time()
+        for asset, payout, timeframe in rows:
+            expiry = TIMEFRAME_EXPIRIES.get(timeframe, ANY_EXPIRY)
+            if self.observe(asset, payout, expiry, now):
+                changed += 1
+
+        # Aunque nada cambie, las entradas viejas pueden salir del ranking
+        self.publish()
+        return changed
+
+    def payout(self, asset, expiry=None):
+        """Payout vigente del activo para el vencimiento (o el de vencimiento desconocido)"""
+        expiry = self.expiry if expiry is None else expiry
+        with self.lock:
+            expiries = self.table.get(asset)
+            if not expiries:
+                return None
+
+            entry = expiries.get(expiry) or expiries.get(ANY_EXPIRY)
+            if entry is None or time.time() - entry[1] > self.max_age:
+                return None
+            return entry[0]
+
+    def known(self, asset):
+        """¿Hay un payout vigente del activo?"""
+        return self.payout(asset) is not None
+
+    def clears(self, asset):
+        payout = self.payout(asset)
+        return payout is not None and expected_value(payout, self.win_rate) >= self.min_ev
+
+    def ranking(self):
+        """[(activo, payout, ev)] de los activos que superan el umbral, mejor EV primero"""
+        with self.lock:
+            assets = list(self.table)
+
+        ranked = []
+        for asset in assets:
+            payout = self.payout(asset)
+            if payout is None:
+                continue
+            ev = expected_value(payout, self.win_rate)
+            if ev >= self.min_ev:
+                ranked.append((asset, payout, ev))
+
+        ranked.sort(key=lambda item: (-item[2], item[0]))
+        return ranked
+
+    def subscribe(self, callback):
+        """callback(ranking) en cada cambio de la lista; recibe de inmediato la vigente"""
+        self.subscribers.append(callback)
+        if self.published_state[1]:
+            callback(self.ranked)
+
+    def publish(self):
+        """Notificar si cambió el orden de los elegibles o qué activos tienen payout vigente"""
+        with self.publish_lock:
+            ranked = self.ranking()
+            with self.lock:
+                assets = list(self.table)
+            state = ([item[0] for item in ranked], frozenset(asset for asset in assets if self.known(asset)))
+
+            self.ranked = ranked
+            if state == self.published_state:
+                return False
+
+            self.published_state = state
+            self.publications += 1
+            logging.info(f"💹 Activos con EV ≥ {self.min_ev:+.2f} (payout ≥ {self.min_payout*100:.0f}%): "
+                         f"{', '.join(f'{asset} {payout*100:.0f}%' for asset, payout, _ in ranked) or 'ninguno'}")
+
+            for callback in list(self.subscribers):
+                try:
+                    callback(ranked)
+                except Exception as e:
+                    logging.error(f"❌ Error en suscriptor de payouts: {e}")
+            return True
+
+    def start_refresh(self, refresh, interval=30):
+        """Llamar refresh() -> filas (activo, payout, timeframe) cada `interval` segundos en el scheduler"""
+        scheduler = shared_scheduler()
+
+        def run():
+            try:
+                self.update_rows(refresh() or [])
+            except Exception as e:
+                logging.error(f"❌ Error actualizando payouts: {e}")
+            if self.refreshing:
+                self.refresh_event = scheduler.call_later(interval, run)
+
+        self.refreshing = True
+        self.refresh_event = scheduler.call_later(0, run)
+
+    def stop_refresh(self):
+        self.refreshing = False
+        if self.refresh_event:
+            self.refresh_event.cancel()
+
+    def stats(self):
+        with self.lock:
+            tracked = len(self.table)
+        return {
+            "tracked": tracked,
+            "eligible": len(self.ranked),
+            "updates": self.updates,
+            "changes": self.changes,
+            "publications": self.publications,
+            "min_payout": round(self.min_payout, 4)
+        }
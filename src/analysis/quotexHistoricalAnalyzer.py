@@ -5,6 +5,7 @@ Sistema más efectivo para generar señales de trading
 """
 
 import sys
+import os
 import json
 import time
 import logging
@@ -16,6 +17,14 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.analysis.patternTable import load_pattern_table, load_asset_pattern_tables, merge_patterns
+from src.execution.signalBus import SignalPublisher
+from src.utils.serverClock import server_clock, server_datetime
+from src.utils.latencyMetrics import metrics
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
 
 class QuotexHistoricalAnalyzer:
@@ -40,6 +49,23 @@ class QuotexHistoricalAnalyzer:
             ("UP", "UP", "UP"): (0.83, "DOWN"),      # Reversión fuerte
         }
         
+        # Completar con probabilidades minadas si existe la tabla (patternMiner.py);
+        # los activos con tabla propia usan sus cuentas en lugar de las globales
+        mined_patterns = load_pattern_table(lengths=(3,))
+        self.sequence_patterns = merge_patterns(self.sequence_patterns, mined_patterns.get(3))
+        self.asset_ids = {
+            "UK BRENT": "BRENT_otc",
+            "MICROSOFT": "MSFT_otc",
+            "ADA": "ADA_otc",
+            "ETH": "ETH_otc",
+            "USDINR": "USDINR_otc",
+            "USDEGP": "USDEGP_otc"
+        }
+        self.asset_sequence_patterns = {
+            pair: merge_patterns(self.sequence_patterns, asset_patterns.get(3))
+            for pair, asset_patterns in load_asset_pattern_tables(self.asset_ids, lengths=(3,)).items()
+        }
+        
         # Correlaciones entre activos OTC
         self.correlations = {
             "UK BRENT": {"USDINR": -0.45, "USDEGP": -0.38, "ETH": 0.25},
@@ -50,9 +76,18 @@ class QuotexHistoricalAnalyzer:
             "USDEGP": {"USDINR": 0.65, "UK BRENT": -0.38, "ADA": -0.15}
         }
         
+        # Umbrales de decisión de generate_signal
+        self.sequence_threshold = 0.70  # Probabilidad mínima de la secuencia
+        self.correlation_weight = 0.3   # Peso del boost de correlación
+        self.max_probability = 0.95     # Máximo 95%
+        self.signal_threshold = 0.75    # Probabilidad combinada mínima
+        
         # Señales generadas
         self.current_signals = {}
         
+        # Bus de señales hacia los ejecutores (reemplaza signals/current_signals.json)
+        self.signal_publisher = None
+        
     def setup_chrome(self):
         """Configurar Chrome"""
         try:
@@ -161,15 +196,16 @@ class QuotexHistoricalAnalyzer:
             
             # Obtener últimas 3 velas
             last_three = tuple(history[-3:])
+            patterns = self.asset_sequence_patterns.get(pair, self.sequence_patterns)
             
             # Buscar patrón en base de conocimiento
-            if last_three in self.sequence_patterns:
-                probability, direction = self.sequence_patterns[last_three]
+            if last_three in patterns:
+                probability, direction = patterns[last_three]
                 logging.info(f"🎯 {pair} patrón {last_three} → {direction} ({probability*100:.0f}%)")
                 return direction, probability
             
             # Si no hay patrón exacto, buscar patrones similares
-            for pattern, (prob, dir) in self.sequence_patterns.items():
+            for pattern, (prob, dir) in patterns.items():
                 matches = sum(1 for i in range(3) if i < len(last_three) and last_three[i] == pattern[i])
                 if matches >= 2:  # Al menos 2 coincidencias
                     adjusted_prob = prob * 0.7  # Reducir probabilidad
@@ -224,20 +260,20 @@ class QuotexHistoricalAnalyzer:
             # 1. Análisis de secuencia
             seq_direction, seq_probability = self.analyze_sequence_pattern(pair)
             
-            if not seq_direction or seq_probability < 0.7:
+            if not seq_direction or seq_probability < self.sequence_threshold:
                 return None  # No generar señal si probabilidad < 70%
             
             # 2. Análisis de correlación
             correlation_boost = self.analyze_correlations(pair, seq_direction)
             
             # 3. Calcular probabilidad combinada
-            combined_probability = seq_probability + (correlation_boost * 0.3)
-            combined_probability = min(combined_probability, 0.95)  # Máximo 95%
+            combined_probability = seq_probability + (correlation_boost * self.correlation_weight)
+            combined_probability = min(combined_probability, self.max_probability)  # Máximo 95%
             
             # 4. Generar señal solo si > 75%
-            if combined_probability >= 0.75:
-                # Calcular próximo minuto para ejecución
-                now = datetime.now()
+            if combined_probability >= self.signal_threshold:
+                # Calcular próximo minuto para ejecución (minuto del broker)
+                now = server_datetime()
                 next_minute = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
                 
                 signal = {
@@ -287,7 +323,8 @@ class QuotexHistoricalAnalyzer:
             signals = {}
             
             for pair in self.pairs:
-                signal = self.generate_signal(pair)
+                with metrics.timer("pattern_eval", asset=pair):
+                    signal = self.generate_signal(pair)
                 if signal:
                     signals[pair] = signal
             
@@ -325,6 +362,10 @@ class QuotexHistoricalAnalyzer:
         try:
             logging.info(f"🔄 INICIANDO ANÁLISIS CONTINUO (cada {interval_minutes} min)")
             
+            if self.signal_publisher is None:
+                self.signal_publisher = SignalPublisher()
+                self.signal_publisher.start()
+            
             while True:
                 try:
                     # Escanear pares
@@ -333,10 +374,13 @@ class QuotexHistoricalAnalyzer:
                     # Generar señales
                     signals = self.generate_all_signals()
                     
-                    # Guardar señales en archivo
+                    # Publicar señales a los ejecutores conectados
                     if signals:
-                        with open("D:/iq_quot/signals/current_signals.json", "w") as f:
-                            json.dump(signals, f, indent=2)
+                        # Vencen al empezar el minuto de ejecución (hora del broker -> reloj local)
+                        expires_at = min(server_clock.to_local(datetime.fromisoformat(signal["execute_timestamp"]).timestamp())
+                                         for signal in signals.values())
+                        delivered = self.signal_publisher.publish(signals, expires_at=expires_at)
+                        logging.info(f"📡 {len(signals)} señales publicadas a {delivered} ejecutor(es)")
                     
                     # Esperar siguiente análisis
                     logging.info(f"⏰ Próximo análisis en {interval_minutes} minuto(s)...")
@@ -354,12 +398,15 @@ class QuotexHistoricalAnalyzer:
     
     def close(self):
         """Cerrar navegador"""
+        if self.signal_publisher:
+            self.signal_publisher.close()
         if self.driver:
             self.driver.quit()
 
 def main():
     """Función principal"""
     analyzer = QuotexHistoricalAnalyzer()
+    metrics.start_exporter("historical_analyzer")
     
     try:
         # Setup
@@ -369,10 +416,6 @@ def main():
         if not analyzer.open_quotex():
             return
         
-        # Crear directorio para señales
-        import os
-        os.makedirs("D:/iq_quot/signals", exist_ok=True)
-        
         # Comandos interactivos
         logging.info("🤖 Analizador Histórico listo...")
         logging.info("💡 Comandos disponibles:")
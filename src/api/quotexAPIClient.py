@@ -5,6 +5,8 @@ Cliente API para Quotex similar al que usábamos con IQ Option
 Obtiene cotizaciones y análisis automáticamente
 """
 
+import sys
+import os
 import requests
 import json
 import time
@@ -13,13 +15,25 @@ import websocket
 import threading
 from datetime import datetime, timedelta
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+from requests.adapters import HTTPAdapter
 import ssl
 
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.analysis.patternTable import ROOT_DIR, load_pattern_table, load_asset_pattern_tables, merge_patterns
+from src.data.candleBuilder import CandleBuilder
+from src.utils.serverClock import server_clock, server_datetime
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
 
 class QuotexAPIClient:
     def __init__(self):
         self.session = requests.Session()
+        
+        # Cada respuesta HTTP (encabezado Date) alimenta la estimación del reloj del broker
+        self.session.hooks["response"].append(server_clock.response_hook)
         self.ws = None
         self.is_connected = False
         self.is_authenticated = False
@@ -55,6 +69,43 @@ class QuotexAPIClient:
         self.candle_history = {}
         self.assets_info = {}
         
+        # Velas de 1 minuto construidas desde los ticks; candle_history solo recibe velas cerradas
+        self.candle_timeframe = 60
+        self.candle_builder = CandleBuilder(on_candle=self.on_candle_closed)
+        
+        # Inicio de la última vela cerrada por activo y de la vela que ya produjo señal (una señal por vela)
+        self.last_closed_candle = {}
+        self.signaled_candles = {}
+        
+        # Endpoints candidatos de precio (OTC, basados en documentación real)
+        self.price_endpoint_templates = [
+            "{api_base}/prices/{asset_id}",
+            "{api_base}/realtime/{asset_id}",
+            "{api_base}/quotes/{asset_id}",
+            "{api_base}/candles/{asset_id}",
+            "{api_base}/otc/prices/{asset_id}",
+            "{api_base}/otc/realtime/{asset_id}",
+            "{base_url}/api/prices/{asset_id}",
+            "{base_url}/api/otc/prices/{asset_id}"
+        ]
+        self.price_timeout = 5
+        
+        # Endpoint ganador por activo, persistido entre reinicios (solo se re-prueba tras un fallo)
+        self.price_endpoint_cache_path = os.path.join(ROOT_DIR, "data", "price_endpoints.json")
+        self.price_endpoint_winners = self.load_price_endpoint_cache()
+        self.price_endpoint_lock = threading.Lock()
+        
+        # Las carreras de endpoints comparten hilos y conexiones keep-alive
+        self.probe_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="price-probe")
+        self.scan_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="price-scan")
+        
+        # Presupuesto de latencia por escaneo (segundos) con endpoints aprendidos: lo que llegue tarde se descarta
+        self.scan_latency_budget = 2.0
+        self.last_scan_stats = {}
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
         # Activos OTC de Quotex (todos son OTC)
         self.target_assets = {
             "UK BRENT": {"id": "BRENT_otc", "name": "UK BRENT OTC"},
@@ -74,6 +125,16 @@ class QuotexAPIClient:
             ("DOWN", "DOWN", "DOWN"): (0.78, "UP"),
             ("UP", "UP", "UP"): (0.76, "DOWN"),
         }
+        
+        # Completar con probabilidades minadas si existe la tabla (patternMiner.py);
+        # los activos con tabla propia usan sus cuentas en lugar de las globales
+        mined_patterns = load_pattern_table(lengths=(3,))
+        self.patterns = merge_patterns(self.patterns, mined_patterns.get(3))
+        asset_ids = {name: info["id"] for name, info in self.target_assets.items()}
+        self.asset_patterns = {
+            name: merge_patterns(self.patterns, asset_patterns.get(3))
+            for name, asset_patterns in load_asset_pattern_tables(asset_ids, lengths=(3,)).items()
+        }
     
     def authenticate(self):
         """Autenticar con Quotex (similar a IQ Option)"""
@@ -425,67 +486,41 @@ class QuotexAPIClient:
             logging.error(f"❌ Error mapeando activos: {e}")
     
     def get_live_price(self, asset_name):
-        """Obtener precio en vivo de un activo"""
+        """Obtener precio en vivo de un activo (endpoint aprendido o carrera entre candidatos)"""
         try:
             asset_id = self.target_assets.get(asset_name, {}).get("id")
             if not asset_id:
                 return None
             
-            # Endpoints OTC basados en documentación real
-            price_endpoints = [
-                f"{self.api_base}/prices/{asset_id}",
-                f"{self.api_base}/realtime/{asset_id}",
-                f"{self.api_base}/quotes/{asset_id}",
-                f"{self.api_base}/candles/{asset_id}",
-                f"{self.api_base}/otc/prices/{asset_id}",
-                f"{self.api_base}/otc/realtime/{asset_id}",
-                f"{self.base_url}/api/prices/{asset_id}",
-                f"{self.base_url}/api/otc/prices/{asset_id}"
-            ]
-            
-            for endpoint in price_endpoints:
-                try:
-                    response = self.session.get(endpoint, headers=self.headers, timeout=5)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        
-                        # Extraer precio según diferentes formatos
-                        price = None
-                        if isinstance(data, (int, float)):
-                            price = float(data)
-                        elif data.get("price"):
-                            price = float(data["price"])
-                        elif data.get("value"):
-                            price = float(data["value"])
-                        elif data.get("close"):
-                            price = float(data["close"])
-                        elif data.get("current"):
-                            price = float(data["current"])
-                        
-                        if price:
-                            # Actualizar historial
-                            if asset_name not in self.candle_history:
-                                self.candle_history[asset_name] = deque(maxlen=100)
-                            
-                            # Determinar dirección
-                            direction = self.calculate_direction(asset_name, price)
-                            
-                            self.live_prices[asset_name] = {
-                                "price": price,
-                                "direction": direction,
-                                "timestamp": datetime.now()
-                            }
-                            
-                            return {
-                                "asset": asset_name,
-                                "price": price,
-                                "direction": direction,
-                                "timestamp": datetime.now()
-                            }
+            price = None
+            template = self.price_endpoint_winners.get(asset_name)
+            if template:
+                price = self.fetch_price(self.build_price_url(template, asset_id))
+                if not price:
+                    logging.info(f"🔄 {asset_name}: Endpoint aprendido falló, re-probando candidatos")
+                    self.remember_price_endpoint(asset_name, None)
+            
+            if not price:
+                template, price = self.race_price_endpoints(asset_id)
+                if price:
+                    self.remember_price_endpoint(asset_name, template)
+            
+            if price:
+                # Determinar dirección
+                direction = self.calculate_direction(asset_name, price)
                 
-                except Exception as e:
-                    continue
+                self.live_prices[asset_name] = {
+                    "price": price,
+                    "direction": direction,
+                    "timestamp": datetime.now()
+                }
+                
+                return {
+                    "asset": asset_name,
+                    "price": price,
+                    "direction": direction,
+                    "timestamp": datetime.now()
+                }
             
             # USAR MÉTODO QUE YA FUNCIONA - Datos basados en patrones reales
             logging.info(f"🔄 {asset_name}: Usando método de patrones que YA FUNCIONA")
@@ -495,17 +530,104 @@ class QuotexAPIClient:
             logging.error(f"❌ Error obteniendo precio {asset_name}: {e}")
             return None
     
-    def calculate_direction(self, asset_name, current_price):
-        """Calcular dirección del precio"""
+    def build_price_url(self, template, asset_id):
+        """Construir URL de precio desde una plantilla"""
+        return template.format(api_base=self.api_base, base_url=self.base_url, asset_id=asset_id)
+    
+    def fetch_price(self, url):
+        """Pedir un endpoint y extraer el precio según diferentes formatos (None si falla)"""
         try:
-            if asset_name in self.live_prices:
-                previous_price = self.live_prices[asset_name]["price"]
-                return "UP" if current_price > previous_price else "DOWN"
+            response = self.session.get(url, headers=self.headers, timeout=self.price_timeout)
+            if response.status_code != 200:
+                return None
+            
+            data = response.json()
+            if isinstance(data, (int, float)):
+                return float(data)
+            
+            for key in ("price", "value", "close", "current"):
+                if data.get(key):
+                    return float(data[key])
+            
+            return None
+            
+        except Exception:
+            return None
+    
+    def race_price_endpoints(self, asset_id):
+        """Probar todos los endpoints a la vez y quedarse con el primero que devuelva precio"""
+        futures = {
+            self.probe_executor.submit(self.fetch_price, self.build_price_url(template, asset_id)): template
+            for template in self.price_endpoint_templates
+        }
+        
+        try:
+            for future in as_completed(futures, timeout=self.price_timeout + 1):
+                price = future.result()
+                if price:
+                    return futures[future], price
+        except FutureTimeoutError:
+            pass
+        finally:
+            for future in futures:
+                future.cancel()
+        
+        return None, None
+    
+    def load_price_endpoint_cache(self):
+        """Cargar endpoints ganadores aprendidos en ejecuciones anteriores"""
+        try:
+            if os.path.exists(self.price_endpoint_cache_path):
+                with open(self.price_endpoint_cache_path, "r") as f:
+                    winners = json.load(f)
+                logging.info(f"📚 {len(winners)} endpoints de precio aprendidos cargados")
+                return winners
+        except Exception as e:
+            logging.error(f"❌ Error cargando cache de endpoints: {e}")
+        return {}
+    
+    def remember_price_endpoint(self, asset_name, template):
+        """Guardar (o olvidar con None) el endpoint ganador de un activo y persistirlo"""
+        with self.price_endpoint_lock:
+            if self.price_endpoint_winners.get(asset_name) == template:
+                return
+            
+            if template:
+                self.price_endpoint_winners[asset_name] = template
+                logging.info(f"🏁 {asset_name}: Endpoint ganador {template}")
             else:
-                return "UP"  # Primera lectura
+                self.price_endpoint_winners.pop(asset_name, None)
+            
+            try:
+                os.makedirs(os.path.dirname(self.price_endpoint_cache_path), exist_ok=True)
+                temp_path = f"{self.price_endpoint_cache_path}.tmp"
+                with open(temp_path, "w") as f:
+                    json.dump(self.price_endpoint_winners, f, indent=2)
+                os.replace(temp_path, self.price_endpoint_cache_path)
+            except Exception as e:
+                logging.error(f"❌ Error guardando cache de endpoints: {e}")
+    
+    def calculate_direction(self, asset_name, current_price):
+        """Calcular dirección de la vela actual (open vs precio actual) alimentando el constructor
+        (solo con precios reales obtenidos del broker)"""
+        try:
+            self.candle_builder.add_tick(asset_name, current_price)
+            candle = self.candle_builder.forming(asset_name, self.candle_timeframe)
+            return candle["direction"] if candle else "UP"
         except:
             return "UP"
     
+    def on_candle_closed(self, candle):
+        """Agregar al historial la dirección de cada vela de 1 minuto cerrada"""
+        if candle["timeframe"] != self.candle_timeframe:
+            return
+        
+        asset_name = candle["asset"]
+        if asset_name not in self.candle_history:
+            self.candle_history[asset_name] = deque(maxlen=100)
+        self.candle_history[asset_name].append(candle["direction"])
+        self.last_closed_candle[asset_name] = candle["timestamp"]
+    
     def get_pattern_based_price(self, asset_name):
         """Método basado en patrones que YA FUNCIONA en el bot principal"""
         try:
@@ -538,24 +660,17 @@ class QuotexAPIClient:
             variation = random.uniform(-asset_volatility, asset_volatility)
             current_price = base_price * (1 + variation)
             
-            # Determinar dirección basada en historial
-            direction = self.calculate_direction(asset_name, current_price)
-            
-            # Actualizar cache
-            self.live_prices[asset_name] = {
-                "price": current_price,
-                "direction": direction,
-                "timestamp": datetime.now()
-            }
+            # Precio inventado: no entra al constructor de velas ni al cache de precios en vivo
+            direction = "UP" if variation >= 0 else "DOWN"
             
-            logging.info(f"📊 {asset_name}: {current_price:.6f} ({direction}) PATRÓN")
+            logging.info(f"📊 {asset_name}: {current_price:.6f} ({direction}) PATRÓN (simulado)")
             
             return {
                 "asset": asset_name,
                 "price": current_price,
                 "direction": direction,
                 "timestamp": datetime.now(),
-                "source": "pattern_based_real",
+                "source": "simulated",
                 "change_percent": variation * 100
             }
             
@@ -564,19 +679,14 @@ class QuotexAPIClient:
             return None
     
     def get_candle_history(self, asset_name, count=10):
-        """Obtener historial de velas"""
+        """Obtener historial de velas cerradas (puede tener menos de `count` mientras se acumulan)"""
         try:
-            # Simular obtención de datos históricos
+            # Cerrar velas cuyo minuto terminó aunque no haya llegado un tick nuevo
+            self.candle_builder.flush(asset=asset_name)
+            
             if asset_name not in self.candle_history:
                 self.candle_history[asset_name] = deque(maxlen=100)
             
-            # Si no hay suficiente historial, generar datos realistas
-            while len(self.candle_history[asset_name]) < count:
-                price_data = self.get_live_price(asset_name)
-                if price_data:
-                    self.candle_history[asset_name].append(price_data["direction"])
-                time.sleep(0.1)
-            
             return list(self.candle_history[asset_name])[-count:]
             
         except Exception as e:
@@ -592,9 +702,10 @@ class QuotexAPIClient:
                 return None
             
             pattern = tuple(history[-3:])
+            patterns = self.asset_patterns.get(asset_name, self.patterns)
             
-            if pattern in self.patterns:
-                probability, direction = self.patterns[pattern]
+            if pattern in patterns:
+                probability, direction = patterns[pattern]
                 
                 return {
                     "asset": asset_name,
@@ -616,7 +727,7 @@ class QuotexAPIClient:
             analysis = self.analyze_pattern(asset_name)
             
             if analysis and analysis["probability"] >= 0.70:
-                now = datetime.now()
+                now = server_datetime()
                 execute_time = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
                 
                 signal = {
@@ -638,31 +749,74 @@ class QuotexAPIClient:
             logging.error(f"❌ Error generando señal {asset_name}: {e}")
             return None
     
-    def scan_all_assets(self):
-        """Escanear todos los activos objetivo"""
+    def scan_all_assets(self, latency_budget=None, on_signal=None):
+        """
+        Escanear todos los activos en paralelo y generar cada señal en cuanto llega su precio
+        Los activos que no responden dentro del presupuesto de latencia se omiten en este escaneo
+        """
         try:
             logging.info("🔍 Escaneando todos los activos...")
             
+            if latency_budget is None:
+                latency_budget = self.scan_latency_budget
+            
+            # Con activos sin endpoint aprendido hay que esperar la carrera completa (timeout + 1s)
+            cold_assets = [name for name in self.target_assets if name not in self.price_endpoint_winners]
+            if cold_assets:
+                latency_budget = max(latency_budget, self.price_timeout + 1)
+            
             signals = {}
+            start = time.perf_counter()
+            futures = {
+                self.scan_executor.submit(self.get_live_price, asset_name): asset_name
+                for asset_name in self.target_assets.keys()
+            }
+            completed = 0
             
-            for asset_name in self.target_assets.keys():
-                try:
-                    # Obtener precio actual
-                    price_data = self.get_live_price(asset_name)
-                    
-                    if price_data:
-                        logging.info(f"📊 {asset_name}: ${price_data['price']:.4f} ({price_data['direction']})")
-                        
-                        # Generar señal
-                        signal = self.generate_signal(asset_name)
+            try:
+                for future in as_completed(futures, timeout=latency_budget):
+                    asset_name = futures[future]
+                    completed += 1
+                    try:
+                        price_data = future.result()
                         
-                        if signal:
-                            signals[asset_name] = signal
-                            logging.info(f"🚨 SEÑAL: {signal['command']} - {signal['probability']*100:.0f}%")
-                
-                except Exception as e:
-                    logging.error(f"❌ Error escaneando {asset_name}: {e}")
-                    continue
+                        if price_data:
+                            logging.info(f"📊 {asset_name}: ${price_data['price']:.4f} ({price_data['direction']})")
+                            
+                            # Generar señal
+                            signal = self.generate_signal(asset_name)
+                            
+                            # El historial solo cambia al cerrar una vela: no repetir la señal en cada escaneo
+                            candle = self.last_closed_candle.get(asset_name)
+                            if signal and self.signaled_candles.get(asset_name) == candle:
+                                signal = None
+                            
+                            if signal:
+                                self.signaled_candles[asset_name] = candle
+                                signals[asset_name] = signal
+                                logging.info(f"🚨 SEÑAL: {signal['command']} - {signal['probability']*100:.0f}%")
+                                if on_signal:
+                                    on_signal(signal)
+                    
+                    except Exception as e:
+                        logging.error(f"❌ Error escaneando {asset_name}: {e}")
+                        continue
+            
+            except FutureTimeoutError:
+                late = [futures[f] for f in futures if not f.done()]
+                logging.warning(f"⏱️ Presupuesto de {latency_budget:.1f}s agotado - omitidos: {', '.join(late)}")
+                for future in futures:
+                    future.cancel()
+            
+            elapsed = time.perf_counter() - start
+            self.last_scan_stats = {
+                "elapsed": elapsed,
+                "assets": len(futures),
+                "completed": completed,
+                "timed_out": len(futures) - completed,
+                "signals": len(signals)
+            }
+            logging.info(f"⚡ Escaneo completado en {elapsed*1000:.0f}ms ({completed}/{len(futures)} activos)")
             
             return signals
             
@@ -5,6 +5,7 @@ Intercepta y descubre los endpoints reales de la API de Quotex
 """
 
 import sys
+import os
 import time
 import logging
 import json
@@ -13,6 +14,11 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.connectors.cdpTickSource import enable_performance_logging
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
 
 class QuotexAPIDiscovery:
@@ -37,6 +43,9 @@ class QuotexAPIDiscovery:
             options.add_argument("--log-level=0")
             options.add_argument("--v=1")
             
+            # Log de performance de Chrome: sin esto get_log('performance') no devuelve eventos de red
+            enable_performance_logging(options)
+            
             # Habilitar DevTools
             options.add_experimental_option("useAutomationExtension", False)
             options.add_experimental_option("excludeSwitches", ["enable-automation"])
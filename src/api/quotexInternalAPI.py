@@ -5,19 +5,32 @@ Cliente para conectar directamente con la API interna de Quotex
 Sin necesidad de navegador - Conexión directa
 """
 
+import sys
+import os
 import requests
 import json
 import time
 import logging
-import websocket
 import threading
-from datetime import datetime, timedelta
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.data.tickBuffer import TickRingBuffer
+from src.data.candleArchive import CandleArchive
+from src.api.quotexSubscriptions import QuotexSubscriptionManager
+from src.utils.serverClock import server_clock
+from src.execution.latencyModel import shared_latency_model, REST
+from src.utils.latencyMetrics import metrics
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
 
 class QuotexInternalAPI:
     def __init__(self):
         self.session = requests.Session()
+        
+        # Cada respuesta HTTP (encabezado Date) alimenta la estimación del reloj del broker
+        self.session.hooks["response"].append(server_clock.response_hook)
         self.ws = None
         self.is_connected = False
         self.auth_token = None
@@ -45,7 +58,18 @@ class QuotexInternalAPI:
         
         # Datos en tiempo real
         self.live_prices = {}
-        self.price_history = {}
+        self.price_history = {}  # asset_id -> TickRingBuffer
+        self.price_history_size = 100
+        
+        # Archivo local de velas (backtests, arranques en caliente y minería leen lo mismo)
+        self.candle_archive = CandleArchive()
+        
+        # Un solo WebSocket multiplexado para todos los activos
+        self.subscriptions = None
+        self.default_assets = ["UK_BRENT", "MICROSOFT", "ADA", "ETH"]
+        
+        # Consumidores de velas recuperadas tras una reconexión: callback(asset_id, candles)
+        self.backfill_listeners = []
         
     def authenticate(self):
         """Autenticar con la API de Quotex"""
@@ -209,6 +233,14 @@ class QuotexInternalAPI:
                         })
                     
                     logging.info(f"📊 {len(processed_candles)} velas históricas obtenidas para {asset_id}")
+                    
+                    try:
+                        added = self.candle_archive.append_candles(f"{asset_id}_{timeframe}", processed_candles)
+                        if added:
+                            logging.info(f"💾 {added} velas nuevas archivadas para {asset_id}")
+                    except Exception as e:
+                        logging.error(f"❌ Error archivando velas {asset_id}: {e}")
+                    
                     return processed_candles
             
             return []
@@ -217,75 +249,31 @@ class QuotexInternalAPI:
             logging.error(f"❌ Error obteniendo historial {asset_id}: {e}")
             return []
     
-    def connect_websocket(self):
+    def get_archived_candles(self, asset_id, timeframe="1m", start=None, end=None):
+        """Velas archivadas localmente como columnas NumPy (vistas sin copia) entre start y end"""
+        return self.candle_archive.range(f"{asset_id}_{timeframe}", start, end)
+    
+    def connect_websocket(self, assets=None):
         """Conectar WebSocket para datos en tiempo real"""
         try:
             logging.info("🌐 Conectando WebSocket...")
             
-            def on_message(ws, message):
-                try:
-                    data = json.loads(message)
-                    
-                    if data.get("type") == "price_update":
-                        asset_id = data.get("asset_id")
-                        price = data.get("price")
-                        
-                        if asset_id and price:
-                            self.live_prices[asset_id] = price
-                            
-                            # Mantener historial
-                            if asset_id not in self.price_history:
-                                self.price_history[asset_id] = []
-                            
-                            self.price_history[asset_id].append({
-                                "price": price,
-                                "timestamp": datetime.now()
-                            })
-                            
-                            # Mantener solo últimos 100 precios
-                            if len(self.price_history[asset_id]) > 100:
-                                self.price_history[asset_id] = self.price_history[asset_id][-100:]
-                            
-                            logging.info(f"💰 {asset_id}: ${price}")
-                
-                except Exception as e:
-                    logging.error(f"❌ Error procesando mensaje WS: {e}")
-            
-            def on_error(ws, error):
-                logging.error(f"❌ Error WebSocket: {error}")
-            
-            def on_close(ws, close_status_code, close_msg):
-                logging.info("🔌 WebSocket cerrado")
-                self.is_connected = False
-            
-            def on_open(ws):
-                logging.info("✅ WebSocket conectado")
-                self.is_connected = True
-                
-                # Suscribirse a precios
-                subscribe_msg = {
-                    "type": "subscribe",
-                    "channel": "prices",
-                    "assets": ["UK_BRENT", "MICROSOFT", "ADA", "ETH"]
-                }
-                
-                ws.send(json.dumps(subscribe_msg))
-            
             # Crear WebSocket con token de autenticación
             ws_url_with_auth = f"{self.ws_url}?token={self.auth_token}"
             
-            self.ws = websocket.WebSocketApp(
+            self.subscriptions = QuotexSubscriptionManager(
                 ws_url_with_auth,
-                on_message=on_message,
-                on_error=on_error,
-                on_close=on_close,
-                on_open=on_open
+                channel="prices",
+                on_open=self.on_websocket_open,
+                on_close=self.on_websocket_close,
+                on_reconnect=self.on_websocket_reconnect
             )
             
-            # Ejecutar en thread separado
-            ws_thread = threading.Thread(target=self.ws.run_forever)
-            ws_thread.daemon = True
-            ws_thread.start()
+            # Las suscripciones se envían en un frame al abrir el socket
+            self.subscriptions.subscribe(assets or self.default_assets, self.on_price_update)
+            
+            self.subscriptions.start()
+            self.ws = self.subscriptions.ws
             
             return True
             
@@ -293,9 +281,90 @@ class QuotexInternalAPI:
             logging.error(f"❌ Error conectando WebSocket: {e}")
             return False
     
-    def place_trade(self, asset_id, direction, amount, duration=60):
-        """Colocar una operación"""
+    def subscribe_assets(self, assets, consumer=None):
+        """Suscribir activos en caliente; consumer(asset_id, price, message) recibe sus ticks"""
+        if not self.subscriptions:
+            return []
+        
+        self.subscriptions.subscribe(assets, self.on_price_update, consumer)
+        return self.subscriptions.subscribed_assets()
+    
+    def unsubscribe_assets(self, assets, consumer=None):
+        """Quitar un consumidor de los activos, o desuscribirlos por completo si no se indica"""
+        if not self.subscriptions:
+            return []
+        
+        if consumer:
+            return self.subscriptions.unsubscribe(assets, consumer)
+        return self.subscriptions.unsubscribe(assets)
+    
+    def on_websocket_open(self):
+        self.is_connected = True
+    
+    def on_websocket_close(self):
+        self.is_connected = False
+    
+    def on_websocket_reconnect(self, disconnected_at, reconnected_at):
+        """Rellenar el hueco fuera del hilo del WebSocket para no retrasar los ticks"""
+        backfill_thread = threading.Thread(target=self.backfill_gap, args=(disconnected_at, reconnected_at))
+        backfill_thread.daemon = True
+        backfill_thread.start()
+    
+    def add_backfill_listener(self, callback):
+        """Registrar un consumidor de velas recuperadas: callback(asset_id, candles)"""
+        self.backfill_listeners.append(callback)
+    
+    def backfill_gap(self, disconnected_at, reconnected_at, timeframe="1m"):
+        """Recuperar con get_historical_data las velas perdidas durante la desconexión"""
+        if not self.subscriptions:
+            return
+        
+        # Minutos del hueco más la vela abierta al caer y la abierta al volver
+        count = int((reconnected_at - disconnected_at) // 60) + 2
+        logging.info(f"🩹 Rellenando hueco de {reconnected_at - disconnected_at:.0f}s ({count} velas por activo)")
+        
+        for asset_id in self.subscriptions.subscribed_assets():
+            # get_historical_data también las guarda en el archivo de velas
+            candles = self.get_historical_data(asset_id, timeframe, count)
+            if not candles:
+                continue
+            
+            for listener in self.backfill_listeners:
+                try:
+                    listener(asset_id, candles)
+                except Exception as e:
+                    logging.error(f"❌ Error en consumidor de backfill {asset_id}: {e}")
+    
+    def get_stream_metrics(self):
+        """Métricas del stream: conexiones, reconexiones, duración del último corte y tiempo hasta el primer tick"""
+        if not self.subscriptions:
+            return {}
+        return dict(self.subscriptions.metrics)
+    
+    def on_price_update(self, asset_id, price, message):
+        """Consumidor base: precio en vivo e historial de ticks"""
+        self.live_prices[asset_id] = price
+        
+        # Timestamp del servidor en el tick: cota inferior del offset del reloj del broker
+        if isinstance(message, dict):
+            server_clock.observe_tick(message.get("timestamp"))
+        
+        # Mantener historial (buffer circular de los últimos 100 precios)
+        history = self.price_history.get(asset_id)
+        if history is None:
+            history = self.price_history[asset_id] = TickRingBuffer(self.price_history_size)
+        
+        history.append(price)
+        
+        logging.info(f"💰 {asset_id}: ${price}")
+    
+    def place_trade(self, asset_id, direction, amount, duration=60, execute_at=None):
+        """Colocar una operación; con execute_at (epoch del broker) se adelanta la latencia medida del POST"""
         try:
+            latency_model = shared_latency_model()
+            if execute_at is not None:
+                latency_model.wait_for_fire(execute_at, REST)
+            
             logging.info(f"🚀 Colocando operación: {asset_id} {direction} ${amount}")
             
             trade_url = f"{self.api_url}/v1/trade"
@@ -308,12 +377,14 @@ class QuotexInternalAPI:
                 "timestamp": int(time.time())
             }
             
-            response = self.session.post(
-                trade_url,
-                json=trade_data,
-                headers=self.headers,
-                timeout=10
-            )
+            with latency_model.measure(REST):
+                response = self.session.post(
+                    trade_url,
+                    json=trade_data,
+                    headers=self.headers,
+                    timeout=10
+                )
+            metrics.record("broker_ack", response.elapsed.total_seconds(), channel=REST)
             
             if response.status_code == 200:
                 data = response.json()
@@ -341,10 +412,10 @@ class QuotexInternalAPI:
         """Determinar dirección del precio basado en historial"""
         try:
             if asset_id in self.price_history and len(self.price_history[asset_id]) >= 2:
-                recent_prices = self.price_history[asset_id][-2:]
+                recent_prices = self.price_history[asset_id].prices(2)
                 
-                current_price = recent_prices[-1]["price"]
-                previous_price = recent_prices[-2]["price"]
+                current_price = float(recent_prices[-1])
+                previous_price = float(recent_prices[-2])
                 
                 direction = "UP" if current_price > previous_price else "DOWN"
                 change_percent = ((current_price - previous_price) / previous_price) * 100
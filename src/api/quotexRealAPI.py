@@ -4,12 +4,22 @@ Quotex Real API Client - Usando PyQuotex Oficial
 Cliente basado en la documentación oficial de PyQuotex
 """
 
+import sys
+import os
 import asyncio
 import logging
+import random
 import time
 from datetime import datetime
 from collections import deque
 
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.data.candleBuilder import CandleBuilder
+from src.execution.latencyModel import shared_latency_model, PYQUOTEX
+from src.utils.serverClock import server_clock
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
 
 class QuotexRealAPIClient:
@@ -27,6 +37,24 @@ class QuotexRealAPIClient:
         self.live_prices = {}
         self.candle_history = {}
         
+        # Velas de 1 minuto construidas desde los ticks reales
+        self.candle_timeframe = 60
+        self.candle_builder = CandleBuilder(on_candle=self.on_candle_closed)
+        self.last_candle_time = {}
+        
+        # Stream supervisado: activos a restaurar tras reconectar y métricas de reconexión
+        self.streaming_assets = set()
+        self.supervising = False
+        self.supervisor_task = None
+        self.stream_metrics = {
+            "reconnects": 0,
+            "last_outage_seconds": None,
+            "reconnect_to_first_tick": None
+        }
+        
+        # Latencia medida de las órdenes por pyquotex (anticipación del disparo)
+        self.latency_model = shared_latency_model()
+        
         # Activos objetivo
         self.target_assets = {
             "UK BRENT": "BRENT_otc",
@@ -93,6 +121,10 @@ class QuotexRealAPIClient:
                 self.logger.info("✅ Conexión exitosa a Quotex")
                 self.is_connected = True
                 self.is_authenticated = True
+                
+                # Desde la primera conexión, un supervisor reconecta y restaura los streams si se cae
+                if self.supervisor_task is None or self.supervisor_task.done():
+                    self.supervisor_task = asyncio.create_task(self.supervise_connection())
                 return True
             else:
                 self.logger.error(f"❌ Error de conexión: {message}")
@@ -136,6 +168,7 @@ class QuotexRealAPIClient:
             
             # Iniciar stream de precios según documentación
             await self.client.start_realtime_price(quotex_asset, 60)
+            self.streaming_assets.add(asset_name)
             
             self.logger.info(f"✅ Stream iniciado para {asset_name}")
             return True
@@ -157,8 +190,9 @@ class QuotexRealAPIClient:
                 current_price = price_data.get('price', 0)
                 timestamp = price_data.get('timestamp', datetime.now())
                 
-                # Determinar dirección
-                direction = self.calculate_direction(asset_name, current_price)
+                # Determinar dirección (alimenta la vela en construcción con el timestamp del tick)
+                tick_time = timestamp if isinstance(timestamp, (int, float)) else None
+                direction = self.calculate_direction(asset_name, current_price, tick_time)
                 
                 # Actualizar cache
                 self.live_prices[asset_name] = {
@@ -183,17 +217,132 @@ class QuotexRealAPIClient:
             self.logger.error(f"❌ Error obteniendo precio {asset_name}: {e}")
             return None
     
-    def calculate_direction(self, asset_name, current_price):
-        """Calcular dirección del precio"""
+    def calculate_direction(self, asset_name, current_price, timestamp=None):
+        """Calcular dirección de la vela actual (open vs precio actual) alimentando el constructor"""
         try:
-            if asset_name in self.live_prices:
-                previous_price = self.live_prices[asset_name]["price"]
-                return "UP" if current_price > previous_price else "DOWN"
-            else:
-                return "UP"  # Primera lectura
+            self.candle_builder.add_tick(asset_name, current_price, timestamp)
+            candle = self.candle_builder.forming(asset_name, self.candle_timeframe)
+            return candle["direction"] if candle else "UP"
         except:
             return "UP"
     
+    def on_candle_closed(self, candle):
+        """Agregar al historial la dirección de cada vela de 1 minuto cerrada"""
+        if candle["timeframe"] != self.candle_timeframe:
+            return
+        
+        asset_name = candle["asset"]
+        if asset_name not in self.candle_history:
+            self.candle_history[asset_name] = deque(maxlen=100)
+        self.candle_history[asset_name].append(candle["direction"])
+        self.last_candle_time[asset_name] = candle["timestamp"]
+    
+    async def supervise_connection(self, check_interval=5, base_backoff=1.0, max_backoff=60.0):
+        """Vigilar la conexión: reconectar con backoff aleatorizado, restaurar streams y rellenar el hueco"""
+        self.supervising = True
+        attempt = 0
+        disconnected_at = None
+        
+        while self.supervising:
+            try:
+                connected = await self.client.check_connect()
+            except Exception:
+                connected = False
+            
+            if connected:
+                await asyncio.sleep(check_interval)
+                continue
+            
+            self.is_connected = False
+            if disconnected_at is None:
+                disconnected_at = time.time()
+                self.logger.warning("🔌 Conexión perdida - iniciando reconexión supervisada")
+            
+            cap = min(max_backoff, base_backoff * (2 ** attempt))
+            delay = random.uniform(cap / 2, cap)
+            attempt += 1
+            self.logger.info(f"🔄 Reintento {attempt} en {delay:.1f}s")
+            await asyncio.sleep(delay)
+            
+            reconnect_started = time.monotonic()
+            try:
+                check_connect, message = await self.client.connect()
+            except Exception as e:
+                check_connect, message = False, str(e)
+            
+            if not check_connect:
+                self.logger.warning(f"⚠️ Reconexión fallida: {message}")
+                continue
+            
+            self.is_connected = True
+            attempt = 0
+            
+            # Restaurar todos los streams de precios
+            for asset_name in list(self.streaming_assets):
+                await self.start_realtime_price(asset_name)
+            
+            await self.backfill_gap(disconnected_at)
+            
+            first_tick = await self.wait_first_tick()
+            outage = time.time() - disconnected_at
+            disconnected_at = None
+            
+            self.stream_metrics["reconnects"] += 1
+            self.stream_metrics["last_outage_seconds"] = outage
+            if first_tick:
+                self.stream_metrics["reconnect_to_first_tick"] = time.monotonic() - reconnect_started
+                self.logger.info(f"🔁 Reconectado tras {outage:.1f}s - primer tick en {self.stream_metrics['reconnect_to_first_tick']*1000:.0f}ms")
+            else:
+                self.logger.warning(f"⚠️ Reconectado tras {outage:.1f}s pero sin ticks todavía")
+    
+    async def wait_first_tick(self, timeout=10):
+        """Esperar el primer precio real de cualquier stream restaurado"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            for asset_name in list(self.streaming_assets):
+                quotex_asset = self.target_assets.get(asset_name, asset_name)
+                price_data = await self.client.get_realtime_price(quotex_asset)
+                if price_data:
+                    return True
+            await asyncio.sleep(0.05)
+        return False
+    
+    async def backfill_gap(self, disconnected_at):
+        """Completar candle_history con las velas cerradas durante el corte (get_candles)"""
+        current_bucket = int(time.time() // self.candle_timeframe) * self.candle_timeframe
+        count = int((time.time() - disconnected_at) // self.candle_timeframe) + 2
+        
+        for asset_name in list(self.streaming_assets | set(self.candle_history.keys())):
+            try:
+                quotex_asset = self.target_assets.get(asset_name, asset_name)
+                candles = await self.client.get_candles(quotex_asset, self.candle_timeframe, count)
+                if not candles:
+                    continue
+                
+                # La vela abierta al caer quedó incompleta: se reemplaza por la histórica
+                self.candle_builder.discard(asset_name)
+                last_time = self.last_candle_time.get(asset_name, disconnected_at - self.candle_timeframe)
+                
+                missed = []
+                for candle in candles:
+                    candle_time = candle.get('time', candle.get('timestamp'))
+                    if candle_time is None:
+                        continue
+                    if last_time < candle_time < current_bucket:
+                        missed.append((candle_time, "UP" if candle['close'] > candle['open'] else "DOWN"))
+                
+                if asset_name not in self.candle_history:
+                    self.candle_history[asset_name] = deque(maxlen=100)
+                
+                for candle_time, direction in sorted(missed):
+                    self.candle_history[asset_name].append(direction)
+                    self.last_candle_time[asset_name] = candle_time
+                
+                self.logger.info(f"🩹 {asset_name}: {len(missed)} velas recuperadas del corte")
+                
+            except Exception as e:
+                self.logger.error(f"❌ Error rellenando hueco {asset_name}: {e}")
+    
     async def start_candles_stream(self, asset_name):
         """Iniciar stream de velas"""
         try:
@@ -211,6 +360,30 @@ class QuotexRealAPIClient:
             self.logger.error(f"❌ Error iniciando velas {asset_name}: {e}")
             return False
     
+    async def place_trade(self, asset_name, direction, amount, duration=60, execute_at=None):
+        """Colocar operación vía pyquotex; con execute_at (epoch del broker) se adelanta la latencia medida"""
+        try:
+            quotex_asset = self.target_assets.get(asset_name, asset_name)
+            action = "call" if direction.upper() in ("UP", "CALL") else "put"
+            
+            if execute_at is not None:
+                fire_at = server_clock.to_local(self.latency_model.fire_time(execute_at, PYQUOTEX))
+                await asyncio.sleep(max(fire_at - time.time(), 0))
+            
+            with self.latency_model.measure(PYQUOTEX):
+                status, buy_info = await self.client.buy(amount, quotex_asset, action, duration)
+            
+            if status:
+                self.logger.info(f"✅ {asset_name} {action.upper()} colocada - ID: {buy_info.get('id')}")
+                return buy_info.get("id")
+            
+            self.logger.error(f"❌ Error colocando {asset_name}: {buy_info}")
+            return None
+            
+        except Exception as e:
+            self.logger.error(f"❌ Error colocando operación {asset_name}: {e}")
+            return None
+    
     async def get_candle_history(self, asset_name, count=10):
         """Obtener historial de velas"""
         try:
@@ -292,6 +465,9 @@ class QuotexRealAPIClient:
             self.logger.error(f"❌ Error en prueba: {e}")
             return False
         finally:
+            self.supervising = False
+            if self.supervisor_task:
+                self.supervisor_task.cancel()
             if self.client:
                 try:
                     await self.client.close()
@@ -301,6 +477,9 @@ class QuotexRealAPIClient:
     async def close(self):
         """Cerrar conexión"""
         try:
+            self.supervising = False
+            if self.supervisor_task:
+                self.supervisor_task.cancel()
             if self.client:
                 await self.client.close()
                 self.logger.info("👋 Conexión cerrada")
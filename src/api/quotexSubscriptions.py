@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Quotex Subscriptions - Gestor de suscripciones sobre un único WebSocket
+Suscribe y desuscribe activos en caliente con frames agrupados, despacha
+cada mensaje por tipo a los consumidores de cada activo y reconecta con
+backoff aleatorizado restaurando las suscripciones
+"""
+
+import json
+import time
+import random
+import logging
+import threading
+import websocket
+
+from src.utils.latencyMetrics import metrics
+
+# Consumidor que recibe los ticks de todos los activos
+ALL_ASSETS = "*"
+
+
+class QuotexSubscriptionManager:
+    def __init__(self, ws_url, channel="prices", max_batch=100, on_open=None, on_close=None,
+                 on_reconnect=None, base_backoff=1.0, max_backoff=60.0):
+        self.ws_url = ws_url
+        self.channel = channel
+        self.max_batch = max_batch
+        self.ws = None
+        self.ws_thread = None
+        self.is_connected = False
+
+        # Supervisión: backoff exponencial con jitter, reiniciado al recibir el primer tick
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.attempt = 0
+        self.ping_interval = 15
+        self.ping_timeout = 5
+        self.stop_event = threading.Event()
+        self.disconnected_at = None
+        self.connect_started = None
+        self.awaiting_first_tick = False
+        self.frame_received_ns = None
+        self.metrics = {
+            "connects": 0,
+            "reconnects": 0,
+            "last_outage_seconds": None,
+            "reconnect_to_first_tick": None
+        }
+
+        # asset -> [consumidor(asset, price, message)]
+        self.consumers = {}
+        self.lock = threading.Lock()
+
+        # Tabla de handlers por tipo de mensaje
+        self.handlers = {
+            "price_update": self.handle_price_update,
+            "subscribed": self.handle_ack,
+            "unsubscribed": self.handle_ack,
+            "error": self.handle_error
+        }
+
+        # Callbacks de estado de la conexión
+        self.on_open_callbacks = [on_open] if on_open else []
+        self.on_close_callbacks = [on_close] if on_close else []
+
+        # on_reconnect(desconectado_en, reconectado_en) en epoch - para rellenar el hueco
+        self.on_reconnect_callbacks = [on_reconnect] if on_reconnect else []
+
+    def register_handler(self, message_type, handler):
+        """Registrar (o reemplazar) el handler de un tipo de mensaje"""
+        self.handlers[message_type] = handler
+
+    def start(self):
+        """Abrir el socket supervisado en un único hilo para todos los activos"""
+        self.stop_event.clear()
+        self.ws_thread = threading.Thread(target=self._run, name="quotex-ws")
+        self.ws_thread.daemon = True
+        self.ws_thread.start()
+        return True
+
+    def stop(self):
+        """Cerrar el socket sin reconectar"""
+        self.stop_event.set()
+        if self.ws:
+            self.ws.close()
+
+    def _run(self):
+        """Mantener la conexión viva: reconectar hasta que se llame a stop()"""
+        while not self.stop_event.is_set():
+            self.connect_started = time.monotonic()
+            self.ws = websocket.WebSocketApp(
+                self.ws_url,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close,
+                on_open=self._on_open
+            )
+
+            # Los pings detectan conexiones muertas sin cierre TCP (y acotan la espera de stop())
+            try:
+                self.ws.run_forever(ping_interval=self.ping_interval, ping_timeout=self.ping_timeout)
+            except Exception as e:
+                logging.error(f"❌ Error en WebSocket: {e}")
+
+            self.is_connected = False
+            if self.stop_event.is_set():
+                break
+
+            if self.disconnected_at is None:
+                self.disconnected_at = time.time()
+
+            delay = self.next_backoff()
+            logging.warning(f"🔄 Reconectando WebSocket en {delay:.1f}s (intento {self.attempt})")
+            self.stop_event.wait(delay)
+
+    def next_backoff(self):
+        """Espera del próximo intento: exponencial con tope y jitter para no reconectar en ráfaga"""
+        cap = min(self.max_backoff, self.base_backoff * (2 ** self.attempt))
+        self.attempt += 1
+        return random.uniform(cap / 2, cap)
+
+    def subscribe(self, assets, *consumers):
+        """Suscribir activos (un frame por lote) registrando antes sus consumidores"""
+        if isinstance(assets, str):
+            assets = [assets]
+
+        new_assets = []
+        with self.lock:
+            for asset in assets:
+                if asset != ALL_ASSETS and asset not in self.consumers:
+                    new_assets.append(asset)
+                registered = self.consumers.setdefault(asset, [])
+                for consumer in consumers:
+                    if consumer and consumer not in registered:
+                        registered.append(consumer)
+
+        # Si aún no hay conexión, on_open envía todas las suscripciones
+        if new_assets and self.is_connected:
+            self._send_batched("subscribe", new_assets)
+        return new_assets
+
+    def unsubscribe(self, assets, consumer=None):
+        """Quitar un consumidor (o todos); el activo se desuscribe cuando no le queda ninguno"""
+        if isinstance(assets, str):
+            assets = [assets]
+
+        removed = []
+        with self.lock:
+            for asset in assets:
+                consumers = self.consumers.get(asset)
+                if consumers is None:
+                    continue
+
+                if consumer in consumers:
+                    consumers.remove(consumer)
+                if consumer is None or not consumers:
+                    del self.consumers[asset]
+                    if asset != ALL_ASSETS:
+                        removed.append(asset)
+
+        if removed and self.is_connected:
+            self._send_batched("unsubscribe", removed)
+        return removed
+
+    def subscribed_assets(self):
+        """Activos actualmente suscritos"""
+        with self.lock:
+            return [asset for asset in self.consumers if asset != ALL_ASSETS]
+
+    def _send_batched(self, message_type, assets):
+        """Enviar la (des)suscripción en frames de hasta max_batch activos"""
+        for start in range(0, len(assets), self.max_batch):
+            batch = assets[start:start + self.max_batch]
+            try:
+                self.ws.send(json.dumps({"type": message_type, "channel": self.channel, "assets": batch}))
+                logging.info(f"📡 {message_type}: {len(batch)} activos")
+            except Exception as e:
+                logging.error(f"❌ Error enviando {message_type}: {e}")
+
+    def _on_open(self, ws):
+        logging.info("✅ WebSocket conectado")
+        self.is_connected = True
+        self.awaiting_first_tick = True
+        self.metrics["connects"] += 1
+
+        # Reenviar todas las suscripciones vigentes
+        assets = self.subscribed_assets()
+        if assets:
+            self._send_batched("subscribe", assets)
+
+        for callback in self.on_open_callbacks:
+            callback()
+
+        if self.disconnected_at is not None:
+            disconnected_at, reconnected_at = self.disconnected_at, time.time()
+            self.disconnected_at = None
+            self.metrics["reconnects"] += 1
+            self.metrics["last_outage_seconds"] = reconnected_at - disconnected_at
+            logging.info(f"🔁 Reconectado tras {reconnected_at - disconnected_at:.1f}s - {len(assets)} suscripciones restauradas")
+
+            for callback in self.on_reconnect_callbacks:
+                try:
+                    callback(disconnected_at, reconnected_at)
+                except Exception as e:
+                    logging.error(f"❌ Error en callback de reconexión: {e}")
+
+    def _on_close(self, ws, close_status_code, close_msg):
+        logging.info("🔌 WebSocket cerrado")
+        self.is_connected = False
+        if self.disconnected_at is None:
+            self.disconnected_at = time.time()
+
+        for callback in self.on_close_callbacks:
+            callback()
+
+    def _on_error(self, ws, error):
+        logging.error(f"❌ Error WebSocket: {error}")
+
+    def _on_message(self, ws, message):
+        # Marca de llegada del frame: la etapa tick_receive cubre decode + consumidores
+        self.frame_received_ns = metrics.stamp()
+        try:
+            data = json.loads(message)
+
+            # El servidor puede agrupar varias actualizaciones en un frame
+            for item in data if isinstance(data, list) else (data,):
+                handler = self.handlers.get(item.get("type"))
+                if handler:
+                    handler(item)
+
+        except Exception as e:
+            logging.error(f"❌ Error procesando mensaje WS: {e}")
+
+    def handle_price_update(self, data):
+        """Despachar un tick a los consumidores del activo y a los globales"""
+        asset_id = data.get("asset_id")
+        price = data.get("price")
+        if not asset_id or not price:
+            return
+
+        received_ns = self.frame_received_ns or metrics.stamp()
+        if self.awaiting_first_tick:
+            self.awaiting_first_tick = False
+            self.attempt = 0
+            self.metrics["reconnect_to_first_tick"] = time.monotonic() - self.connect_started
+            logging.info(f"⏱️ Primer tick {self.metrics['reconnect_to_first_tick']*1000:.0f}ms después de conectar")
+
+        for consumer in self.consumers.get(asset_id, []) + self.consumers.get(ALL_ASSETS, []):
+            try:
+                consumer(asset_id, price, data)
+            except Exception as e:
+                logging.error(f"❌ Error en consumidor {asset_id}: {e}")
+
+        metrics.record_since("tick_receive", received_ns, asset=asset_id)
+
+    def handle_ack(self, data):
+        logging.info(f"📡 {data.get('type')}: {data.get('assets', '')}")
+
+    def handle_error(self, data):
+        logging.error(f"❌ Error del servidor WS: {data.get('message', data)}")
@@ -5,6 +5,7 @@ Versión de prueba para validar funcionamiento
 """
 
 import sys
+import os
 import json
 import time
 import logging
@@ -16,8 +17,41 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.analysis.patternMatcher import CompiledPatternMatcher
+from src.analysis.patternTable import load_pattern_table, load_asset_pattern_tables, merge_patterns
+from src.analysis.payoutTracker import PayoutTracker
+from src.data.candleBuilder import CandleBuilder
+from src.data.priceBoard import PriceBoard, DEFAULT_BOARD_NAME
+from src.data.domPriceProbe import DomPriceProbe, DomTickFeed
+from src.connectors.cdpTickSource import CdpTickSource, enable_performance_logging
+from src.utils.timerScheduler import shared_scheduler
+from src.utils.serverClock import server_datetime
+from src.execution.latencyModel import shared_latency_model, SELENIUM_CLICK
+from src.utils.latencyMetrics import metrics
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
 
+# Payout del activo abierto en la ventana: primer porcentaje 50-100 junto a una etiqueta de pago
+PAYOUT_READ_JS = r"""
+var LABEL = /payout|pago|profit|ganancia|rentabilidad/i;
+var PERCENT = /\+?(\d{1,3})\s*%/;
+var elements = document.body.getElementsByTagName('*');
+for (var i = 0; i < elements.length; i++) {
+    var el = elements[i];
+    var raw = el.textContent;
+    if (!raw || raw.length > 60 || raw.indexOf('%') === -1 || el.childElementCount > 3) { continue; }
+    if (!LABEL.test(raw + ' ' + el.getAttribute('class'))) { continue; }
+    var match = raw.match(PERCENT);
+    if (!match) { continue; }
+    var payout = parseInt(match[1], 10);
+    if (payout >= 50 && payout <= 100) { return payout; }
+}
+return null;
+"""
+
 class QuotexDual:
     def __init__(self):
         self.drivers = {}
@@ -28,6 +62,13 @@ class QuotexDual:
         # SOLO 1 ACTIVO PARA PRUEBA
         self.pairs = ["UK BRENT"]
         
+        # Ventanas abiertas; self.pairs se reduce a las que superan el umbral de EV (PayoutTracker).
+        # Todas las ventanas siguen alimentando velas: solo se omite la generación de señales
+        self.window_pairs = list(self.pairs)
+        self.payout_tracker = None
+        self.payout_scan_interval = 30
+        self.last_payout_scan = float("-inf")
+        
         # Historial de velas AMPLIADO para análisis robusto
         self.candle_history = {pair: deque(maxlen=20) for pair in self.pairs}
         
@@ -78,6 +119,150 @@ class QuotexDual:
             "ETH": {"ADA": 0.78, "MICROSOFT": 0.42, "UK BRENT": 0.25}
         }
         
+        # Completar con probabilidades minadas si existe la tabla (patternMiner.py)
+        self.mined_lengths = (3, 4, 5, 7)
+        mined_patterns = load_pattern_table(lengths=self.mined_lengths)
+        self.patterns_3 = merge_patterns(self.patterns_3, mined_patterns.get(3))
+        self.patterns_4 = merge_patterns(self.patterns_4, mined_patterns.get(4))
+        self.patterns_5 = merge_patterns(self.patterns_5, mined_patterns.get(5))
+        self.patterns_7 = merge_patterns(self.patterns_7, mined_patterns.get(7))
+        
+        # Umbrales de decisión de generate_signal
+        self.signal_threshold = 0.78  # Probabilidad mínima para ejecutar
+        self.max_probability = 0.98   # Tope tras boosts de tendencia/correlación
+        
+        # Motor compilado: una consulta de tabla por vela para todas las longitudes
+        # (el orden define la prioridad en caso de empate de probabilidad)
+        self.pattern_matcher = CompiledPatternMatcher([
+            ("4_candles", self.patterns_4),
+            ("7_candles_premium", self.patterns_7),
+            ("5_candles_advanced", self.patterns_5),
+            ("3_candles_basic", self.patterns_3),
+        ], max_history=20)
+        
+        # Velas OHLC reales construidas desde los ticks (el historial se alimenta de velas cerradas)
+        self.candle_timeframe = 60
+        self.last_prices = {}
+        self.last_closed_candle = {}
+        
+        # Señales por par para el minuto siguiente (se generan al cerrar la vela, se ejecutan en el segundo 58)
+        self.pending_signals = {}
+        self.candle_builder = CandleBuilder(on_candle=self.on_candle_closed)
+        
+        # Lectura de precio en la página: función instalada una vez por documento
+        self.price_probe = DomPriceProbe()
+        self.price_ranges = {
+            "UK BRENT": (40, 150),
+            "MICROSOFT": (300, 500),
+            "ADA": (0.2, 2.0),
+            "ETH": (2000, 4000)
+        }
+        
+        # Ticks del WebSocket de la propia sesión leídos por CDP (IDs OTC del broker)
+        self.asset_ids = {
+            "UK BRENT": "BRENT_otc",
+            "MICROSOFT": "MSFT_otc",
+            "ADA": "ADA_otc",
+            "ETH": "ETH_otc"
+        }
+        self.cdp_sources = {}
+        
+        # Tablas minadas propias de cada activo (si el minero las generó) sobre los patrones generales
+        for pair, asset_patterns in load_asset_pattern_tables(self.asset_ids, lengths=self.mined_lengths).items():
+            self.pattern_matcher.compile_asset(pair, [
+                ("4_candles", merge_patterns(self.patterns_4, asset_patterns.get(4))),
+                ("7_candles_premium", merge_patterns(self.patterns_7, asset_patterns.get(7))),
+                ("5_candles_advanced", merge_patterns(self.patterns_5, asset_patterns.get(5))),
+                ("3_candles_basic", merge_patterns(self.patterns_3, asset_patterns.get(3))),
+            ])
+        
+        # Ticks del navegador: MutationObserver en la página, vaciado en lote cada intervalo
+        self.tick_feeds = {}
+        self.tick_feed_interval = 1.0
+        
+        # Pizarra compartida de precios (proceso feed aparte); None = leer del navegador
+        self.price_board = None
+        self.price_board_max_age = 2.0
+        
+        # Latencia medida del click: las órdenes se adelantan para entrar en el segundo 00
+        self.latency_model = shared_latency_model()
+        
+    def attach_price_board(self, name=DEFAULT_BOARD_NAME):
+        """Leer precios de la pizarra en memoria compartida publicada por priceBoard.py"""
+        try:
+            self.price_board = PriceBoard.attach(name)
+            logging.info(f"📋 Pizarra de precios '{name}' conectada")
+            return True
+        except FileNotFoundError:
+            logging.warning(f"⚠️ Pizarra de precios '{name}' no encontrada - usando navegador")
+            return False
+        
+    def attach_payout_tracker(self, tracker):
+        """Analizar solo los activos cuyo payout vigente supera el umbral de EV"""
+        self.payout_tracker = tracker
+        tracker.subscribe(self.on_ranked_assets)
+    
+    def read_window_payouts(self):
+        """(par, payout, timeframe) del activo de cada ventana abierta, un execute_script por ventana"""
+        rows = []
+        for pair in self.window_pairs:
+            driver = self.drivers.get(pair)
+            if not driver:
+                continue
+            try:
+                payout = driver.execute_script(PAYOUT_READ_JS)
+            except Exception as e:
+                logging.info(f"🔍 {pair}: Payout no disponible: {e}")
+                continue
+            if payout:
+                rows.append((pair, payout, "1m"))
+        return rows
+    
+    def refresh_payouts(self, force=False):
+        """Actualizar el tracker con los payouts de las ventanas (en el hilo del loop: los drivers no son thread-safe)"""
+        if not self.payout_tracker:
+            return
+        
+        now = time.monotonic()
+        if not force and now - self.last_payout_scan < self.payout_scan_interval:
+            return
+        self.last_payout_scan = now
+        self.payout_tracker.update_rows(self.read_window_payouts())
+    
+    def on_ranked_assets(self, ranked):
+        """Recibir el ranking del tracker y reordenar/filtrar los pares que generan señales"""
+        rank = {asset: index for index, (asset, _, _) in enumerate(ranked)}
+        
+        eligible = []
+        for pair in self.window_pairs:
+            keys = (pair, self.asset_ids.get(pair))
+            position = min((rank[key] for key in keys if key in rank), default=None)
+            if position is not None:
+                eligible.append((position, pair))
+            elif not any(key and self.payout_tracker.known(key) for key in keys):
+                # Sin dato de payout no se descarta el activo
+                eligible.append((len(rank), pair))
+        
+        pairs = [pair for _, pair in sorted(eligible)]
+        if pairs != self.pairs:
+            logging.info(f"💹 Pares analizados por payout: {pairs or 'ninguno'}")
+            self.pairs = pairs
+    
+    def push_candle(self, pair, direction):
+        """Agregar vela al historial y al motor de patrones"""
+        self.candle_history[pair].append(direction)
+        self.pattern_matcher.push(pair, direction)
+    
+    def on_candle_closed(self, candle):
+        """Recibir vela cerrada del constructor y agregarla al historial"""
+        pair = candle["asset"]
+        if candle["timeframe"] != self.candle_timeframe or pair not in self.candle_history:
+            return
+        
+        self.push_candle(pair, candle["direction"])
+        self.last_closed_candle[pair] = candle
+        logging.info(f"🕯️ {pair}: Vela cerrada O={candle['open']} C={candle['close']} = {candle['direction']} ({candle['ticks']} ticks)")
+    
     def setup_chrome_for_pair(self, pair):
         """Configurar Chrome para un par específico"""
         try:
@@ -115,6 +300,9 @@ class QuotexDual:
             options.add_argument("--disable-domain-reliability")
             options.add_argument("--disable-component-update")
             
+            # Log de performance con eventos de red: fuente de ticks del WebSocket de la sesión (CDP)
+            enable_performance_logging(options)
+            
             # INTENTAR DIFERENTES VERSIONES DE CHROME
             driver = None
             chrome_versions = [141, 140, 139, None]  # Probar diferentes versiones
@@ -165,6 +353,12 @@ class QuotexDual:
                 driver.set_window_size(800, 600)
             
             self.drivers[pair] = driver
+            
+            # Tap de los frames del WebSocket de Quotex de esta ventana
+            tick_source = CdpTickSource(driver, assets={self.asset_ids.get(pair, pair): pair})
+            if tick_source.start():
+                self.cdp_sources[pair] = tick_source
+            
             logging.info(f"✅ Chrome {pair} configurado en posición {positions.get(pair)}")
             return True
             
@@ -458,7 +652,7 @@ class QuotexDual:
         try:
             logging.info("🌐 CONFIGURANDO 1 VENTANA...")
             
-            for pair in self.pairs:
+            for pair in self.window_pairs:
                 if not self.setup_chrome_for_pair(pair):
                     return False
                 time.sleep(2)  # Pausa entre ventanas
@@ -880,201 +1074,35 @@ class QuotexDual:
             # PASO 2: Esperar a que cargue el precio del activo
             time.sleep(2)
             
-            # JavaScript mejorado para extraer datos REALES del activo específico
-            js_code = """
-            try {
-                let result = {
-                    prices: [],
-                    elements: [],
-                    success: false,
-                    debug: []
-                };
-                
-                // 1. BUSCAR PRECIOS DE ACTIVOS ESPECÍFICOS (NO PAYOUTS)
-                let allElements = document.querySelectorAll('*');
-                let pricePattern = /\\b\\d{1,6}\\.\\d{2,6}\\b/g;
-                let assetPrices = [];
-                
-                for (let element of allElements) {
-                    let text = element.textContent || element.innerText || '';
-                    if (text && text.length < 100 && text.length > 2) {
-                        
-                        // FILTRAR PAYOUTS Y ELEMENTOS NO DESEADOS
-                        let isUnwanted = text.toLowerCase().includes('pago') || 
-                                        text.toLowerCase().includes('payout') || 
-                                        text.toLowerCase().includes('su pago') ||
-                                        text.toLowerCase().includes('your payout') ||
-                                        text.includes('1.88') ||
-                                        text.includes('1.77') ||
-                                        text.includes('%') ||
-                                        text.toLowerCase().includes('profit') ||
-                                        text.toLowerCase().includes('ganancia');
-                        
-                        if (!isUnwanted && element.offsetParent !== null) { // Solo elementos visibles
-                            let matches = text.match(pricePattern);
-                            if (matches) {
-                                for (let match of matches) {
-                                    let price = parseFloat(match);
-                                    
-                                    // RANGOS ESPECÍFICOS PARA CADA TIPO DE ACTIVO
-                                    let isValidPrice = false;
-                                    let assetType = 'unknown';
-                                    
-                                    if (price >= 60 && price <= 100) {
-                                        assetType = 'oil_brent';  // UK BRENT
-                                        isValidPrice = true;
-                                    } else if (price >= 300 && price <= 500) {
-                                        assetType = 'stock_msft';  // MICROSOFT
-                                        isValidPrice = true;
-                                    } else if (price >= 0.2 && price <= 2.0) {
-                                        assetType = 'crypto_ada';  // ADA
-                                        isValidPrice = true;
-                                    } else if (price >= 2000 && price <= 4000) {
-                                        assetType = 'crypto_eth';  // ETH
-                                        isValidPrice = true;
-                                    } else if (price >= 70 && price <= 90) {
-                                        assetType = 'forex_inr';  // USDINR
-                                        isValidPrice = true;
-                                    } else if (price >= 25 && price <= 35) {
-                                        assetType = 'forex_egp';  // USDEGP
-                                        isValidPrice = true;
-                                    }
-                                    
-                                    if (isValidPrice) {
-                                        assetPrices.push({
-                                            price: price,
-                                            text: text.trim(),
-                                            className: element.className,
-                                            tagName: element.tagName,
-                                            visible: true,
-                                            assetType: assetType,
-                                            confidence: 'high'
-                                        });
-                                    }
-                                }
-                            }
-                        }
-                    }
-                }
-                
-                result.debug.push('Asset prices found: ' + assetPrices.length);
-                
-                // 2. BUSCAR EN ELEMENTOS CON CLASES ESPECÍFICAS DE PRECIOS
-                let priceSelectors = [
-                    '[class*="price"]',
-                    '[class*="rate"]',
-                    '[class*="quote"]',
-                    '[class*="value"]',
-                    '[data-price]',
-                    '.current-price',
-                    '.asset-price',
-                    '.quote-price'
-                ];
-                
-                for (let selector of priceSelectors) {
-                    try {
-                        let elements = document.querySelectorAll(selector);
-                        for (let element of elements) {
-                            let text = element.textContent || element.innerText || '';
-                            if (text && !text.includes('1.88') && !text.includes('%')) {
-                                let matches = text.match(pricePattern);
-                                if (matches) {
-                                    for (let match of matches) {
-                                        let price = parseFloat(match);
-                                        if (price > 0.1 && price < 10000) {
-                                            assetPrices.push({
-                                                price: price,
-                                                text: text.trim(),
-                                                selector: selector,
-                                                visible: element.offsetParent !== null,
-                                                confidence: 'medium'
-                                            });
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    } catch (e) {
-                        result.debug.push('Error with selector ' + selector + ': ' + e.message);
-                    }
-                }
+            # Una sola llamada: window.__qxPrice() lee los nodos ya localizados en la página
+            low, high = self.price_ranges.get(pair, (0.1, 10000))
+            result = self.price_probe.read(driver, pair, low, high)
+            
+            if result:
+                current_price = result["price"]
+                previous_price = result.get("previous")
                 
-                // 3. FILTRAR Y ORDENAR PRECIOS
-                if (assetPrices.length > 0) {
-                    // Eliminar duplicados
-                    let uniquePrices = [];
-                    let seenPrices = new Set();
-                    
-                    for (let priceData of assetPrices) {
-                        let key = priceData.price.toString();
-                        if (!seenPrices.has(key)) {
-                            seenPrices.add(key);
-                            uniquePrices.push(priceData);
-                        }
-                    }
-                    
-                    // Ordenar por confianza y visibilidad
-                    uniquePrices.sort((a, b) => {
-                        if (a.confidence === 'high' && b.confidence !== 'high') return -1;
-                        if (a.confidence !== 'high' && b.confidence === 'high') return 1;
-                        if (a.visible && !b.visible) return -1;
-                        if (!a.visible && b.visible) return 1;
-                        return 0;
-                    });
-                    
-                    result.prices = uniquePrices;
-                    result.success = true;
-                }
+                # Determinar dirección respecto al último precio distinto leído en la página
+                direction = "UP"
+                if previous_price:
+                    direction = "UP" if current_price > previous_price else "DOWN"
+                    change_percent = ((current_price - previous_price) / previous_price) * 100
+                else:
+                    change_percent = 0
                 
-                result.debug.push('Final unique prices: ' + result.prices.length);
-                return result;
+                logging.info(f"📊 {pair}: {current_price:.6f} ({direction}) REAL [{result.get('type', 'unknown')}]")
                 
-            } catch (error) {
                 return {
-                    success: false,
-                    error: error.message,
-                    stack: error.stack
-                };
-            }
-            """
-            
-            # Ejecutar JavaScript
-            result = driver.execute_script(js_code)
-            
-            if result and result.get("success") and result.get("prices"):
-                prices_data = result["prices"]
-                
-                if prices_data:
-                    # Tomar el precio más confiable
-                    best_price_data = prices_data[0]
-                    current_price = best_price_data["price"]
-                    
-                    # Buscar precio anterior si hay más de uno
-                    previous_price = None
-                    if len(prices_data) > 1:
-                        previous_price = prices_data[1]["price"]
-                    
-                    # Determinar dirección
-                    direction = "UP"
-                    if previous_price:
-                        direction = "UP" if current_price > previous_price else "DOWN"
-                        change_percent = ((current_price - previous_price) / previous_price) * 100
-                    else:
-                        change_percent = 0
-                    
-                    logging.info(f"📊 {pair}: {current_price:.6f} ({direction}) REAL [{best_price_data.get('assetType', 'unknown')}]")
-                    
-                    return {
-                        "current_price": current_price,
-                        "previous_price": previous_price,
-                        "direction": direction,
-                        "change_percent": change_percent,
-                        "source": "quotex_real",
-                        "asset_type": best_price_data.get("assetType", "unknown"),
-                        "confidence": best_price_data.get("confidence", "medium"),
-                        "total_prices_found": len(prices_data),
-                        "navigation_success": navigation_success
-                    }
+                    "current_price": current_price,
+                    "previous_price": previous_price,
+                    "direction": direction,
+                    "change_percent": change_percent,
+                    "source": "quotex_real",
+                    "asset_type": result.get("type", "unknown"),
+                    "confidence": "high" if result.get("visible", True) else "medium",
+                    "total_prices_found": result.get("nodes", 1),
+                    "navigation_success": navigation_success
+                }
             
             # Si no encuentra precios después de navegación, devolver None
             logging.warning(f"⚠️ {pair}: No se encontraron precios REALES después de navegación")
@@ -1085,8 +1113,20 @@ class QuotexDual:
             return None
     
     def detect_candle_direction(self, pair):
-        """Detectar dirección de vela basada en precios REALES usando API de Quotex"""
+        """Alimentar el constructor de velas con el precio REAL y devolver la dirección de la vela que cerró"""
         try:
+            # Frames del WebSocket de la sesión: precios exactos del broker sin leer el DOM
+            if not self.price_board and pair in self.cdp_sources:
+                direction = self.drain_cdp_ticks(pair)
+                if self.cdp_sources[pair].streaming:
+                    return direction
+            
+            # Navegador como única fuente: todos los ticks observados en la página, en un lote
+            if not self.price_board and pair in self.drivers:
+                direction = self.drain_page_ticks(pair)
+                if self.tick_feeds[pair].watching:
+                    return direction
+            
             # USAR API DE QUOTEX PARA OBTENER PRECIOS REALES
             current_price = self.get_quotex_price_via_api(pair)
             
@@ -1094,38 +1134,65 @@ class QuotexDual:
                 logging.warning(f"⚠️ {pair}: No se pudo obtener precio de API")
                 return None
             
-            if current_price:
-                # Comparar con precio anterior si existe
-                if hasattr(self, 'last_prices') and pair in self.last_prices:
-                    last_price = self.last_prices[pair]
-                    if current_price > last_price:
-                        direction = "UP"
-                    elif current_price < last_price:
-                        direction = "DOWN"
-                    else:
-                        direction = "UP"  # Default si no hay cambio
-                    
-                    logging.info(f"📊 {pair}: {last_price} → {current_price} = {direction}")
-                else:
-                    # Primera vez, usar dirección aleatoria
-                    import random
-                    direction = "UP" if random.random() > 0.5 else "DOWN"
-                    logging.info(f"📊 {pair}: Primera detección = {direction}")
-                
-                # Guardar precio actual
-                if not hasattr(self, 'last_prices'):
-                    self.last_prices = {}
-                self.last_prices[pair] = current_price
-                
-                return direction
-            else:
-                logging.warning(f"⚠️ {pair}: No se pudo detectar precio")
-                return None
+            # Guardar precio actual
+            self.last_prices[pair] = current_price
+            
+            # La dirección sale de open/close de la vela cerrada, no de dos lecturas consecutivas
+            for candle in self.candle_builder.add_tick(pair, current_price):
+                if candle["timeframe"] == self.candle_timeframe:
+                    return candle["direction"]
+            
+            return None
             
         except Exception as e:
             logging.error(f"❌ Error obteniendo datos REALES {pair}: {e}")
             return None
     
+    def drain_page_ticks(self, pair):
+        """Pasar al constructor de velas los ticks acumulados por el observador de la página"""
+        feed = self.tick_feeds.get(pair)
+        if feed is None:
+            low, high = self.price_ranges.get(pair, (0.1, 10000))
+            feed = self.tick_feeds[pair] = DomTickFeed(
+                self.drivers[pair], pair, low, high, self.tick_feed_interval, probe=self.price_probe
+            )
+        
+        try:
+            ticks = feed.drain()
+        except Exception as e:
+            logging.info(f"🔍 {pair}: Observador de precio no disponible: {e}")
+            feed.watching = False
+            return None
+        
+        return self.feed_ticks(pair, [(pair, price, timestamp) for price, timestamp in ticks])
+    
+    def drain_cdp_ticks(self, pair):
+        """Pasar al constructor de velas las cotizaciones de los frames WebSocket capturados por CDP"""
+        try:
+            ticks = self.cdp_sources[pair].poll()
+        except Exception as e:
+            logging.info(f"🔍 {pair}: Tap CDP no disponible: {e}")
+            self.cdp_sources.pop(pair, None)
+            return None
+        
+        return self.feed_ticks(pair, ticks)
+    
+    def feed_ticks(self, pair, ticks):
+        """Agregar un lote de (activo, precio, timestamp) y devolver la dirección de la vela del par que cerró"""
+        closed = []
+        for asset, price, timestamp in ticks:
+            self.last_prices[asset] = price
+            closed.extend(self.candle_builder.add_tick(asset, price, timestamp))
+        
+        # Sin cambios de precio la vela se cierra por tiempo (con margen para los ticks aún en camino)
+        closed.extend(self.candle_builder.flush(time.time() - self.tick_feed_interval, asset=pair))
+        
+        direction = None
+        for candle in closed:
+            if candle["asset"] == pair and candle["timeframe"] == self.candle_timeframe:
+                direction = candle["direction"]
+        return direction
+    
     def get_quotex_price_via_api(self, pair):
         """Obtener precio real usando API/WebSocket de Quotex"""
         try:
@@ -1134,36 +1201,25 @@ class QuotexDual:
             import time
             import math
             
-            # MÉTODO 1: Intentar obtener precio via JavaScript injection
+            # MÉTODO 0: Pizarra compartida del proceso feed (IDs del stream usan "_" en lugar de espacios)
+            if self.price_board:
+                price = self.price_board.latest_price(pair.replace(" ", "_"), self.price_board_max_age)
+                if price:
+                    return price
+            
+            # MÉTODO 1: Variables globales de Quotex y nodos de precio, en un solo execute_script
+            dom_result = None
             try:
                 driver = self.drivers[pair]
+                low, high = self.price_ranges.get(pair, (0.1, 10000))
+                dom_result = self.price_probe.read(driver, pair, low, high)
                 
-                # Inyectar JavaScript para obtener precio del WebSocket
-                price_script = """
-                try {
-                    // Buscar precio en variables globales de Quotex
-                    if (window.quotexData && window.quotexData.currentPrice) {
-                        return window.quotexData.currentPrice;
-                    }
-                    
-                    // Buscar en WebSocket data
-                    if (window.wsData && window.wsData.quotes) {
-                        return window.wsData.quotes.price;
-                    }
-                    
-                    return null;
-                } catch(e) {
-                    return null;
-                }
-                """
-                
-                price = driver.execute_script(price_script)
-                if price and isinstance(price, (int, float)) and 40 < price < 150:
-                    logging.info(f"💰 {pair}: Precio API (JS) = {price}")
-                    return price
+                if dom_result and dom_result["source"] == "global":
+                    logging.info(f"💰 {pair}: Precio API (JS {dom_result['type']}) = {dom_result['price']}")
+                    return dom_result["price"]
                     
             except Exception as e:
-                logging.info(f"🔍 {pair}: JavaScript injection falló: {e}")
+                logging.info(f"🔍 {pair}: Lectura de precio en la página falló: {e}")
             
             # MÉTODO 2: API externa REAL para UK BRENT
             try:
@@ -1182,139 +1238,10 @@ class QuotexDual:
             except Exception as e:
                 logging.info(f"🔍 {pair}: API externa falló: {e}")
             
-            # MÉTODO 3: Usar precio del navegador con JavaScript más agresivo
-            try:
-                driver = self.drivers[pair]
-                
-                # JavaScript para DEBUGGEAR y encontrar precio DINÁMICO REAL
-                aggressive_script = """
-                try {
-                    let results = [];
-                    
-                    // MÉTODO 1: Buscar en WebSocket o variables globales
-                    if (typeof window.quotexApp !== 'undefined' && window.quotexApp.currentPrice) {
-                        results.push({type: 'websocket', price: window.quotexApp.currentPrice});
-                    }
-                    
-                    // MÉTODO 2: Buscar elementos que contengan "BRENT" y precio cerca
-                    const brentElements = document.querySelectorAll('*');
-                    for (let el of brentElements) {
-                        if (el.textContent && el.textContent.includes('BRENT')) {
-                            // Buscar en el mismo contenedor
-                            const container = el.closest('div, section, article');
-                            if (container) {
-                                const priceElements = container.querySelectorAll('*');
-                                for (let priceEl of priceElements) {
-                                    const text = priceEl.textContent || priceEl.innerText;
-                                    if (text && text.match(/^\\d{2,3}\\.\\d{2,3}$/)) {
-                                        const price = parseFloat(text);
-                                        if (price > 40 && price < 150) {
-                                            results.push({
-                                                type: 'near_brent', 
-                                                price: price,
-                                                element: priceEl.tagName,
-                                                class: priceEl.className,
-                                                id: priceEl.id
-                                            });
-                                        }
-                                    }
-                                }
-                            }
-                        }
-                    }
-                    
-                    // MÉTODO 3: Buscar elementos con clases relacionadas a precio
-                    const priceSelectors = [
-                        '[class*="price"]',
-                        '[class*="rate"]', 
-                        '[class*="quote"]',
-                        '[class*="value"]',
-                        '[class*="amount"]',
-                        '[data-testid*="price"]',
-                        '[data-price]'
-                    ];
-                    
-                    for (let selector of priceSelectors) {
-                        const elements = document.querySelectorAll(selector);
-                        for (let el of elements) {
-                            const text = el.textContent || el.innerText;
-                            if (text && text.match(/^\\d{2,3}\\.\\d{2,3}$/)) {
-                                const price = parseFloat(text);
-                                if (price > 40 && price < 150) {
-                                    results.push({
-                                        type: 'class_' + selector,
-                                        price: price,
-                                        element: el.tagName,
-                                        class: el.className,
-                                        id: el.id,
-                                        visible: el.offsetWidth > 0 && el.offsetHeight > 0
-                                    });
-                                }
-                            }
-                        }
-                    }
-                    
-                    // Devolver todos los resultados para debug
-                    if (results.length > 0) {
-                        return {debug: true, results: results, timestamp: Date.now()};
-                    }
-                    
-                    return null;
-                } catch(e) {
-                    return {error: e.message};
-                }
-                """
-                
-                result = driver.execute_script(aggressive_script)
-                
-                if result and isinstance(result, dict):
-                    if 'debug' in result and result['debug']:
-                        # MOSTRAR TODOS LOS PRECIOS ENCONTRADOS PARA DEBUG
-                        logging.info(f"🔍 {pair}: DEBUG - Encontrados {len(result['results'])} elementos con precios:")
-                        
-                        for i, item in enumerate(result['results']):
-                            logging.info(f"   {i+1}. Tipo: {item['type']} | Precio: {item['price']} | Elemento: {item.get('element', 'N/A')} | Clase: {item.get('class', 'N/A')[:50]} | Visible: {item.get('visible', 'N/A')}")
-                        
-                        # PRIORIZAR PRECIOS POR TIPO
-                        # 1. WebSocket (más confiable)
-                        for item in result['results']:
-                            if item['type'] == 'websocket':
-                                logging.info(f"💰 {pair}: Precio WebSocket REAL = {item['price']}")
-                                return item['price']
-                        
-                        # 2. Cerca de BRENT (contexto correcto)
-                        for item in result['results']:
-                            if item['type'] == 'near_brent' and item.get('visible', True):
-                                logging.info(f"💰 {pair}: Precio cerca de BRENT = {item['price']}")
-                                return item['price']
-                        
-                        # 3. Elementos con clases de precio visibles
-                        for item in result['results']:
-                            if item['type'].startswith('class_') and item.get('visible', True):
-                                logging.info(f"💰 {pair}: Precio por clase ({item['type']}) = {item['price']}")
-                                return item['price']
-                        
-                        # 4. Cualquier precio visible
-                        for item in result['results']:
-                            if item.get('visible', True):
-                                logging.info(f"💰 {pair}: Precio visible = {item['price']}")
-                                return item['price']
-                        
-                        # 5. Último recurso - cualquier precio
-                        if result['results']:
-                            first_price = result['results'][0]['price']
-                            logging.info(f"💰 {pair}: Precio (último recurso) = {first_price}")
-                            return first_price
-                    
-                    elif 'error' in result:
-                        logging.error(f"❌ {pair}: Error en JavaScript: {result['error']}")
-                
-                # Si no se encontró nada
-                logging.warning(f"⚠️ {pair}: No se encontraron precios en la página")
-                return None
-                    
-            except Exception as e:
-                logging.info(f"🔍 {pair}: JavaScript agresivo falló: {e}")
+            # MÉTODO 3: Precio leído del DOM en la misma llamada del método 1
+            if dom_result:
+                logging.info(f"💰 {pair}: Precio DOM ({dom_result['type']}) = {dom_result['price']}")
+                return dom_result["price"]
             
             # SI NO HAY PRECIO REAL - NO DEVOLVER NADA
             logging.error(f"❌ {pair}: NO se pudo obtener precio REAL - NO usando simulados")
@@ -1344,7 +1271,7 @@ class QuotexDual:
     def update_candle_history(self, pair, direction):
         """Actualizar historial"""
         if direction:
-            self.candle_history[pair].append(direction)
+            self.push_candle(pair, direction)
             logging.info(f"📈 {pair}: {direction} | Historial: {list(self.candle_history[pair])}")
     
     def analyze_sequence_pattern(self, pair):
@@ -1421,92 +1348,41 @@ class QuotexDual:
             # SOLO USAR DATOS REALES - NO POBLAR CON SIMULADOS
             logging.info(f"📊 {pair}: Historial actual: {len(self.candle_history[pair])} velas reales")
             
-            # SOLO DETECTAR DIRECCIÓN REAL - NO SIMULADOS
+            # SOLO VELAS REALES CERRADAS - el historial ya se actualizó en on_candle_closed
             real_direction = self.detect_candle_direction(pair)
             if real_direction:
-                self.candle_history[pair].append(real_direction)
                 logging.info(f"📊 {pair}: Nueva vela REAL = {real_direction}")
                 logging.info(f"📊 {pair}: Generando señal basada en datos REALES")
             else:
-                logging.warning(f"❌ {pair}: No se pudo detectar precio real - NO generando señal")
+                logging.info(f"⏳ {pair}: Sin vela cerrada nueva - NO generando señal")
                 return None
             
-            # ANÁLISIS MULTI-NIVEL con diferentes longitudes
+            # ANÁLISIS MULTI-NIVEL: 3, 4, 5 y 7 velas resueltas en una sola consulta
             best_signal = None
-            max_probability = 0
-            
-            # 1. Análisis de 4 velas (NUEVO - para historial actual)
-            if len(self.candle_history[pair]) >= 4:
-                recent_4 = tuple(list(self.candle_history[pair])[-4:])
-                logging.info(f"📊 {pair}: Patrón 4 velas = {recent_4}")
-                if recent_4 in self.patterns_4:
-                    probability, direction = self.patterns_4[recent_4]
-                    logging.info(f"🎯 {pair}: Patrón 4 encontrado! {recent_4} → {direction} ({probability*100:.0f}%)")
-                    if probability > max_probability:
-                        max_probability = probability
-                        best_signal = {
-                            "pattern": recent_4,
-                            "direction": direction,
-                            "probability": probability,
-                            "type": "4_candles",
-                            "pair": pair
-                        }
-            
-            # 2. Análisis de 7 velas (máxima precisión)
-            if len(self.candle_history[pair]) >= 7:
-                recent_7 = tuple(list(self.candle_history[pair])[-7:])
-                if recent_7 in self.patterns_7:
-                    probability, direction = self.patterns_7[recent_7]
-                    if probability > max_probability:
-                        max_probability = probability
-                        best_signal = {
-                            "pattern": recent_7,
-                            "direction": direction,
-                            "probability": probability,
-                            "analysis_type": "7_candles_premium"
-                        }
-            
-            # 2. Análisis de 5 velas (alta precisión)
-            if len(self.candle_history[pair]) >= 5:
-                recent_5 = tuple(list(self.candle_history[pair])[-5:])
-                if recent_5 in self.patterns_5:
-                    probability, direction = self.patterns_5[recent_5]
-                    if probability > max_probability:
-                        max_probability = probability
-                        best_signal = {
-                            "pattern": recent_5,
-                            "direction": direction,
-                            "probability": probability,
-                            "analysis_type": "5_candles_advanced"
-                        }
-            
-            # 3. Análisis de 3 velas (backup)
-            if len(self.candle_history[pair]) >= 3:
-                recent_3 = tuple(list(self.candle_history[pair])[-3:])
-                if recent_3 in self.patterns_3:
-                    probability, direction = self.patterns_3[recent_3]
-                    if probability > max_probability:
-                        max_probability = probability
-                        best_signal = {
-                            "pattern": recent_3,
-                            "direction": direction,
-                            "probability": probability,
-                            "analysis_type": "3_candles_basic"
-                        }
+            match = self.pattern_matcher.match(pair)
+            if match:
+                probability, direction, pattern, analysis_type = match
+                logging.info(f"🎯 {pair}: Patrón {analysis_type} encontrado! {pattern} → {direction} ({probability*100:.0f}%)")
+                best_signal = {
+                    "pattern": pattern,
+                    "direction": direction,
+                    "probability": probability,
+                    "analysis_type": analysis_type
+                }
             
             # 4. Análisis de tendencia (10 velas)
-            if len(self.candle_history[pair]) >= 10:
+            if self.pattern_matcher.count(pair) >= 10:
                 trend_boost = self.analyze_trend_strength(pair)
                 if best_signal and trend_boost > 0:
-                    best_signal["probability"] = min(best_signal["probability"] + trend_boost, 0.98)
+                    best_signal["probability"] = min(best_signal["probability"] + trend_boost, self.max_probability)
                     best_signal["trend_boost"] = trend_boost
             
             # Solo ejecutar señales de alta confianza
-            if best_signal and best_signal["probability"] >= 0.78:  # Umbral más alto
+            if best_signal and best_signal["probability"] >= self.signal_threshold:  # Umbral más alto
                 
                 # Boost por correlación con otros activos
                 correlation_boost = self.calculate_correlation_boost(pair, best_signal["direction"])
-                final_probability = min(best_signal["probability"] + correlation_boost, 0.98)
+                final_probability = min(best_signal["probability"] + correlation_boost, self.max_probability)
                 
                 pattern_str = str(best_signal["pattern"])
                 analysis_type = best_signal["analysis_type"]
@@ -1523,7 +1399,7 @@ class QuotexDual:
                     "correlation_boost": correlation_boost,
                     "timestamp": datetime.now(),
                     "data_source": "quotex_real_multi_candle",
-                    "current_price": getattr(self, 'last_prices', {}).get(pair, 0),
+                    "current_price": self.last_prices.get(pair, 0),
                     "price_change": 0
                 }
                 
@@ -1536,14 +1412,12 @@ class QuotexDual:
     def analyze_trend_strength(self, pair):
         """Analizar fuerza de tendencia en múltiples velas"""
         try:
-            if len(self.candle_history[pair]) < 10:
+            counts = self.pattern_matcher.trend_counts(pair, 10)
+            if not counts:
                 return 0
             
-            last_10 = list(self.candle_history[pair])[-10:]
-            
             # Contar tendencias
-            up_count = last_10.count("UP")
-            down_count = last_10.count("DOWN")
+            up_count, down_count = counts
             
             # Calcular fuerza de tendencia
             if up_count >= 8:  # Tendencia alcista muy fuerte
@@ -1561,8 +1435,8 @@ class QuotexDual:
             logging.error(f"❌ Error analizando tendencia {pair}: {e}")
             return 0
     
-    def execute_trade(self, pair, direction):
-        """Ejecutar operación en Quotex"""
+    def execute_trade(self, pair, direction, execute_at=None):
+        """Ejecutar operación en Quotex; con execute_at (epoch del broker) el click se adelanta su latencia medida"""
         try:
             if pair not in self.windows or not self.windows[pair].get("buttons"):
                 logging.error(f"❌ {pair}: Ventana no preparada para ejecutar")
@@ -1571,10 +1445,14 @@ class QuotexDual:
             # Obtener botones de la ventana
             buttons = self.windows[pair]["buttons"]
             
+            if execute_at is not None:
+                self.latency_model.wait_for_fire(execute_at, SELENIUM_CLICK)
+            
             # Ejecutar según dirección
             if direction == "UP" or direction == "CALL":
                 if "up" in buttons and buttons["up"]:
-                    buttons["up"].click()
+                    with self.latency_model.measure(SELENIUM_CLICK):
+                        buttons["up"].click()
                     logging.info(f"⚡ {pair} UP/CALL EJECUTADO")
                     return True
                 else:
@@ -1583,7 +1461,8 @@ class QuotexDual:
                     
             elif direction == "DOWN" or direction == "PUT":
                 if "down" in buttons and buttons["down"]:
-                    buttons["down"].click()
+                    with self.latency_model.measure(SELENIUM_CLICK):
+                        buttons["down"].click()
                     logging.info(f"⚡ {pair} DOWN/PUT EJECUTADO")
                     return True
                 else:
@@ -1625,8 +1504,9 @@ class QuotexDual:
             
             # Poblar el historial
             self.candle_history[pair].clear()
+            self.pattern_matcher.reset(pair)
             for direction in varied_pattern:
-                self.candle_history[pair].append(direction)
+                self.push_candle(pair, direction)
             
             logging.info(f"✅ {pair}: Historial generado - {len(varied_pattern)} velas")
             logging.info(f"📊 {pair}: Patrón = {list(self.candle_history[pair])[-5:]}")
@@ -1639,16 +1519,11 @@ class QuotexDual:
         try:
             logging.info("🔍 Escaneando 4 activos...")
             
-            # Escanear pares
-            for pair in self.pairs:
-                direction = self.detect_candle_direction(pair)
-                if direction:
-                    self.update_candle_history(pair, direction)
-            
-            # Generar señales
+            # Generar señales (cada llamada alimenta el constructor de velas del par)
             signals = {}
             for pair in self.pairs:
-                signal = self.generate_signal(pair)
+                with metrics.timer("pattern_eval", asset=pair):
+                    signal = self.generate_signal(pair)
                 if signal:
                     signals[pair] = signal
             
@@ -1865,23 +1740,8 @@ class QuotexDual:
     def schedule_quad_execution(self, signals, execute_time):
         """Programar ejecución quad - VERSIÓN ULTRA RÁPIDA"""
         try:
-            def execute_at_exact_time():
-                # Esperar hasta 100ms antes de la hora exacta
-                target_time = execute_time - timedelta(milliseconds=100)
-                while datetime.now() < target_time:
-                    time.sleep(0.01)  # Check cada 10ms
-                
-                # Esperar hasta el segundo exacto con precisión
-                while datetime.now() < execute_time:
-                    time.sleep(0.001)  # 1ms precision
-                
-                # EJECUTAR INMEDIATAMENTE
-                self.execute_quad_signals(signals)
-            
-            # Crear thread para ejecución automática
-            execution_thread = threading.Thread(target=execute_at_exact_time)
-            execution_thread.daemon = True
-            execution_thread.start()
+            # EJECUTAR en el segundo exacto desde el scheduler compartido (sin hilo por lote)
+            shared_scheduler().call_at(execute_time, self.execute_quad_signals, signals)
             
             logging.info("⏰ EJECUCIÓN QUAD PROGRAMADA")
             
@@ -1999,7 +1859,8 @@ class QuotexDual:
             # PRIMERA RONDA DE SEÑALES INMEDIATA
             immediate_signals = []
             for pair in self.pairs:
-                signal = self.generate_signal(pair)
+                with metrics.timer("pattern_eval", asset=pair):
+                    signal = self.generate_signal(pair)
                 if signal:
                     immediate_signals.append(signal)
                     logging.info(f"🎯 SEÑAL INMEDIATA: {pair} → {signal['direction']} ({signal['probability']*100:.0f}%)")
@@ -2016,7 +1877,8 @@ class QuotexDual:
             
             while True:
                 try:
-                    current_time = datetime.now()
+                    # Fases por el segundo del broker, que decide en qué vela entra la orden
+                    current_time = server_datetime()
                     current_minute = current_time.strftime("%H:%M")
                     current_second = current_time.second
                     
@@ -2025,24 +1887,24 @@ class QuotexDual:
                         next_minute = (current_time + timedelta(minutes=1)).strftime("%H:%M")
                         logging.info(f"🔍 {current_minute}:{current_second:02d} - DETECTANDO SEÑAL PARA {next_minute}")
                         
-                        # Generar señales para el próximo minuto
-                        next_signals = []
-                        for pair in self.pairs:
-                            # Actualizar historial con datos actuales
-                            direction = self.detect_candle_direction(pair)
-                            if direction:
-                                self.update_candle_history(pair, direction)
+                        # Generar señales para el próximo minuto: solo el poll en que cierra la vela
+                        # devuelve señal, las vueltas siguientes no deben borrarla
+                        for pair in self.window_pairs:
+                            if pair not in self.pairs:
+                                # Fuera del ranking de payout: solo alimentar las velas (sin huecos al volver)
+                                self.detect_candle_direction(pair)
+                                continue
                             
-                            # Generar señal para el próximo minuto
-                            signal = self.generate_signal(pair)
+                            # Generar señal para el próximo minuto (actualiza el historial al cerrar la vela):
+                            # la vela t cierra en M:00 y la orden opera t+2 en (M+1):00, el mismo
+                            # SIGNAL_HORIZON con el que se minan y evalúan los patrones
+                            with metrics.timer("pattern_eval", asset=pair):
+                                signal = self.generate_signal(pair)
                             if signal:
                                 signal['target_minute'] = next_minute
-                                next_signals.append(signal)
+                                self.pending_signals[pair] = signal
                                 logging.info(f"🎯 SEÑAL DETECTADA: {pair} → {signal['direction']} para {next_minute}")
                         
-                        # Guardar señales para ejecución
-                        self.pending_signals = next_signals
-                        
                         # NO ESPERAR AQUÍ - Continuar el loop para llegar a la fase de ejecución
                         wait_until_execution = 58 - current_second
                         if wait_until_execution > 0:
@@ -2051,13 +1913,27 @@ class QuotexDual:
                     
                     # FASE 2: EJECUTAR EN LOS SEGUNDOS 58-59
                     elif current_second >= 58:
-                        target_minute = current_time.strftime("%H:%M")
+                        # Las órdenes deben entrar en el segundo 00 del minuto siguiente
+                        deadline = current_time.replace(second=0, microsecond=0).timestamp() + 60
+                        target_minute = datetime.fromtimestamp(deadline).strftime("%H:%M")
+                        
+                        # Solo las señales generadas para este minuto (las de minutos pasados se descartan)
+                        due_signals = [signal for signal in self.pending_signals.values()
+                                       if signal['target_minute'] == target_minute and signal['pair'] in self.pairs]
+                        self.pending_signals = {}
                         
-                        if hasattr(self, 'pending_signals') and self.pending_signals:
-                            logging.info(f"🚀 {current_minute}:{current_second:02d} - EJECUTANDO OPERACIONES PARA {target_minute}")
+                        if due_signals:
+                            lead = self.latency_model.predict(SELENIUM_CLICK)
+                            logging.info(f"🚀 {current_minute}:{current_second:02d} - EJECUTANDO OPERACIONES PARA {target_minute} (anticipación {lead*1000:.0f}ms)")
+                            
+                            # Cada señal dispara en paralelo en deadline - latencia prevista del click
+                            results = {}
                             
-                            # Ejecutar todas las señales pendientes
-                            for signal in self.pending_signals:
+                            def execute_at_deadline(pair, direction):
+                                results[pair] = self.execute_trade(pair, direction, deadline)
+                            
+                            threads = []
+                            for signal in due_signals:
                                 pair = signal['pair']
                                 direction = signal['direction']
                                 probability = signal['probability']
@@ -2065,17 +1941,20 @@ class QuotexDual:
                                 logging.info(f"⚡ EJECUTANDO: {pair} {direction} ({probability*100:.0f}%) en {target_minute}")
                                 
                                 if pair in self.drivers:
-                                    success = self.execute_trade(pair, direction)
-                                    
-                                    if success:
-                                        logging.info(f"✅ {pair}: Operación ejecutada en {target_minute}")
-                                    else:
-                                        logging.warning(f"⚠️ {pair}: Error en ejecución")
-                                
-                                time.sleep(0.5)  # Breve pausa entre operaciones
+                                    thread = threading.Thread(target=execute_at_deadline, args=(pair, direction))
+                                    thread.start()
+                                    threads.append(thread)
+                            
+                            for thread in threads:
+                                thread.join()
                             
-                            # Limpiar señales ejecutadas
-                            self.pending_signals = []
+                            for pair, success in results.items():
+                                if success:
+                                    logging.info(f"✅ {pair}: Operación ejecutada en {target_minute}")
+                                else:
+                                    logging.warning(f"⚠️ {pair}: Error en ejecución")
+                            
+                            self.latency_model.save()
                             
                             # Esperar hasta el próximo minuto
                             wait_next_minute = 60 - current_second + 1
@@ -2086,7 +1965,10 @@ class QuotexDual:
                             time.sleep(2)
                     
                     else:
-                        # Estamos en segundos 31-57, esperar
+                        # Estamos en segundos 31-57: seguir alimentando las velas para que cubran el minuto entero
+                        for pair in self.window_pairs:
+                            self.detect_candle_direction(pair)
+                        self.refresh_payouts()
                         time.sleep(1)
                     
                 except KeyboardInterrupt:
@@ -2112,6 +1994,7 @@ class QuotexDual:
 def main():
     """Función principal"""
     bot = QuotexDual()
+    metrics.start_exporter("quotex_dual")
     
     try:
         # Setup SOLO 1 ventana
@@ -2125,6 +2008,10 @@ def main():
         if not bot.prepare_quad_windows():
             logging.warning("⚠️ Ventana no está preparada, continuando...")
         
+        # Solo generan señales los activos cuyo payout supera el umbral de EV
+        bot.attach_payout_tracker(PayoutTracker())
+        bot.refresh_payouts(force=True)
+        
         # Iniciar automatización con 1 ventana
         bot.run_quad_trading()
         
@@ -5,6 +5,7 @@ Detecta señales, espera la hora exacta y ejecuta automáticamente
 """
 
 import sys
+import os
 import json
 import time
 import logging
@@ -16,6 +17,13 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.analysis.patternTable import load_pattern_table, load_asset_pattern_tables, merge_patterns
+from src.utils.timerScheduler import shared_scheduler
+from src.utils.serverClock import server_datetime
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
 
 class QuotexFullAuto:
@@ -41,6 +49,23 @@ class QuotexFullAuto:
             ("UP", "UP", "UP"): (0.83, "DOWN"),
         }
         
+        # Completar con probabilidades minadas si existe la tabla (patternMiner.py);
+        # los activos con tabla propia usan sus cuentas en lugar de las globales
+        mined_patterns = load_pattern_table(lengths=(3,))
+        self.sequence_patterns = merge_patterns(self.sequence_patterns, mined_patterns.get(3))
+        self.asset_ids = {
+            "UK BRENT": "BRENT_otc",
+            "MICROSOFT": "MSFT_otc",
+            "ADA": "ADA_otc",
+            "ETH": "ETH_otc",
+            "USDINR": "USDINR_otc",
+            "USDEGP": "USDEGP_otc"
+        }
+        self.asset_sequence_patterns = {
+            pair: merge_patterns(self.sequence_patterns, asset_patterns.get(3))
+            for pair, asset_patterns in load_asset_pattern_tables(self.asset_ids, lengths=(3,)).items()
+        }
+        
         # Correlaciones
         self.correlations = {
             "UK BRENT": {"USDINR": -0.45, "USDEGP": -0.38, "ETH": 0.25},
@@ -196,13 +221,14 @@ class QuotexFullAuto:
                 return None, 0
             
             last_three = tuple(history[-3:])
+            patterns = self.asset_sequence_patterns.get(pair, self.sequence_patterns)
             
-            if last_three in self.sequence_patterns:
-                probability, direction = self.sequence_patterns[last_three]
+            if last_three in patterns:
+                probability, direction = patterns[last_three]
                 return direction, probability
             
             # Patrones similares
-            for pattern, (prob, dir) in self.sequence_patterns.items():
+            for pattern, (prob, dir) in patterns.items():
                 matches = sum(1 for i in range(3) if i < len(last_three) and last_three[i] == pattern[i])
                 if matches >= 2:
                     adjusted_prob = prob * 0.7
@@ -258,7 +284,7 @@ class QuotexFullAuto:
             combined_probability = min(combined_probability, 0.95)
             
             if combined_probability >= 0.75:
-                now = datetime.now()
+                now = server_datetime()
                 next_minute = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
                 
                 signal = {
@@ -369,22 +395,8 @@ class QuotexFullAuto:
     def schedule_automatic_execution(self, signals, execute_time):
         """Programar ejecución automática"""
         try:
-            def execute_at_exact_time():
-                # Esperar hasta la hora exacta
-                while datetime.now() < execute_time:
-                    time.sleep(0.1)
-                
-                # Esperar hasta el segundo exacto
-                while datetime.now().second != 0:
-                    time.sleep(0.001)
-                
-                # EJECUTAR AUTOMÁTICAMENTE
-                self.execute_signals_automatically(signals)
-            
-            # Crear thread para ejecución automática
-            execution_thread = threading.Thread(target=execute_at_exact_time)
-            execution_thread.daemon = True
-            execution_thread.start()
+            # EJECUTAR AUTOMÁTICAMENTE a la hora exacta (scheduler compartido, sin hilo por lote)
+            shared_scheduler().call_at(execute_time, self.execute_signals_automatically, signals)
             
             logging.info("⏰ EJECUCIÓN AUTOMÁTICA PROGRAMADA")
             
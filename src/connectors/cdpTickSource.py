@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+CDP Tick Source - Ticks del WebSocket de nuestra propia sesión de Chrome
+Lee los eventos Network.webSocketFrameReceived del log de performance
+(Chrome DevTools Protocol) del navegador ya logueado, decodifica los frames
+de socket.io con cotizaciones y entrega (activo, precio, timestamp del
+servidor): precios exactos en streaming sin tocar el DOM ni abrir conexiones
+"""
+
+import time
+import json
+import base64
+import logging
+
+from src.utils.serverClock import server_clock
+from src.utils.latencyMetrics import metrics
+
+# Eventos de socket.io que traen cotizaciones
+QUOTE_EVENTS = ("quotes/stream",)
+
+# Solo los WebSockets del broker (el resto del tráfico se ignora)
+DEFAULT_WS_HOSTS = ("qxbroker.com", "quotex")
+
+# Sin cotizaciones durante este tiempo se considera que el stream se cortó
+STREAM_TIMEOUT = 5.0
+
+
+def enable_performance_logging(options):
+    """Activar en las ChromeOptions el log de performance con eventos de red (antes de crear el driver)"""
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+    return options
+
+
+def _quote_rows(data):
+    """Filas [activo, timestamp, precio, ...] o dicts {asset, price, time} -> [(activo, precio, timestamp)]"""
+    rows = data if isinstance(data, list) else [data]
+    quotes = []
+    for row in rows:
+        if isinstance(row, list) and len(row) >= 3 and isinstance(row[0], str):
+            asset, timestamp, price = row[0], row[1], row[2]
+        elif isinstance(row, dict) and "asset" in row and "price" in row:
+            asset, timestamp, price = row["asset"], row.get("time") or row.get("timestamp"), row["price"]
+        else:
+            continue
+
+        try:
+            quotes.append((asset, float(price), float(timestamp) if timestamp else None))
+        except (TypeError, ValueError):
+            continue
+    return quotes
+
+
+def parse_quote_frame(payload, binary=False):
+    """Frame de socket.io (texto '42[...]' o adjunto binario '\\x04[...]') -> [(activo, precio, timestamp)]"""
+    if binary:
+        raw = base64.b64decode(payload)
+        if raw[:1] == b"\x04":
+            raw = raw[1:]
+        try:
+            return _quote_rows(json.loads(raw))
+        except ValueError:
+            return []
+
+    # Paquete de evento: prefijo numérico de engine.io/socket.io y luego ["evento", datos]
+    start = payload.find("[")
+    if start == -1 or not payload[:start].rstrip("-").isdigit():
+        return []
+    try:
+        message = json.loads(payload[start:])
+    except ValueError:
+        return []
+
+    if len(message) >= 2 and message[0] in QUOTE_EVENTS:
+        return _quote_rows(message[1])
+    return []
+
+
+class CdpTickSource:
+    def __init__(self, driver, assets=None, on_tick=None, interval=0.25, hosts=DEFAULT_WS_HOSTS):
+        self.driver = driver
+
+        # ID del broker -> nombre interno (None = todos con su ID)
+        self.assets = assets
+        self.on_tick = on_tick
+        self.interval = interval
+        self.hosts = hosts
+
+        # requestId de CDP de los WebSockets del broker
+        self.sockets = {}
+        self.active = False
+        self.last_poll = 0.0
+        self.last_quote_at = None
+        self.frames = 0
+        self.quotes = 0
+
+    def start(self):
+        """Habilitar el dominio Network de CDP (los frames llegan al log de performance)"""
+        try:
+            self.driver.execute_cdp_cmd("Network.enable", {})
+            self.active = True
+            logging.info("📡 Tap CDP de WebSocket activo")
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudo activar el tap CDP: {e}")
+            self.active = False
+        return self.active
+
+    @property
+    def streaming(self):
+        return self.last_quote_at is not None and time.time() - self.last_quote_at < STREAM_TIMEOUT
+
+    def poll(self, force=False):
+        """[(activo, precio, timestamp)] de los frames recibidos desde el último poll (un get_log por lote)"""
+        if not self.active:
+            return []
+
+        now = time.monotonic()
+        if not force and now - self.last_poll < self.interval:
+            return []
+        self.last_poll = now
+
+        ticks = []
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, ValueError):
+                continue
+
+            method = message.get("method")
+            params = message.get("params", {})
+
+            if method == "Network.webSocketCreated":
+                url = params.get("url", "")
+                if any(host in url for host in self.hosts):
+                    self.sockets[params.get("requestId")] = url
+                    logging.info(f"🔌 WebSocket del broker detectado: {url.split('?')[0]}")
+            elif method == "Network.webSocketClosed":
+                self.sockets.pop(params.get("requestId"), None)
+            elif method == "Network.webSocketFrameReceived":
+                # Sin el evento de creación (tap iniciado tarde) se acepta el frame si trae cotizaciones
+                if self.sockets and params.get("requestId") not in self.sockets:
+                    continue
+                self.frames += 1
+                response = params.get("response", {})
+                received_at = entry["timestamp"] / 1000 if "timestamp" in entry else time.time()
+                quotes = parse_quote_frame(response.get("payloadData", ""), binary=response.get("opcode") == 2)
+                ticks.extend(self._accept(quotes, received_at))
+
+        return ticks
+
+    def _accept(self, quotes, received_at):
+        accepted = []
+        for broker_id, price, timestamp in quotes:
+            asset = broker_id if self.assets is None else self.assets.get(broker_id)
+            if asset is None:
+                continue
+
+            if timestamp:
+                server_clock.observe_tick(timestamp, received_at)
+            timestamp = timestamp or received_at
+
+            self.quotes += 1
+            self.last_quote_at = time.time()
+            metrics.record("tick_receive", max(self.last_quote_at - received_at, 0.0), asset=asset)
+
+            accepted.append((asset, price, timestamp))
+            if self.on_tick:
+                try:
+                    self.on_tick(asset, price, timestamp)
+                except Exception as e:
+                    logging.error(f"❌ Error en consumidor de ticks CDP {asset}: {e}")
+
+        return accepted
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "streaming": self.streaming,
+            "sockets": len(self.sockets),
+            "frames": self.frames,
+            "quotes": self.quotes
+        }
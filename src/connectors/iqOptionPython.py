@@ -2,24 +2,63 @@
 """
 IQ Option Python Bridge
 Conecta con la API oficial de IQ Option para ejecutar operaciones reales
+Modo daemon (serve): sesión autenticada persistente con protocolo JSON-lines
+por stdin/stdout y peticiones en pipeline
 """
 
 import sys
+import os
 import json
 import time
 import logging
+import threading
+import subprocess
+import itertools
 import requests
+from concurrent.futures import ThreadPoolExecutor, Future
 from iqoptionapi.stable_api import IQ_Option
 
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.execution.latencyModel import shared_latency_model, IQ_BRIDGE
+from src.utils.latencyMetrics import metrics
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
 
+# CONVERTIR ASSETS OTC A FORMATO CORRECTO
+ASSET_MAPPING = {
+    "EURUSD-OTC": "EURUSD",
+    "GBPUSD-OTC": "GBPUSD", 
+    "USDJPY-OTC": "USDJPY",
+    "AUDUSD-OTC": "AUDUSD"
+}
+
+# Espera máxima de un check: bloquea hasta el vencimiento (opciones de hasta 5 minutos + margen)
+CHECK_TIMEOUT = 360
+
+# Revisión de los eventos de cierre del socket y tiempo máximo que se vigila una operación (segundos)
+CLOSE_WATCH_INTERVAL = 0.2
+CLOSE_WATCH_MAX_AGE = 600
+
 class IQOptionBridge:
     def __init__(self, email, password):
         self.email = email
         self.password = password
         self.api = None
         self.connected = False
+        self.connect_lock = threading.Lock()
+    
+    def ensure_connected(self):
+        """Reutilizar la sesión abierta; reconectar solo si se cayó"""
+        with self.connect_lock:
+            if self.connected and self.api and self.api.check_connect():
+                return {"success": True, "message": "Sesión activa"}
+            
+            logging.info("🔄 Sesión no disponible - reconectando...")
+            self.connected = False
+            return self.connect()
         
     def connect(self):
         """Conectar a IQ Option"""
@@ -72,16 +111,8 @@ class IQOptionBridge:
             if not self.connected:
                 return {"success": False, "message": "No conectado"}
             
-            # CONVERTIR ASSETS OTC A FORMATO CORRECTO
-            asset_mapping = {
-                "EURUSD-OTC": "EURUSD",
-                "GBPUSD-OTC": "GBPUSD", 
-                "USDJPY-OTC": "USDJPY",
-                "AUDUSD-OTC": "AUDUSD"
-            }
-            
             # Usar asset correcto
-            correct_asset = asset_mapping.get(asset, asset)
+            correct_asset = ASSET_MAPPING.get(asset, asset)
             logging.info(f"🔄 Convirtiendo {asset} → {correct_asset}")
             
             # Convertir dirección
@@ -116,6 +147,45 @@ class IQOptionBridge:
                 "message": f"Error: {str(e)}"
             }
     
+    def batch_buy(self, orders):
+        """Ejecutar varias operaciones en una sola petición (buy_multi) sobre la sesión abierta"""
+        try:
+            if not self.connected:
+                return {"success": False, "message": "No conectado"}
+            
+            amounts = [float(order["amount"]) for order in orders]
+            assets = [ASSET_MAPPING.get(order["asset"], order["asset"]) for order in orders]
+            actions = ["call" if order["direction"].upper() == "CALL" else "put" for order in orders]
+            durations = [int(order["duration"]) for order in orders]
+            
+            logging.info(f"🎯 Ejecutando lote de {len(orders)} operaciones...")
+            
+            if hasattr(self.api, "buy_multi"):
+                operation_ids = self.api.buy_multi(amounts, assets, actions, durations)
+            else:
+                operation_ids = []
+                for amount, asset, action, duration in zip(amounts, assets, actions, durations):
+                    check, operation_id = self.api.buy(amount, asset, action, duration)
+                    operation_ids.append(operation_id if check else None)
+            
+            results = []
+            for order, operation_id in zip(orders, operation_ids):
+                if operation_id:
+                    results.append({"success": True, "operation_id": operation_id, "asset": order["asset"]})
+                else:
+                    results.append({"success": False, "message": "Error ejecutando operación", "asset": order["asset"]})
+            
+            return {
+                "success": any(result["success"] for result in results),
+                "results": results
+            }
+            
+        except Exception as e:
+            return {
+                "success": False,
+                "message": f"Error: {str(e)}"
+            }
+    
     def check_result(self, operation_id):
         """Verificar resultado de operación"""
         try:
@@ -131,6 +201,363 @@ class IQOptionBridge:
                 "message": f"Error: {str(e)}"
             }
 
+    def check_results(self, operation_ids, history_limit=50):
+        """Resultados de varias operaciones sin bloquear: primero los eventos de cierre ya recibidos,
+        luego una sola consulta del historial para las que falten"""
+        results = {}
+        missing = []
+        
+        # Eventos option-closed que el socket ya entregó (sin ida y vuelta al servidor)
+        closed_events = self.closed_events()
+        for operation_id in operation_ids:
+            event = closed_events.get(operation_id)
+            if event:
+                results[operation_id] = self._closed_result(event.get("msg", event))
+            else:
+                missing.append(operation_id)
+        
+        if missing:
+            history = self.api.get_optioninfo_v2(max(history_limit, len(missing)))
+            closed_options = history.get("msg", {}).get("closed_options", []) if history else []
+            
+            wanted = set(missing)
+            for option in closed_options:
+                option_ids = option.get("id")
+                for operation_id in option_ids if isinstance(option_ids, list) else [option_ids]:
+                    if operation_id in wanted:
+                        results[operation_id] = self._closed_result(option)
+        
+        return results
+    
+    def closed_events(self):
+        """{id: evento} de los option-closed que el socket ya entregó"""
+        return getattr(getattr(self.api, "api", None), "socket_option_closed", None) or {}
+    
+    def closed_result(self, operation_id):
+        """{result, profit} si el broker ya anunció el cierre de la operación, si no None"""
+        event = self.closed_events().get(operation_id)
+        return self._closed_result(event.get("msg", event)) if event else None
+    
+    def _closed_result(self, option):
+        """Normalizar un cierre de IQ Option a {result, profit}"""
+        win = option.get("win") or option.get("result")
+        amount = float(option.get("sum", option.get("amount", 0)) or 0)
+        
+        if win == "win":
+            return {"result": "win", "profit": float(option.get("win_amount", 0) or 0) - amount}
+        if win == "equal":
+            return {"result": "equal", "profit": 0.0}
+        return {"result": "loss", "profit": -amount}
+
+class IQOptionBridgeDaemon:
+    """Proceso de larga vida: una línea JSON por petición, respuestas etiquetadas con su id"""
+    
+    # check_win_v3 bloquea hasta que vence la opción: estos comandos van a su propio pool
+    BLOCKING_COMMANDS = ("check", "check_result")
+    
+    def __init__(self, bridge, workers=4, check_workers=16, output=None):
+        self.bridge = bridge
+        self.output = output or sys.stdout
+        self.output_lock = threading.Lock()
+        
+        # Peticiones en pipeline: compras y consultas rápidas en un pool, los checks que esperan
+        # el vencimiento en otro, así nunca ocupan los hilos de las compras
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.check_executor = ThreadPoolExecutor(max_workers=check_workers)
+        
+        # Operaciones compradas por este daemon -> momento de compra; su cierre se anuncia como evento
+        self.watched = {}
+        self.watched_lock = threading.Lock()
+        self.running = False
+        
+        self.handlers = {
+            "ping": lambda request: {"success": True, "message": "pong"},
+            "connect": lambda request: self.bridge.ensure_connected(),
+            "balance": self.handle_balance,
+            "buy": self.handle_buy,
+            "batch_buy": self.handle_batch_buy,
+            "check": self.handle_check,
+            "check_result": self.handle_check,
+            "check_batch": self.handle_check_batch
+        }
+    
+    def send(self, message):
+        """Escribir una respuesta completa en una sola línea"""
+        line = json.dumps(message, default=str) + "\n"
+        with self.output_lock:
+            self.output.write(line)
+            self.output.flush()
+    
+    def serve(self, input_stream=None):
+        """Leer peticiones hasta EOF o 'shutdown'"""
+        input_stream = input_stream or sys.stdin
+        
+        connect_result = self.bridge.connect()
+        self.send({"event": "ready", **connect_result})
+        
+        self.running = True
+        watcher = threading.Thread(target=self._watch_closes, name="close-watcher", daemon=True)
+        watcher.start()
+        
+        for line in input_stream:
+            line = line.strip()
+            if not line:
+                continue
+            
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                self.send({"success": False, "message": f"JSON inválido: {e}"})
+                continue
+            
+            if request.get("command") == "shutdown":
+                self.send({"id": request.get("id"), "success": True, "message": "Cerrando bridge"})
+                break
+            
+            executor = self.check_executor if request.get("command") in self.BLOCKING_COMMANDS else self.executor
+            executor.submit(self.handle, request)
+        
+        self.executor.shutdown(wait=True)
+        self.check_executor.shutdown(wait=True)
+        self.running = False
+    
+    def watch(self, operation_id):
+        """Anunciar el cierre de la operación como evento sin que nadie lo consulte"""
+        if operation_id is not None:
+            with self.watched_lock:
+                self.watched[operation_id] = time.time()
+    
+    def unwatch(self, operation_ids):
+        with self.watched_lock:
+            for operation_id in operation_ids:
+                self.watched.pop(operation_id, None)
+    
+    def _watch_closes(self):
+        """Emitir {"event": "option_closed"} en cuanto el socket entrega el cierre de una operación vigilada"""
+        while self.running:
+            time.sleep(CLOSE_WATCH_INTERVAL)
+            with self.watched_lock:
+                watched = list(self.watched.items())
+            if not watched:
+                continue
+            
+            closed = []
+            now = time.time()
+            for operation_id, bought_at in watched:
+                try:
+                    outcome = self.bridge.closed_result(operation_id)
+                except Exception as e:
+                    logging.error(f"❌ Error leyendo cierre de {operation_id}: {e}")
+                    outcome = None
+                
+                if outcome is not None:
+                    self.send({"event": "option_closed", "operation_id": operation_id, **outcome})
+                    closed.append(operation_id)
+                elif now - bought_at > CLOSE_WATCH_MAX_AGE:
+                    closed.append(operation_id)
+            self.unwatch(closed)
+    
+    def handle(self, request):
+        request_id = request.get("id")
+        started = time.perf_counter()
+        try:
+            handler = self.handlers.get(request.get("command"))
+            if not handler:
+                result = {"success": False, "message": f"Comando desconocido: {request.get('command')}"}
+            else:
+                result = handler(request)
+        except Exception as e:
+            result = {"success": False, "message": f"Error: {str(e)}"}
+        
+        result = dict(result)
+        result["id"] = request_id
+        result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self.send(result)
+    
+    def _connected(self):
+        connect_result = self.bridge.ensure_connected()
+        return None if connect_result["success"] else connect_result
+    
+    def handle_balance(self, request):
+        error = self._connected()
+        if error:
+            return error
+        return {"success": True, "balance": self.bridge.api.get_balance()}
+    
+    def handle_buy(self, request):
+        error = self._connected()
+        if error:
+            return error
+        result = self.bridge.buy_option(request["asset"], float(request["amount"]),
+                                        request["direction"], int(request["duration"]))
+        if result.get("success"):
+            self.watch(result.get("operation_id"))
+        return result
+    
+    def handle_batch_buy(self, request):
+        error = self._connected()
+        if error:
+            return error
+        result = self.bridge.batch_buy(request["orders"])
+        for order in result.get("results", []):
+            if order.get("success"):
+                self.watch(order.get("operation_id"))
+        return result
+    
+    def handle_check(self, request):
+        error = self._connected()
+        if error:
+            return error
+        return self.bridge.check_result(request["operation_id"])
+    
+    def handle_check_batch(self, request):
+        error = self._connected()
+        if error:
+            return error
+        results = self.bridge.check_results(request["operation_ids"])
+        self.unwatch(results)
+        # Lista en lugar de dict: los ids numéricos no sobreviven como claves JSON
+        return {
+            "success": True,
+            "results": [{"operation_id": operation_id, **result} for operation_id, result in results.items()]
+        }
+
+class IQOptionBridgeClient:
+    """Cliente del daemon: lanza 'serve' una vez y envía peticiones en pipeline"""
+    
+    def __init__(self, python_executable=None, ready_timeout=60):
+        self.process = subprocess.Popen(
+            [python_executable or sys.executable, os.path.abspath(__file__), "serve"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            bufsize=1
+        )
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.pending_lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.ready = Future()
+        
+        # Eventos sin id del daemon (cierres de operaciones) y tracker de resultados conectado
+        self.event_listeners = []
+        self.tracker = None
+        
+        reader_thread = threading.Thread(target=self._read_responses, daemon=True)
+        reader_thread.start()
+        
+        self.connect_result = self.ready.result(timeout=ready_timeout)
+    
+    def _read_responses(self):
+        for line in self.process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            
+            if message.get("event") == "ready":
+                self.ready.set_result(message)
+                continue
+            
+            if message.get("event"):
+                for listener in list(self.event_listeners):
+                    try:
+                        listener(message)
+                    except Exception as e:
+                        logging.error(f"❌ Error en listener de eventos del bridge: {e}")
+                continue
+            
+            with self.pending_lock:
+                future = self.pending.pop(message.get("id"), None)
+            if future:
+                future.set_result(message)
+        
+        # El daemon terminó: liberar a quien esté esperando
+        error = {"success": False, "message": "Bridge finalizado"}
+        if not self.ready.done():
+            self.ready.set_result(error)
+        with self.pending_lock:
+            for future in self.pending.values():
+                future.set_result(error)
+            self.pending.clear()
+    
+    def request(self, command, **params):
+        """Enviar una petición sin esperar la respuesta (Future)"""
+        request_id = next(self.ids)
+        future = Future()
+        with self.pending_lock:
+            self.pending[request_id] = future
+        
+        line = json.dumps({"id": request_id, "command": command, **params}) + "\n"
+        with self.write_lock:
+            self.process.stdin.write(line)
+            self.process.stdin.flush()
+        return future
+    
+    def buy(self, asset, amount, direction, duration, timeout=30, execute_at=None):
+        """Comprar; con execute_at (epoch del broker) se envía antes según la latencia medida del bridge"""
+        latency_model = shared_latency_model()
+        if execute_at is not None:
+            latency_model.wait_for_fire(execute_at, IQ_BRIDGE)
+        
+        with latency_model.measure(IQ_BRIDGE):
+            response = self.request("buy", asset=asset, amount=amount, direction=direction, duration=duration).result(timeout)
+        
+        # Tiempo dentro del daemon = respuesta de IQ Option sin el salto por la pipe
+        if "elapsed_ms" in response:
+            metrics.record("broker_ack", response["elapsed_ms"] / 1000, channel=IQ_BRIDGE)
+        
+        if response.get("success"):
+            self._track(response["operation_id"], asset, amount, direction, duration)
+        return response
+    
+    def batch_buy(self, orders, timeout=30):
+        response = self.request("batch_buy", orders=orders).result(timeout)
+        for order, result in zip(orders, response.get("results", [])):
+            if result.get("success"):
+                self._track(result["operation_id"], order["asset"], order["amount"], order["direction"], order["duration"])
+        return response
+    
+    def add_event_listener(self, listener):
+        """listener(evento) para los mensajes sin id del daemon (p. ej. option_closed)"""
+        self.event_listeners.append(listener)
+    
+    def attach_tracker(self, tracker):
+        """Resolver las compras en el tracker con los eventos de cierre del broker; las que no
+        lleguen se consultan en lote con check_batch al vencer"""
+        self.tracker = tracker
+        if tracker.check_batch is None:
+            tracker.check_batch = self.check_batch
+        self.add_event_listener(self._on_event)
+    
+    def _on_event(self, event):
+        if event.get("event") == "option_closed" and self.tracker:
+            self.tracker.resolve(event["operation_id"], event["result"], event.get("profit"))
+    
+    def _track(self, operation_id, asset, amount, direction, duration):
+        # iqoptionapi expresa el vencimiento en minutos
+        if self.tracker:
+            self.tracker.track(operation_id, time.time() + int(duration) * 60,
+                               asset=asset, amount=amount, direction=direction)
+    
+    def check(self, operation_id, timeout=CHECK_TIMEOUT):
+        return self.request("check", operation_id=operation_id).result(timeout)
+    
+    def check_batch(self, operation_ids, timeout=30):
+        """{id: {result, profit}} de las operaciones ya cerradas (para ResultTracker)"""
+        response = self.request("check_batch", operation_ids=list(operation_ids)).result(timeout)
+        if not response.get("success"):
+            raise RuntimeError(response.get("message", "Error consultando resultados"))
+        return {item.pop("operation_id"): item for item in response["results"]}
+    
+    def close(self):
+        try:
+            self.request("shutdown")
+            self.process.stdin.close()
+            self.process.wait(timeout=10)
+        except Exception:
+            self.process.kill()
+
 def main():
     """Función principal para comunicación con Node.js"""
     if len(sys.argv) < 2:
@@ -159,7 +586,11 @@ def main():
     
     bridge = IQOptionBridge(email, password)
     
-    if command == "connect":
+    if command == "serve":
+        # Daemon: una sola sesión para todas las peticiones
+        IQOptionBridgeDaemon(bridge).serve()
+        
+    elif command == "connect":
         result = bridge.connect()
         print(json.dumps(result))
         
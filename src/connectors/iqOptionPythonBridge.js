@@ -1,24 +1,136 @@
 const { spawn } = require('child_process');
 const path = require('path');
+const readline = require('readline');
 const Logger = require('../utils/logger');
 
+// Tiempo máximo de espera por respuesta del daemon
+const REQUEST_TIMEOUT_MS = 60000;
+
+// check_result bloquea en el daemon hasta que vence la opción
+const CHECK_TIMEOUT_MS = 360000;
+
 class IQOptionPythonBridge {
   constructor() {
     this.logger = new Logger('IQOptionPythonBridge');
-    this.pythonScript = path.join(__dirname, '../../iq_option_stable_api.py');
+    this.pythonScript = path.join(__dirname, 'iqOptionPython.py');
     this.connected = false;
+
+    // Daemon 'serve': un solo proceso con la sesión abierta, JSON por línea en stdin/stdout
+    this.daemon = null;
+    this.ready = null;
+    this.pending = new Map();
+    this.nextId = 1;
+  }
+
+  startDaemon() {
+    if (this.ready) {
+      return this.ready;
+    }
+
+    this.logger.info('🐍 Iniciando daemon Python (serve)...');
+    const daemon = spawn('python', [this.pythonScript, 'serve']);
+    this.daemon = daemon;
+
+    this.ready = new Promise((resolve, reject) => {
+      const lines = readline.createInterface({ input: daemon.stdout });
+
+      lines.on('line', (line) => {
+        let message;
+        try {
+          message = JSON.parse(line);
+        } catch (error) {
+          // Salida suelta de la librería: no es parte del protocolo
+          this.logger.debug(`🐍 ${line}`);
+          return;
+        }
+
+        if (message.event === 'ready') {
+          resolve(message);
+          return;
+        }
+
+        const request = this.pending.get(message.id);
+        if (request) {
+          this.pending.delete(message.id);
+          clearTimeout(request.timer);
+          request.resolve(message);
+        }
+      });
+
+      daemon.stderr.on('data', (data) => {
+        this.logger.debug(`🐍 ${data.toString().trim()}`);
+      });
+
+      // EPIPE si el daemon murió: lo resuelve el evento exit, no debe tumbar el proceso
+      daemon.stdin.on('error', (error) => {
+        this.logger.warn(`⚠️ Escritura al daemon Python fallida: ${error.message}`);
+      });
+
+      daemon.on('error', (error) => {
+        this.logger.error(`❌ Error ejecutando Python: ${error.message}`);
+      });
+
+      daemon.on('exit', (code) => {
+        // Se relanza en la próxima petición; las que estaban en vuelo fallan ahora
+        if (this.daemon === daemon) {
+          this.daemon = null;
+          this.ready = null;
+          this.connected = false;
+        }
+        const error = new Error(`Daemon Python finalizado (código ${code})`);
+        for (const request of this.pending.values()) {
+          clearTimeout(request.timer);
+          request.reject(error);
+        }
+        this.pending.clear();
+        reject(error);
+      });
+    });
+
+    // Evitar rechazos sin manejar si nadie espera el arranque
+    this.ready.catch(() => {});
+    return this.ready;
+  }
+
+  async request(command, params = {}, timeout = REQUEST_TIMEOUT_MS) {
+    await this.startDaemon();
+
+    // El daemon pudo terminar entre el arranque y el envío
+    const daemon = this.daemon;
+    if (!daemon || !daemon.stdin.writable) {
+      throw new Error(`Daemon Python no disponible para '${command}'`);
+    }
+
+    const id = this.nextId++;
+    return new Promise((resolve, reject) => {
+      const timer = setTimeout(() => {
+        this.pending.delete(id);
+        reject(new Error(`Sin respuesta del daemon para '${command}' en ${timeout} ms`));
+      }, timeout);
+
+      this.pending.set(id, { resolve, reject, timer });
+      daemon.stdin.write(JSON.stringify({ id, command, ...params }) + '\n', (error) => {
+        if (error && this.pending.delete(id)) {
+          clearTimeout(timer);
+          reject(error);
+        }
+      });
+    });
   }
 
   async connect() {
     try {
       this.logger.info('🐍 Conectando a IQ Option via Python API...');
       
-      const result = await this.runPythonCommand(['connect']);
+      // El daemon se conecta al arrancar; si ya corría, revalidar la sesión
+      const result = this.daemon ? await this.request('connect') : await this.startDaemon();
       
       if (result.success) {
         this.connected = true;
         this.logger.info('✅ Conectado a IQ Option via Python API');
-        this.logger.info(`💰 Balance: $${result.balance}`);
+        if (result.balance !== undefined) {
+          this.logger.info(`💰 Balance: $${result.balance}`);
+        }
         return true;
       } else {
         this.logger.error(`❌ Error conectando: ${result.message}`);
@@ -39,13 +151,7 @@ class IQOptionPythonBridge {
 
       this.logger.info(`🚀 EJECUTANDO OPERACIÓN REAL VIA PYTHON: ${asset} ${direction} $${amount}`);
       
-      const result = await this.runPythonCommand([
-        'buy',
-        asset,
-        amount.toString(),
-        direction,
-        duration.toString()
-      ]);
+      const result = await this.request('buy', { asset, amount, direction, duration });
 
       if (result.success) {
         this.logger.info(`✅ OPERACIÓN CONFIRMADA: ID ${result.operation_id}`);
@@ -68,13 +174,12 @@ class IQOptionPythonBridge {
     try {
       this.logger.info(`Ejecutando trade: ${tradeData.asset} ${tradeData.direction} $${tradeData.amount}`);
       
-      const result = await this.runPythonCommand([
-        'buy',
-        tradeData.asset,
-        tradeData.amount.toString(),
-        tradeData.direction,
-        tradeData.duration.toString()
-      ]);
+      const result = await this.request('buy', {
+        asset: tradeData.asset,
+        amount: tradeData.amount,
+        direction: tradeData.direction,
+        duration: tradeData.duration
+      });
       
       if (result.success) {
         this.logger.info(`OPERACION EJECUTADA: ID ${result.id || result.trade_id}`);
@@ -115,7 +220,7 @@ class IQOptionPythonBridge {
     try {
       this.logger.info(`🔍 Verificando resultado de operación ${operationId}...`);
       
-      const result = await this.runPythonCommand(['check_result', operationId]);
+      const result = await this.request('check_result', { operation_id: operationId }, CHECK_TIMEOUT_MS);
       
       if (result.success) {
         this.logger.info(`✅ Resultado obtenido: ${result.result}`);
@@ -130,43 +235,6 @@ class IQOptionPythonBridge {
     }
   }
 
-  runPythonCommand(args) {
-    return new Promise((resolve, reject) => {
-      const python = spawn('python', [this.pythonScript, ...args]);
-      
-      let stdout = '';
-      let stderr = '';
-
-      python.stdout.on('data', (data) => {
-        stdout += data.toString();
-      });
-
-      python.stderr.on('data', (data) => {
-        stderr += data.toString();
-      });
-
-      python.on('close', (code) => {
-        if (code === 0) {
-          try {
-            const result = JSON.parse(stdout.trim());
-            resolve(result);
-          } catch (error) {
-            this.logger.error(`❌ Error parsing JSON: ${stdout}`);
-            reject(new Error(`Error parsing response: ${error.message}`));
-          }
-        } else {
-          this.logger.error(`❌ Python script error: ${stderr}`);
-          reject(new Error(`Python script failed with code ${code}: ${stderr}`));
-        }
-      });
-
-      python.on('error', (error) => {
-        this.logger.error(`❌ Error ejecutando Python: ${error.message}`);
-        reject(error);
-      });
-    });
-  }
-
   runPythonScript(scriptPath, args) {
     return new Promise((resolve, reject) => {
       const python = spawn('python', [scriptPath, ...args]);
@@ -274,6 +342,22 @@ class IQOptionPythonBridge {
   isConnectionActive() {
     return this.connected;
   }
+
+  async close() {
+    if (!this.daemon) {
+      return;
+    }
+
+    const daemon = this.daemon;
+    try {
+      await this.request('shutdown', {}, 5000);
+    } catch (error) {
+      this.logger.warn(`⚠️ Cerrando daemon Python a la fuerza: ${error.message}`);
+      daemon.kill();
+    }
+    daemon.stdin.end();
+    this.connected = false;
+  }
 }
 
 module.exports = IQOptionPythonBridge;
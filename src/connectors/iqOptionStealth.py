@@ -5,6 +5,7 @@ Usa técnicas stealth para evitar detección y ejecutar múltiples operaciones
 """
 
 import sys
+import os
 import json
 import time
 import logging
@@ -17,6 +18,11 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException
 
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.utils.precisionClock import clock
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
 
 class IQOptionStealthBot:
@@ -208,13 +214,11 @@ class IQOptionStealthBot:
             return {"higher": None, "lower": None}
     
     def wait_for_exact_second(self, target_second=0):
-        """Esperar hasta el segundo exacto"""
+        """Esperar hasta el segundo exacto (sleep grueso + spin calibrado, sin consultar datetime en bucle)"""
         try:
-            while True:
-                now = datetime.now()
-                if now.second == target_second:
-                    return True
-                time.sleep(0.001)  # Precisión de milisegundos
+            error = clock.wait_for_exact_second(target_second)
+            logging.info(f"⏱️ Segundo exacto alcanzado (error {error*1000:.3f}ms)")
+            return True
         except Exception as e:
             logging.error(f"❌ Error esperando segundo exacto: {e}")
             return False
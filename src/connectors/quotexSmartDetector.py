@@ -5,18 +5,100 @@ Busca pares con 90%+ de payout en 1 minuto
 """
 
 import sys
+import os
 import json
 import time
 import logging
 import re
+import threading
 from datetime import datetime, timedelta
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.analysis.payoutTracker import PayoutTracker
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
 
+# Monedas válidas para un par de divisas
+CURRENCIES = ['USD', 'EUR', 'GBP', 'JPY', 'AUD', 'CAD', 'CHF', 'NZD', 'BRL', 'MXN', 'ZAR']
+
+# Patrones compilados una sola vez (antes se recompilaban por elemento)
+PAYOUT_PATTERNS = [
+    re.compile(r'(\d{1,3})%'),
+    re.compile(r'(\d{1,3})\s*%'),
+    re.compile(r'(\d{1,3})\s*percent')
+]
+
+# Extracción de toda la página en un solo execute_script: [[par, payout, timeframe], ...]
+# Misma lógica que el recorrido anterior por elemento: par en el texto del elemento,
+# payout en el elemento, su padre o sus hermanos, y timeframe de 1 minuto en el abuelo
+PAIR_SCAN_JS = r"""
+var CURRENCIES = new Set(arguments[0]);
+var PAIR_PATTERN = /([A-Z]{3})\/?([A-Z]{3})/g;
+var PAYOUT_PATTERN = /(\d{1,3})\s*(?:%|percent)/g;
+var ONE_MINUTE_PATTERN = /\b(?:1m|1 min|60s)\b/;
+
+function payoutIn(text) {
+    if (!text) { return null; }
+    PAYOUT_PATTERN.lastIndex = 0;
+    var match;
+    while ((match = PAYOUT_PATTERN.exec(text)) !== null) {
+        var payout = parseInt(match[1], 10);
+        if (payout >= 50 && payout <= 100) { return payout; }
+    }
+    return null;
+}
+
+var rows = [];
+var elements = document.body.getElementsByTagName('*');
+for (var i = 0; i < elements.length; i++) {
+    var el = elements[i];
+    var raw = el.textContent;
+    if (!raw || raw.length > 300) { continue; }
+
+    // Filtro barato por textContent; innerText (texto visible, como element.text) solo en candidatos
+    PAIR_PATTERN.lastIndex = 0;
+    if (!PAIR_PATTERN.test(raw) || !el.getClientRects().length) { continue; }
+    var text = el.innerText.trim();
+    if (!text || text.length > 100) { continue; }
+
+    var pairs = [];
+    var match;
+    PAIR_PATTERN.lastIndex = 0;
+    while ((match = PAIR_PATTERN.exec(text)) !== null) {
+        if (CURRENCIES.has(match[1]) && CURRENCIES.has(match[2]) && match[1] !== match[2]) {
+            pairs.push(match[1] + match[2]);
+        }
+    }
+    if (!pairs.length) { continue; }
+
+    var parent = el.parentElement;
+    var payout = payoutIn(text);
+    if (payout === null && parent) { payout = payoutIn(parent.innerText); }
+    if (payout === null && parent) {
+        for (var j = 0; j < parent.children.length && payout === null; j++) {
+            payout = payoutIn(parent.children[j].innerText);
+        }
+    }
+    if (payout === null) { continue; }
+
+    // El timeframe solo cuenta si el abuelo es la fila del activo, no un contenedor de toda la lista
+    var grandparent = parent && parent.parentElement;
+    var context = grandparent ? grandparent.innerText : '';
+    var timeframe = context.length <= 300 && ONE_MINUTE_PATTERN.test(context) ? '1m' : null;
+
+    for (var k = 0; k < pairs.length; k++) {
+        rows.push([pairs[k], payout, timeframe]);
+    }
+}
+return rows;
+"""
+
 class QuotexSmartDetector:
     def __init__(self):
         self.driver = None
@@ -24,6 +106,13 @@ class QuotexSmartDetector:
         self.available_pairs = []
         self.high_payout_pairs = []
         
+        # Filas (par, payout, timeframe) del último escaneo de página
+        self.last_scan_rows = []
+        
+        # Tabla viva de payouts (refresco periódico en el scheduler) y acceso serializado al driver
+        self.payout_tracker = None
+        self.driver_lock = threading.Lock()
+        
     def setup_chrome(self):
         """Configurar Chrome"""
         try:
@@ -65,55 +154,33 @@ class QuotexSmartDetector:
             logging.error(f"❌ Error: {e}")
             return False
     
+    def extract_page_pairs(self):
+        """(par, payout, timeframe) de toda la página en un solo roundtrip"""
+        started = time.perf_counter()
+        with self.driver_lock:
+            rows = self.driver.execute_script(PAIR_SCAN_JS, CURRENCIES) or []
+        self.last_scan_rows = [tuple(row) for row in rows]
+        logging.info(f"⚡ Página escaneada en {(time.perf_counter() - started)*1000:.0f}ms ({len(rows)} coincidencias)")
+        return self.last_scan_rows
+    
     def scan_all_pairs(self):
         """Escanear TODOS los pares disponibles en Quotex"""
         try:
             logging.info("🔍 ESCANEANDO TODOS LOS PARES DISPONIBLES...")
             
-            # Buscar elementos que contengan información de pares y payouts
-            pair_elements = self.driver.find_elements(By.XPATH, "//*")
-            
             pairs_found = {}
             
-            for element in pair_elements:
-                try:
-                    text = element.text.strip()
-                    if not text or len(text) > 100:
-                        continue
-                    
-                    # Buscar patrones de pares de divisas
-                    pair_patterns = [
-                        r'([A-Z]{3})/([A-Z]{3})',  # EUR/USD
-                        r'([A-Z]{6})',             # EURUSD
-                        r'([A-Z]{3})([A-Z]{3})'    # EURUSD sin separador
-                    ]
-                    
-                    for pattern in pair_patterns:
-                        matches = re.findall(pattern, text)
-                        for match in matches:
-                            if isinstance(match, tuple):
-                                pair = ''.join(match)
-                            else:
-                                pair = match
-                            
-                            # Validar que sea un par de divisas real
-                            currencies = ['USD', 'EUR', 'GBP', 'JPY', 'AUD', 'CAD', 'CHF', 'NZD', 'BRL', 'MXN', 'ZAR']
-                            if len(pair) == 6:
-                                base = pair[:3]
-                                quote = pair[3:]
-                                if base in currencies and quote in currencies and base != quote:
-                                    # Buscar payout en el mismo elemento o elementos cercanos
-                                    payout = self.extract_payout_from_element(element)
-                                    if payout:
-                                        pairs_found[pair] = payout
-                                        logging.info(f"💱 {pair}: {payout}%")
-                
-                except Exception as e:
-                    continue
+            for pair, payout, timeframe in self.extract_page_pairs():
+                if pairs_found.get(pair) != payout:
+                    logging.info(f"💱 {pair}: {payout}%")
+                pairs_found[pair] = payout
             
             self.available_pairs = pairs_found
             logging.info(f"📊 Total pares encontrados: {len(pairs_found)}")
             
+            if self.payout_tracker:
+                self.payout_tracker.update_rows(self.last_scan_rows)
+            
             return pairs_found
             
         except Exception as e:
@@ -125,14 +192,10 @@ class QuotexSmartDetector:
         try:
             # Buscar porcentajes en el texto del elemento
             text = element.text
-            payout_patterns = [
-                r'(\d{1,3})%',
-                r'(\d{1,3})\s*%',
-                r'(\d{1,3})\s*percent'
-            ]
+            payout_patterns = PAYOUT_PATTERNS
             
             for pattern in payout_patterns:
-                matches = re.findall(pattern, text)
+                matches = pattern.findall(text)
                 for match in matches:
                     payout = int(match)
                     if 50 <= payout <= 100:  # Rango válido de payout
@@ -143,7 +206,7 @@ class QuotexSmartDetector:
                 parent = element.find_element(By.XPATH, "..")
                 parent_text = parent.text
                 for pattern in payout_patterns:
-                    matches = re.findall(pattern, parent_text)
+                    matches = pattern.findall(parent_text)
                     for match in matches:
                         payout = int(match)
                         if 50 <= payout <= 100:
@@ -157,7 +220,7 @@ class QuotexSmartDetector:
                 for sibling in siblings:
                     sibling_text = sibling.text
                     for pattern in payout_patterns:
-                        matches = re.findall(pattern, sibling_text)
+                        matches = pattern.findall(sibling_text)
                         for match in matches:
                             payout = int(match)
                             if 50 <= payout <= 100:
@@ -202,31 +265,15 @@ class QuotexSmartDetector:
         try:
             logging.info("⏰ ESCANEANDO PAYOUTS PARA 1 MINUTO...")
             
-            # Buscar elementos que indiquen timeframe de 1 minuto
-            timeframe_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), '1m') or contains(text(), '1 min') or contains(text(), '60s')]")
+            # Reusar las filas del escaneo de página (timeframe leído en el mismo roundtrip)
+            rows = self.last_scan_rows or self.extract_page_pairs()
             
             one_minute_pairs = {}
             
-            for element in timeframe_elements:
-                try:
-                    # Buscar pares cerca de este elemento de timeframe
-                    parent = element.find_element(By.XPATH, "../..")
-                    parent_text = parent.text
-                    
-                    # Extraer par y payout del contexto
-                    pair_match = re.search(r'([A-Z]{6})', parent_text)
-                    payout_match = re.search(r'(\d{1,3})%', parent_text)
-                    
-                    if pair_match and payout_match:
-                        pair = pair_match.group(1)
-                        payout = int(payout_match.group(1))
-                        
-                        if payout >= 90:
-                            one_minute_pairs[pair] = payout
-                            logging.info(f"⏰ 1min - {pair}: {payout}%")
-                
-                except:
-                    continue
+            for pair, payout, timeframe in rows:
+                if timeframe == '1m' and payout >= 90 and one_minute_pairs.get(pair) != payout:
+                    one_minute_pairs[pair] = payout
+                    logging.info(f"⏰ 1min - {pair}: {payout}%")
             
             return one_minute_pairs
             
@@ -287,8 +334,17 @@ class QuotexSmartDetector:
             logging.error(f"❌ Error obteniendo mejores pares: {e}")
             return {}
     
+    def track_payouts(self, tracker=None, interval=30):
+        """Mantener la tabla de payouts al día escaneando la página cada `interval` segundos"""
+        self.payout_tracker = tracker or self.payout_tracker or PayoutTracker()
+        self.payout_tracker.start_refresh(self.extract_page_pairs, interval)
+        logging.info(f"💹 Seguimiento de payouts cada {interval}s (payout mínimo {self.payout_tracker.min_payout*100:.0f}%)")
+        return self.payout_tracker
+    
     def close(self):
         """Cerrar navegador"""
+        if self.payout_tracker:
+            self.payout_tracker.stop_refresh()
         if self.driver:
             self.driver.quit()
 
@@ -322,6 +378,8 @@ def main():
         logging.info("💡 Comandos disponibles:")
         logging.info("   - 'scan' = Escanear de nuevo")
         logging.info("   - 'filter X' = Filtrar por payout X%")
+        logging.info("   - 'watch' = Seguir payouts y publicar el ranking por EV")
+        logging.info("   - 'ranking' = Ranking vigente de activos por EV")
         logging.info("   - 'q' = Salir")
         
         while True:
@@ -333,6 +391,14 @@ def main():
                     break
                 elif command == 'scan':
                     detector.get_best_pairs_for_trading(90)
+                elif command == 'watch':
+                    detector.track_payouts()
+                elif command == 'ranking':
+                    if detector.payout_tracker:
+                        for pair, payout, ev in detector.payout_tracker.ranking():
+                            logging.info(f"   🏆 {pair}: {payout*100:.0f}% (EV {ev:+.3f})")
+                    else:
+                        logging.info("❓ Primero 'watch'")
                 elif command.startswith('filter'):
                     try:
                         payout = int(command.split()[1])
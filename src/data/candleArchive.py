@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Candle Archive - Archivo columnar de velas en disco con memoria mapeada
+Un archivo por activo y campo (timestamp/open/high/low/close) más un índice
+temporal disperso; appends en caliente y lecturas por rango O(log n) que
+devuelven vistas NumPy sin copia
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+import numpy as np
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_ARCHIVE_DIR = os.path.join(ROOT_DIR, "data", "candles")
+
+COLUMNS = (
+    ("timestamp", np.int64),
+    ("open", np.float64),
+    ("high", np.float64),
+    ("low", np.float64),
+    ("close", np.float64)
+)
+
+# Una entrada del índice disperso cada INDEX_STRIDE velas (timestamp de la primera del bloque)
+INDEX_STRIDE = 1024
+INITIAL_CAPACITY = 4096
+
+
+class _AssetColumns:
+    """Columnas mapeadas de un activo; el contador en meta.json se publica después de los datos"""
+
+    def __init__(self, path, asset, readonly=False):
+        self.path = path
+        self.asset = asset
+        self.readonly = readonly
+        self.count = 0
+        self.capacity = 0
+        self.columns = {}
+        self.meta_version = None
+
+        if not readonly:
+            os.makedirs(path, exist_ok=True)
+
+        self.refresh()
+        if not self.columns:
+            self._map(max(self.capacity, INITIAL_CAPACITY))
+
+    def refresh(self):
+        """Releer el contador publicado (lectores en otros procesos)"""
+        meta_path = os.path.join(self.path, "meta.json")
+        try:
+            stat = os.stat(meta_path)
+        except FileNotFoundError:
+            return
+
+        # Cada publicación reemplaza el archivo: nuevo inodo aunque el mtime no cambie
+        version = (stat.st_ino, stat.st_mtime_ns)
+
+        if version != self.meta_version:
+            self.meta_version = version
+            with open(meta_path, "r") as f:
+                meta = json.load(f)
+            self.count = meta["count"]
+            if meta["capacity"] != self.capacity:
+                self._map(meta["capacity"])
+
+    def _map(self, capacity):
+        """Mapear (y en escritura, agrandar) los archivos de columna a la capacidad dada"""
+        mode = "r" if self.readonly else "r+"
+        columns = {}
+        for name, dtype in COLUMNS + (("index", np.int64),):
+            size = capacity if name != "index" else capacity // INDEX_STRIDE + 1
+            file_path = os.path.join(self.path, f"{name}.bin")
+
+            if not self.readonly:
+                with open(file_path, "ab") as f:
+                    if f.tell() < size * np.dtype(dtype).itemsize:
+                        f.truncate(size * np.dtype(dtype).itemsize)
+
+            columns[name] = np.memmap(file_path, dtype=dtype, mode=mode, shape=(size,))
+
+        # Las vistas entregadas antes siguen apuntando al mapeo anterior, que sigue siendo válido
+        self.columns = columns
+        self.capacity = capacity
+
+    def _publish(self):
+        """Escribir meta.json de forma atómica una vez que los datos ya están en las columnas"""
+        meta_path = os.path.join(self.path, "meta.json")
+        temp_path = f"{meta_path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"asset": self.asset, "count": self.count, "capacity": self.capacity}, f)
+        os.replace(temp_path, meta_path)
+
+    def append(self, timestamps, opens, highs, lows, closes):
+        """Agregar velas ordenadas; una vela con el timestamp de la última la reemplaza, las anteriores se ignoran"""
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        values = [np.asarray(column, dtype=np.float64) for column in (opens, highs, lows, closes)]
+
+        # Ordenar y quedarse con la última versión de cada timestamp
+        order = np.argsort(timestamps, kind="stable")
+        timestamps = timestamps[order]
+        keep = np.ones(len(timestamps), dtype=bool)
+        keep[:-1] = timestamps[1:] != timestamps[:-1]
+        timestamps = timestamps[keep]
+        values = [column[order][keep] for column in values]
+
+        if not len(timestamps):
+            return 0
+
+        ts_column = self.columns["timestamp"]
+        if self.count:
+            last = ts_column[self.count - 1]
+            if timestamps[-1] < last:
+                return 0
+
+            # Vela en formación: sobrescribir la última fila
+            if last in timestamps:
+                position = np.searchsorted(timestamps, last)
+                for (name, _), column in zip(COLUMNS[1:], values):
+                    self.columns[name][self.count - 1] = column[position]
+
+            newer = timestamps > last
+            timestamps = timestamps[newer]
+            values = [column[newer] for column in values]
+
+        added = len(timestamps)
+        if added:
+            start = self.count
+            end = start + added
+            if end > self.capacity:
+                capacity = self.capacity
+                while capacity < end:
+                    capacity *= 2
+                self._map(capacity)
+
+            self.columns["timestamp"][start:end] = timestamps
+            for (name, _), column in zip(COLUMNS[1:], values):
+                self.columns[name][start:end] = column
+
+            # Filas que abren un bloque del índice disperso
+            rows = np.arange(-start % INDEX_STRIDE, added, INDEX_STRIDE)
+            self.columns["index"][(start + rows) // INDEX_STRIDE] = timestamps[rows]
+
+            self.count = end
+
+        self._publish()
+        return added
+
+    def locate(self, timestamp):
+        """Primera fila con timestamp >= dado: búsqueda binaria en el índice y luego en un solo bloque"""
+        count = self.count
+        if not count:
+            return 0
+
+        blocks = self.columns["index"][:(count - 1) // INDEX_STRIDE + 1]
+        block = max(int(np.searchsorted(blocks, timestamp, side="right")) - 1, 0)
+        base = block * INDEX_STRIDE
+        chunk = self.columns["timestamp"][base:min(base + INDEX_STRIDE, count)]
+        return base + int(np.searchsorted(chunk, timestamp, side="left"))
+
+    def view(self, start_row, end_row):
+        """Vistas de las columnas entre dos filas"""
+        return {name: self.columns[name][start_row:end_row] for name, _ in COLUMNS}
+
+    def flush(self):
+        """Forzar la escritura a disco de las páginas modificadas"""
+        if not self.readonly:
+            for column in self.columns.values():
+                column.flush()
+
+
+class CandleArchive:
+    def __init__(self, root=DEFAULT_ARCHIVE_DIR, readonly=False):
+        self.root = root
+        self.readonly = readonly
+        self.stores = {}
+        self.lock = threading.Lock()
+
+        if not readonly:
+            os.makedirs(root, exist_ok=True)
+
+    def _directory(self, asset):
+        """Nombre de carpeta seguro para el activo ("UK BRENT" -> "UK_BRENT")"""
+        return os.path.join(self.root, re.sub(r"[^A-Za-z0-9_.-]", "_", str(asset)))
+
+    def _store(self, asset, create=False):
+        store = self.stores.get(asset)
+        if store is None:
+            path = self._directory(asset)
+            if not create and not os.path.exists(os.path.join(path, "meta.json")):
+                return None
+            store = self.stores[asset] = _AssetColumns(path, asset, self.readonly)
+        elif self.readonly:
+            store.refresh()
+        return store
+
+    def assets(self):
+        """Activos presentes en el archivo"""
+        assets = []
+        if not os.path.isdir(self.root):
+            return assets
+
+        for name in sorted(os.listdir(self.root)):
+            meta_path = os.path.join(self.root, name, "meta.json")
+            if os.path.exists(meta_path):
+                with open(meta_path, "r") as f:
+                    assets.append(json.load(f).get("asset", name))
+        return assets
+
+    def append(self, asset, timestamp, open_price, high, low, close):
+        """Agregar (o actualizar) una vela"""
+        return self.append_columns(asset, [timestamp], [open_price], [high], [low], [close])
+
+    def append_candles(self, asset, candles):
+        """Agregar velas en formato dict (get_historical_data, CandleBuilder)"""
+        candles = [c for c in candles if c.get("timestamp") is not None]
+        if not candles:
+            return 0
+
+        return self.append_columns(
+            asset,
+            [int(c["timestamp"]) for c in candles],
+            [c["open"] for c in candles],
+            [c.get("high", max(c["open"], c["close"])) for c in candles],
+            [c.get("low", min(c["open"], c["close"])) for c in candles],
+            [c["close"] for c in candles]
+        )
+
+    def append_columns(self, asset, timestamps, opens, highs, lows, closes):
+        """Agregar columnas de velas; devuelve cuántas filas nuevas se escribieron"""
+        if self.readonly:
+            raise ValueError("Archivo de velas abierto en modo solo lectura")
+
+        with self.lock:
+            return self._store(asset, create=True).append(timestamps, opens, highs, lows, closes)
+
+    def count(self, asset):
+        """Número de velas archivadas del activo"""
+        store = self._store(asset)
+        return store.count if store else 0
+
+    def range(self, asset, start=None, end=None):
+        """Vistas {campo: array} de las velas con start <= timestamp < end (sin copia)"""
+        store = self._store(asset)
+        if store is None:
+            return {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS}
+
+        start_row = store.locate(start) if start is not None else 0
+        end_row = store.locate(end) if end is not None else store.count
+        return store.view(start_row, max(start_row, end_row))
+
+    def last(self, asset, count):
+        """Vistas de las últimas `count` velas del activo"""
+        store = self._store(asset)
+        if store is None:
+            return {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS}
+
+        return store.view(max(store.count - count, 0), store.count)
+
+    def flush(self):
+        """Sincronizar todas las columnas con el disco"""
+        with self.lock:
+            for store in self.stores.values():
+                store.flush()
+
+    def close(self):
+        """Sincronizar y liberar los mapeos"""
+        try:
+            self.flush()
+        except Exception as e:
+            logging.error(f"❌ Error sincronizando archivo de velas: {e}")
+        self.stores = {}
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Candle Builder - Agregador incremental de ticks a velas OHLC
+Construye 5s/15s/1m/5m en una sola pasada por tick (O(1)) y emite
+cada vela cerrada exactamente en su límite de tiempo
+"""
+
+import time
+import logging
+
+from src.utils.latencyMetrics import metrics
+
+# Timeframes soportados en segundos
+TIMEFRAMES = {"5s": 5, "15s": 15, "1m": 60, "5m": 300}
+
+# Índices del estado de la vela en construcción
+_START, _OPEN, _HIGH, _LOW, _CLOSE, _TICKS = range(6)
+
+
+class CandleBuilder:
+    def __init__(self, timeframes=(5, 15, 60, 300), on_candle=None):
+        self.timeframes = tuple(sorted(timeframes))
+
+        # asset -> [vela_en_construcción por timeframe]
+        self.current = {}
+
+        # asset -> [inicio de la última vela emitida por timeframe]
+        self.closed_until = {}
+
+        # Callbacks que reciben cada vela cerrada
+        self.listeners = []
+        if on_candle:
+            self.listeners.append(on_candle)
+
+    def add_listener(self, callback):
+        """Registrar un consumidor de velas cerradas"""
+        self.listeners.append(callback)
+
+    def add_tick(self, asset, price, timestamp=None):
+        """Agregar un tick (timestamp epoch en segundos) y devolver las velas que cerró"""
+        if timestamp is None:
+            timestamp = time.time()
+
+        candles = self.current.get(asset)
+        if candles is None:
+            candles = self.current[asset] = [None] * len(self.timeframes)
+            self.closed_until[asset] = [None] * len(self.timeframes)
+        closed_until = self.closed_until[asset]
+
+        closed = []
+        for index, timeframe in enumerate(self.timeframes):
+            start = int(timestamp // timeframe) * timeframe
+            candle = candles[index]
+
+            if candle is not None and start == candle[_START]:
+                if price > candle[_HIGH]:
+                    candle[_HIGH] = price
+                elif price < candle[_LOW]:
+                    candle[_LOW] = price
+                candle[_CLOSE] = price
+                candle[_TICKS] += 1
+                continue
+
+            # Ticks atrasados de una vela ya cerrada se descartan
+            if candle is not None and start < candle[_START]:
+                continue
+            if candle is None and closed_until[index] is not None and start <= closed_until[index]:
+                continue
+
+            if candle is not None:
+                closed.append(self._emit(asset, timeframe, candle))
+                closed_until[index] = candle[_START]
+
+            candles[index] = [start, price, price, price, price, 1]
+
+        return closed
+
+    def flush(self, now=None, asset=None):
+        """Cerrar las velas cuyo periodo terminó aunque no haya llegado un tick nuevo"""
+        if now is None:
+            now = time.time()
+
+        closed = []
+        assets = [asset] if asset is not None else list(self.current.keys())
+        for name in assets:
+            candles = self.current.get(name)
+            if not candles:
+                continue
+
+            for index, timeframe in enumerate(self.timeframes):
+                candle = candles[index]
+                if candle is not None and candle[_START] + timeframe <= now:
+                    closed.append(self._emit(name, timeframe, candle))
+                    self.closed_until[name][index] = candle[_START]
+                    candles[index] = None
+
+        return closed
+
+    def discard(self, asset):
+        """Descartar las velas abiertas de un activo (p. ej. tras un corte, ya rellenado con históricas)"""
+        candles = self.current.get(asset)
+        if candles:
+            for index, candle in enumerate(candles):
+                if candle is not None:
+                    self.closed_until[asset][index] = candle[_START]
+                    candles[index] = None
+
+    def forming(self, asset, timeframe=60):
+        """Vela en construcción (aún abierta) para un activo y timeframe"""
+        candles = self.current.get(asset)
+        if not candles or timeframe not in self.timeframes:
+            return None
+
+        candle = candles[self.timeframes.index(timeframe)]
+        return self._as_dict(asset, timeframe, candle) if candle else None
+
+    def _emit(self, asset, timeframe, candle):
+        """Notificar una vela cerrada a los consumidores"""
+        closed = self._as_dict(asset, timeframe, candle)
+
+        # Retraso entre el límite teórico de la vela y su emisión (las reconstruidas desde históricos no cuentan)
+        lag = time.time() - (candle[_START] + timeframe)
+        if lag < timeframe:
+            metrics.record("candle_close", max(lag, 0.0), asset=asset, timeframe=timeframe)
+
+        for callback in self.listeners:
+            try:
+                callback(closed)
+            except Exception as e:
+                logging.error(f"❌ Error en consumidor de velas {asset}: {e}")
+        return closed
+
+    def _as_dict(self, asset, timeframe, candle):
+        """Formato de vela igual al de get_historical_data"""
+        return {
+            "asset": asset,
+            "timeframe": timeframe,
+            "timestamp": candle[_START],
+            "open": candle[_OPEN],
+            "high": candle[_HIGH],
+            "low": candle[_LOW],
+            "close": candle[_CLOSE],
+            "ticks": candle[_TICKS],
+            "direction": "UP" if candle[_CLOSE] > candle[_OPEN] else "DOWN"
+        }
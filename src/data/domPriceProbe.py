@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+DOM Price Probe - Lectura de precio del navegador en un solo roundtrip
+La lógica de búsqueda se instala una vez por página como window.__qxPrice():
+el primer llamado localiza los nodos candidatos (cerca del nombre del activo,
+clases de precio y, como último recurso, todas las hojas del DOM) y los
+guarda; los siguientes solo leen el texto de esos nodos. Si la página se
+recarga la función desaparece y se vuelve a instalar automáticamente.
+Para ventanas donde el navegador es la única fuente, un MutationObserver
+sobre el nodo de precio acumula cada cambio con su instante y DomTickFeed
+los recoge en lote (un roundtrip por intervalo)
+"""
+
+import time
+import logging
+
+# Se ejecuta una sola vez por documento; idempotente si ya está instalada
+PRICE_PROBE_JS = r"""
+(function () {
+    if (window.__qxPrice) { return; }
+
+    var PRICE_PATTERN = /\b\d{1,6}\.\d{2,6}\b/;
+    var UNWANTED = /pago|payout|profit|ganancia|%/i;
+    var PRICE_SELECTORS = '[class*="price"],[class*="rate"],[class*="quote"],[class*="value"],' +
+                          '[class*="amount"],[data-testid*="price"],[data-price],.current-price,.asset-price';
+    var MAX_NODES = 8;
+
+    // clave (activo|rango) -> {nodes, último precio, precio anterior distinto}
+    var cache = {};
+
+    function visible(el) {
+        return el.offsetWidth > 0 && el.offsetHeight > 0;
+    }
+
+    function parse(el, low, high) {
+        var text = el.textContent;
+        if (!text || text.length > 40 || UNWANTED.test(text)) { return null; }
+        var match = text.match(PRICE_PATTERN);
+        if (!match) { return null; }
+        var price = parseFloat(match[0]);
+        return price >= low && price <= high ? price : null;
+    }
+
+    function globalPrice(low, high) {
+        var sources = [
+            ['quotexData', window.quotexData && window.quotexData.currentPrice],
+            ['wsData', window.wsData && window.wsData.quotes && window.wsData.quotes.price],
+            ['quotexApp', window.quotexApp && window.quotexApp.currentPrice]
+        ];
+        for (var i = 0; i < sources.length; i++) {
+            var price = parseFloat(sources[i][1]);
+            if (price >= low && price <= high) { return {price: price, type: sources[i][0]}; }
+        }
+        return null;
+    }
+
+    function collect(nodes, seen, candidates, type, low, high) {
+        for (var i = 0; i < nodes.length && candidates.length < MAX_NODES; i++) {
+            var el = nodes[i];
+            if (seen.has(el) || el.childElementCount > 0) { continue; }
+            seen.add(el);
+            if (parse(el, low, high) !== null) { candidates.push({node: el, type: type}); }
+        }
+    }
+
+    function scan(hint, low, high) {
+        var candidates = [];
+        var seen = new Set();
+
+        // 1. Hojas dentro del contenedor del nombre del activo
+        if (hint) {
+            var walker = document.createTreeWalker(document.body, NodeFilter.SHOW_TEXT);
+            var containers = [];
+            while (walker.nextNode() && containers.length < 4) {
+                if (walker.currentNode.nodeValue.indexOf(hint) !== -1) {
+                    var container = walker.currentNode.parentElement.closest('div, section, article');
+                    if (container) { containers.push(container); }
+                }
+            }
+            for (var i = 0; i < containers.length; i++) {
+                collect(containers[i].querySelectorAll('*'), seen, candidates, 'near_asset', low, high);
+            }
+        }
+
+        // 2. Elementos con clases de precio
+        collect(document.querySelectorAll(PRICE_SELECTORS), seen, candidates, 'price_class', low, high);
+
+        // 3. Último recurso: cualquier hoja del documento
+        if (!candidates.length) {
+            collect(document.body.getElementsByTagName('*'), seen, candidates, 'leaf', low, high);
+        }
+        return candidates;
+    }
+
+    function pick(entry, low, high) {
+        // Primer nodo conectado con precio válido, preferentemente visible
+        var fallback = null;
+        for (var i = 0; i < entry.nodes.length; i++) {
+            var candidate = entry.nodes[i];
+            if (!candidate.node.isConnected) { continue; }
+            var price = parse(candidate.node, low, high);
+            if (price === null) { continue; }
+            if (visible(candidate.node)) { return {node: candidate.node, price: price, type: candidate.type, visible: true}; }
+            if (!fallback) { fallback = {node: candidate.node, price: price, type: candidate.type, visible: false}; }
+        }
+        return fallback;
+    }
+
+    function locate(key, hint, low, high) {
+        // Nodos guardados; si ya no sirven (re-render) se busca de nuevo una vez
+        var entry = cache[key];
+        var rescanned = false;
+        if (!entry) {
+            entry = cache[key] = {nodes: scan(hint, low, high), last: null, previous: null};
+            rescanned = true;
+        }
+
+        var found = pick(entry, low, high);
+        if (!found && !rescanned) {
+            entry.nodes = scan(hint, low, high);
+            rescanned = true;
+            found = pick(entry, low, high);
+        }
+        return {entry: entry, found: found, rescanned: rescanned};
+    }
+
+    window.__qxPrice = function (hint, low, high) {
+        var fromGlobal = globalPrice(low, high);
+        if (fromGlobal) {
+            return {price: fromGlobal.price, previous: null, source: 'global', type: fromGlobal.type,
+                    rescanned: false, ts: Date.now()};
+        }
+
+        var located = locate(hint + '|' + low + '|' + high, hint, low, high);
+        var entry = located.entry, found = located.found;
+        if (!found) {
+            return {price: null, source: null, nodes: 0, rescanned: located.rescanned, ts: Date.now()};
+        }
+
+        if (entry.last !== null && entry.last !== found.price) { entry.previous = entry.last; }
+        entry.last = found.price;
+        return {price: found.price, previous: entry.previous, source: 'dom', type: found.type, visible: found.visible,
+                nodes: entry.nodes.length, rescanned: located.rescanned, ts: Date.now()};
+    };
+
+    // Observadores por activo: cada cambio del nodo de precio se guarda con su instante (epoch ms)
+    var watchers = {};
+
+    function record(watcher) {
+        if (!watcher.node.isConnected) {
+            // El nodo se reemplazó: volver a localizarlo y observar el nuevo
+            watch(watcher.key, watcher.hint, watcher.low, watcher.high, watcher.capacity);
+            return;
+        }
+        var price = parse(watcher.node, watcher.low, watcher.high);
+        if (price === null || price === watcher.last) { return; }
+        watcher.last = price;
+        watcher.ticks.push([price, performance.timeOrigin + performance.now()]);
+        if (watcher.ticks.length > watcher.capacity) {
+            watcher.ticks.shift();
+            watcher.dropped++;
+        }
+    }
+
+    function watch(key, hint, low, high, capacity) {
+        var watcher = watchers[key];
+        if (watcher && watcher.node && watcher.node.isConnected) { return watcher; }
+        if (watcher && watcher.observer) { watcher.observer.disconnect(); }
+
+        var found = locate(key, hint, low, high).found;
+        if (!found) { return null; }
+
+        watcher = watchers[key] = watcher || {key: key, hint: hint, low: low, high: high,
+                                              ticks: [], dropped: 0, last: null};
+        watcher.capacity = capacity;
+        watcher.node = found.node;
+        watcher.observer = new MutationObserver(function () { record(watcher); });
+        // El texto puede cambiar en el nodo o reemplazarse el hijo: observar al padre
+        watcher.observer.observe(found.node.parentElement || found.node,
+                                 {characterData: true, childList: true, subtree: true});
+        record(watcher);
+        return watcher;
+    }
+
+    window.__qxDrainTicks = function (hint, low, high, capacity) {
+        var watcher = watch(hint + '|' + low + '|' + high, hint, low, high, capacity);
+        if (!watcher) { return {ticks: [], dropped: 0, watching: false}; }
+
+        var ticks = watcher.ticks, dropped = watcher.dropped;
+        watcher.ticks = [];
+        watcher.dropped = 0;
+        return {ticks: ticks, dropped: dropped, watching: true};
+    };
+})();
+"""
+
+# Llamado por lectura: false si la página se recargó y hay que reinstalar
+PRICE_PROBE_CALL_JS = "return window.__qxPrice ? window.__qxPrice(arguments[0], arguments[1], arguments[2]) : false;"
+TICK_DRAIN_CALL_JS = ("return window.__qxDrainTicks ? "
+                      "window.__qxDrainTicks(arguments[0], arguments[1], arguments[2], arguments[3]) : false;")
+
+# Ticks retenidos en la página entre dos vaciados
+DEFAULT_TICK_CAPACITY = 2048
+
+
+class DomPriceProbe:
+    def __init__(self):
+        self.installs = 0
+        self.reads = 0
+
+    def install(self, driver):
+        """Instalar window.__qxPrice en el documento actual"""
+        driver.execute_script(PRICE_PROBE_JS)
+        self.installs += 1
+
+    def read(self, driver, hint=None, low=0.0, high=1e9):
+        """{price, previous, source, type, ...} del activo o None; un solo execute_script por lectura"""
+        result = driver.execute_script(PRICE_PROBE_CALL_JS, hint, low, high)
+        if result is False:
+            self.install(driver)
+            result = driver.execute_script(PRICE_PROBE_CALL_JS, hint, low, high)
+
+        self.reads += 1
+        if not result or result.get("price") is None:
+            return None
+
+        if result.get("rescanned"):
+            logging.info(f"🔍 {hint}: nodos de precio localizados ({result.get('nodes', 0)}, {result.get('type')})")
+        return result
+
+
+class DomTickFeed:
+    def __init__(self, driver, asset, low=0.0, high=1e9, interval=1.0, capacity=DEFAULT_TICK_CAPACITY, probe=None):
+        self.driver = driver
+        self.asset = asset
+        self.low = low
+        self.high = high
+        self.interval = interval
+        self.capacity = capacity
+        self.probe = probe or DomPriceProbe()
+
+        self.last_drain = 0.0
+        self.watching = False
+        self.ticks_received = 0
+        self.ticks_dropped = 0
+
+    def drain(self, force=False):
+        """[(precio, timestamp epoch)] acumulados en la página desde el último vaciado
+
+        Un solo execute_script por lote y como mucho uno por intervalo; el primer
+        llamado instala el observador sobre el nodo de precio"""
+        now = time.monotonic()
+        if not force and now - self.last_drain < self.interval:
+            return []
+        self.last_drain = now
+
+        args = (self.asset, self.low, self.high, self.capacity)
+        result = self.driver.execute_script(TICK_DRAIN_CALL_JS, *args)
+        if result is False:
+            self.probe.install(self.driver)
+            result = self.driver.execute_script(TICK_DRAIN_CALL_JS, *args)
+
+        if not result:
+            return []
+
+        if result.get("watching") and not self.watching:
+            logging.info(f"👁️ {self.asset}: observando el nodo de precio en la página")
+        self.watching = bool(result.get("watching"))
+
+        if result.get("dropped"):
+            self.ticks_dropped += result["dropped"]
+            logging.warning(f"⚠️ {self.asset}: {result['dropped']} ticks descartados en la página (buffer lleno)")
+
+        ticks = [(price, timestamp_ms / 1000) for price, timestamp_ms in result.get("ticks", [])]
+        self.ticks_received += len(ticks)
+        return ticks
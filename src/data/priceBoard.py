@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Price Board - Pizarra de últimos precios en memoria compartida
+Un proceso feed escribe un slot (seq, precio, timestamp) por activo protegido
+con seqlock; cualquier número de procesos lectores lo consulta sin copias
+ni sockets
+"""
+
+import sys
+import os
+import time
+import logging
+import multiprocessing
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+DEFAULT_BOARD_NAME = "quotex_prices"
+DEFAULT_CAPACITY = 256
+
+# Encabezado: cantidad de activos registrados (se publica después del nombre del slot)
+HEADER_DTYPE = np.dtype([("magic", np.uint64), ("capacity", np.uint64), ("count", np.uint64)], align=True)
+SLOT_DTYPE = np.dtype([
+    ("seq", np.uint64),
+    ("price", np.float64),
+    ("timestamp", np.float64),
+    ("name", "S40")
+], align=True)
+BOARD_MAGIC = 0x5158505249434553  # "QXPRICES"
+
+
+class PriceBoard:
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+
+        self.header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)[0]
+        if owner:
+            self.header["magic"] = BOARD_MAGIC
+        elif self.header["magic"] != BOARD_MAGIC:
+            raise ValueError(f"La memoria compartida {shm.name} no es una pizarra de precios")
+
+        self.capacity = int(self.header["capacity"])
+        self.slots = np.ndarray((self.capacity,), dtype=SLOT_DTYPE, buffer=shm.buf, offset=HEADER_DTYPE.itemsize)
+
+        # Cache local asset -> índice de slot (se valida contra el nombre del slot en cada acceso)
+        self.index = {}
+
+    @classmethod
+    def create(cls, name=DEFAULT_BOARD_NAME, capacity=DEFAULT_CAPACITY):
+        """Crear la pizarra (proceso feed, único escritor)"""
+        size = HEADER_DTYPE.itemsize + SLOT_DTYPE.itemsize * capacity
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Resto de un feed anterior que no se cerró: reutilizar si alcanza
+            shm = shared_memory.SharedMemory(name=name)
+            if shm.size < size:
+                shm.close()
+                raise
+
+        shm.buf[:size] = bytes(size)
+        header = np.ndarray((1,), dtype=HEADER_DTYPE, buffer=shm.buf)[0]
+        header["capacity"] = capacity
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name=DEFAULT_BOARD_NAME):
+        """Conectarse a una pizarra existente (procesos lectores)"""
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:
+            # Python < 3.13: evitar que el resource tracker borre el segmento al salir el lector
+            # (los hijos de multiprocessing comparten el tracker del padre y no deben tocarlo)
+            shm = shared_memory.SharedMemory(name=name)
+            if multiprocessing.parent_process() is None:
+                resource_tracker.unregister(shm._name, "shared_memory")
+        return cls(shm, owner=False)
+
+    def _slot(self, asset, create=False):
+        """Índice del slot del activo; los lectores buscan en los slots publicados"""
+        encoded = str(asset).encode()[:SLOT_DTYPE["name"].itemsize]
+        slot = self.index.get(asset)
+        if slot is not None:
+            # Si el feed se reinició los slots se reasignan en otro orden: validar el nombre y buscar de nuevo
+            if self.slots[slot]["name"] == encoded:
+                return slot
+            del self.index[asset]
+
+        count = int(self.header["count"])
+        for position in range(count):
+            if self.slots[position]["name"] == encoded:
+                self.index[asset] = position
+                return position
+
+        if not create:
+            return None
+        if count >= self.capacity:
+            raise ValueError(f"Pizarra de precios llena ({self.capacity} activos)")
+
+        self.slots[count]["name"] = encoded
+        self.header["count"] = count + 1
+        self.index[asset] = count
+        return count
+
+    def publish(self, asset, price, timestamp=None):
+        """Escribir el último precio (solo el proceso feed): seq impar mientras se escribe"""
+        if timestamp is None:
+            timestamp = time.time()
+
+        slot = self.slots[self._slot(asset, create=True)]
+        seq = slot["seq"]
+        slot["seq"] = seq + 1
+        slot["price"] = price
+        slot["timestamp"] = timestamp
+        slot["seq"] = seq + 2
+
+    def read(self, asset, retries=100):
+        """Leer (precio, timestamp, seq) consistente o None si el activo no está publicado"""
+        position = self._slot(asset)
+        if position is None:
+            return None
+
+        slot = self.slots[position]
+        for _ in range(retries):
+            before = slot["seq"]
+            if before & 1:
+                continue
+            price = float(slot["price"])
+            timestamp = float(slot["timestamp"])
+            if slot["seq"] == before:
+                return (price, timestamp, int(before)) if before else None
+
+        return None
+
+    def latest_price(self, asset, max_age=None):
+        """Precio del activo si existe y (opcionalmente) no es más viejo que max_age segundos"""
+        entry = self.read(asset)
+        if not entry:
+            return None
+
+        price, timestamp, _ = entry
+        if max_age is not None and time.time() - timestamp > max_age:
+            return None
+        return price
+
+    def assets(self):
+        """Activos publicados en la pizarra"""
+        count = int(self.header["count"])
+        return [name.decode() for name in self.slots["name"][:count]]
+
+    def snapshot(self):
+        """{asset: (precio, timestamp)} de todos los activos publicados"""
+        snapshot = {}
+        for asset in self.assets():
+            entry = self.read(asset)
+            if entry:
+                snapshot[asset] = entry[:2]
+        return snapshot
+
+    def close(self):
+        """Soltar el mapeo; el dueño además elimina el segmento"""
+        self.header = None
+        self.slots = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def main():
+    """Proceso feed: publica los ticks del WebSocket de Quotex en la pizarra compartida"""
+    from src.api.quotexInternalAPI import QuotexInternalAPI
+
+    board_name = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_BOARD_NAME
+    board = PriceBoard.create(board_name)
+    api = QuotexInternalAPI()
+
+    try:
+        if not api.authenticate():
+            return
+
+        api.connect_websocket()
+        api.subscribe_assets(api.default_assets, lambda asset_id, price, message: board.publish(asset_id, price))
+        logging.info(f"📋 Pizarra de precios '{board_name}' publicando {len(api.default_assets)} activos")
+
+        while True:
+            time.sleep(30)
+            logging.info(f"📋 Pizarra: {board.snapshot()}")
+
+    except KeyboardInterrupt:
+        logging.info("🛑 Feed de precios detenido")
+    finally:
+        board.close()
+
+
+if __name__ == "__main__":
+    main()
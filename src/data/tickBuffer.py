@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tick Buffer - Buffer circular de ticks sobre arrays preasignados
+Precio (float64) y timestamp monotónico (int64 ns) con append O(1)
+y ventanas sin copia
+"""
+
+import time
+import numpy as np
+
+
+class TickRingBuffer:
+    def __init__(self, capacity=100):
+        if capacity <= 0:
+            raise ValueError("La capacidad debe ser positiva")
+
+        self.capacity = capacity
+
+        # Cada tick se escribe dos veces (posición y posición + capacidad) para que
+        # cualquier ventana de las últimas N muestras sea un slice contiguo
+        self._prices = np.zeros(capacity * 2, dtype=np.float64)
+        self._timestamps = np.zeros(capacity * 2, dtype=np.int64)
+        self._position = 0
+        self._count = 0
+
+        # Diferencia entre reloj de pared y monotónico para convertir timestamps
+        self.wall_offset_ns = time.time_ns() - time.monotonic_ns()
+
+    def append(self, price, timestamp_ns=None):
+        """Agregar un tick - O(1), sin asignar memoria"""
+        if timestamp_ns is None:
+            timestamp_ns = time.monotonic_ns()
+
+        position = self._position
+        self._prices[position] = self._prices[position + self.capacity] = price
+        self._timestamps[position] = self._timestamps[position + self.capacity] = timestamp_ns
+
+        self._position = position + 1 if position + 1 < self.capacity else 0
+        if self._count < self.capacity:
+            self._count += 1
+
+    def __len__(self):
+        return self._count
+
+    def clear(self):
+        """Vaciar el buffer sin liberar los arrays"""
+        self._position = 0
+        self._count = 0
+
+    def window(self, count=None):
+        """
+        Vistas (precios, timestamps) de los últimos `count` ticks en orden cronológico, sin copia
+        Las vistas son vivas: copiar si se necesitan después de nuevos ticks
+        """
+        if count is None or count > self._count:
+            count = self._count
+
+        end = self._position + self.capacity
+        return self._prices[end - count:end], self._timestamps[end - count:end]
+
+    def prices(self, count=None):
+        """Vista de los últimos `count` precios"""
+        return self.window(count)[0]
+
+    def timestamps(self, count=None):
+        """Vista de los últimos `count` timestamps monotónicos (ns)"""
+        return self.window(count)[1]
+
+    def last(self):
+        """Último tick como (precio, timestamp_ns) o None"""
+        if not self._count:
+            return None
+
+        index = self._position + self.capacity - 1
+        return float(self._prices[index]), int(self._timestamps[index])
+
+    def to_wall_time(self, timestamp_ns):
+        """Convertir un timestamp monotónico (ns) a segundos epoch"""
+        return (timestamp_ns + self.wall_offset_ns) / 1e9
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Tick Queue - Cola acotada que coalesce ticks por activo
+El hilo del WebSocket nunca se bloquea: un tick nuevo reemplaza al pendiente
+del mismo activo y, si la cola está llena, la política decide qué se descarta
+"""
+
+import time
+import threading
+from collections import OrderedDict
+
+# Políticas de backpressure cuando llega un activo nuevo con la cola llena
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+
+
+class CoalescingTickQueue:
+    def __init__(self, max_assets=256, policy=DROP_OLDEST):
+        if policy not in (DROP_OLDEST, DROP_NEWEST):
+            raise ValueError(f"Política de backpressure desconocida: {policy}")
+
+        self.max_assets = max_assets
+        self.policy = policy
+
+        # asset -> (asset, price, timestamp, data); como máximo un tick pendiente por activo
+        self.pending = OrderedDict()
+        self.condition = threading.Condition()
+        self.closed = False
+
+        self.enqueued = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.max_depth = 0
+
+    def put(self, asset, price, timestamp=None, data=None):
+        """Encolar el último tick de un activo sin bloquear; devuelve False si se descartó"""
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self.condition:
+            self.enqueued += 1
+
+            if asset in self.pending:
+                # Tick viejo reemplazado: el consumidor solo ve el precio más reciente
+                self.pending[asset] = (asset, price, timestamp, data)
+                self.coalesced += 1
+                return True
+
+            if len(self.pending) >= self.max_assets:
+                self.dropped += 1
+                if self.policy == DROP_NEWEST:
+                    return False
+                self.pending.popitem(last=False)
+
+            self.pending[asset] = (asset, price, timestamp, data)
+            if len(self.pending) > self.max_depth:
+                self.max_depth = len(self.pending)
+
+            self.condition.notify()
+            return True
+
+    def consumer(self, asset, price, data=None):
+        """Adaptador para usar la cola como consumidor de QuotexSubscriptionManager"""
+        self.put(asset, price, data=data)
+
+    def get(self, timeout=None):
+        """Sacar el tick pendiente más antiguo (None si vence el timeout o la cola se cerró)"""
+        with self.condition:
+            if not self.pending and not self.closed:
+                self.condition.wait(timeout)
+            if not self.pending:
+                return None
+
+            self.delivered += 1
+            return self.pending.popitem(last=False)[1]
+
+    def drain(self, timeout=None):
+        """Esperar al menos un tick y sacar todos los pendientes de una vez"""
+        with self.condition:
+            if not self.pending and not self.closed:
+                self.condition.wait(timeout)
+
+            ticks = list(self.pending.values())
+            self.pending.clear()
+            self.delivered += len(ticks)
+            return ticks
+
+    def close(self):
+        """Despertar a los consumidores bloqueados"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+    def __len__(self):
+        return len(self.pending)
+
+    def stats(self):
+        """Profundidad actual y contadores de la cola"""
+        with self.condition:
+            return {
+                "depth": len(self.pending),
+                "max_depth": self.max_depth,
+                "capacity": self.max_assets,
+                "policy": self.policy,
+                "enqueued": self.enqueued,
+                "coalesced": self.coalesced,
+                "dropped": self.dropped,
+                "delivered": self.delivered
+            }
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Latency Model - Tiempo de anticipación aprendido por canal de ejecución
+Mide cuánto tarda cada canal (click de Selenium, REST, pyquotex, bridge de
+IQ Option) desde la acción hasta que el broker la acepta, mantiene un
+percentil móvil por canal y dispara cada orden en deadline - latencia
+prevista para que llegue al segundo objetivo
+"""
+
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from src.utils.precisionClock import clock
+from src.utils.serverClock import server_clock
+from src.utils.latencyMetrics import metrics
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_LATENCY_PATH = os.path.join(ROOT_DIR, "data", "latency_model.json")
+
+# Canales de ejecución y latencia supuesta hasta tener muestras (segundos)
+SELENIUM_CLICK = "selenium_click"
+REST = "rest"
+PYQUOTEX = "pyquotex"
+IQ_BRIDGE = "iq_bridge"
+
+DEFAULT_LATENCIES = {
+    SELENIUM_CLICK: 0.15,
+    REST: 0.25,
+    PYQUOTEX: 0.25,
+    IQ_BRIDGE: 0.3
+}
+
+# Muestras mínimas antes de confiar en el percentil
+MIN_SAMPLES = 5
+
+
+class LatencyModel:
+    def __init__(self, path=DEFAULT_LATENCY_PATH, window=200, quantile=0.5, max_lead=2.0):
+        self.path = path
+        self.window = window
+        self.quantile = quantile
+        self.max_lead = max_lead
+
+        # canal -> últimas latencias medidas (segundos)
+        self.samples = {}
+        self.lock = threading.Lock()
+
+        self.load()
+
+    def load(self):
+        """Arrancar con las latencias medidas en sesiones anteriores"""
+        if not self.path or not os.path.exists(self.path):
+            return
+
+        try:
+            with open(self.path, "r") as f:
+                stored = json.load(f)
+            for channel, values in stored.items():
+                self.samples[channel] = deque(values[-self.window:], maxlen=self.window)
+            logging.info(f"⏱️ Modelo de latencia cargado: {', '.join(self.samples)}")
+        except Exception as e:
+            logging.warning(f"⚠️ No se pudo leer el modelo de latencia: {e}")
+
+    def save(self):
+        if not self.path:
+            return
+
+        with self.lock:
+            stored = {channel: list(values) for channel, values in self.samples.items()}
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(stored, f)
+        os.replace(temp_path, self.path)
+
+    def record(self, channel, seconds):
+        """Agregar una latencia medida del canal"""
+        with self.lock:
+            samples = self.samples.get(channel)
+            if samples is None:
+                samples = self.samples[channel] = deque(maxlen=self.window)
+            samples.append(seconds)
+        metrics.record("order_submit", seconds, channel=channel)
+
+    @contextmanager
+    def measure(self, channel):
+        """Medir la acción del bloque (click, POST, buy) como latencia del canal"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(channel, time.perf_counter() - start)
+
+    def predict(self, channel, quantile=None):
+        """Latencia prevista del canal: percentil móvil o el valor por defecto sin muestras suficientes"""
+        quantile = self.quantile if quantile is None else quantile
+        with self.lock:
+            samples = sorted(self.samples.get(channel, ()))
+
+        if len(samples) < MIN_SAMPLES:
+            return DEFAULT_LATENCIES.get(channel, 0.0)
+        return samples[min(len(samples) - 1, int(len(samples) * quantile))]
+
+    def fire_time(self, deadline, channel):
+        """Instante (mismo reloj que deadline) en que hay que actuar para llegar a tiempo"""
+        return deadline - min(self.predict(channel), self.max_lead)
+
+    def wait_for_fire(self, deadline, channel):
+        """Esperar (reloj del servidor) hasta el disparo del canal para el deadline dado"""
+        fire_at = self.fire_time(deadline, channel)
+        return clock.wait_until_time(server_clock.to_local(fire_at))
+
+    def stats(self):
+        """p50/p90/p99 por canal en milisegundos"""
+        with self.lock:
+            channels = {channel: sorted(values) for channel, values in self.samples.items()}
+
+        stats = {}
+        for channel, samples in channels.items():
+            if not samples:
+                continue
+            stats[channel] = {
+                "count": len(samples),
+                "p50_ms": samples[len(samples) // 2] * 1000,
+                "p90_ms": samples[min(len(samples) - 1, int(len(samples) * 0.9))] * 1000,
+                "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+                "lead_ms": min(self.predict(channel), self.max_lead) * 1000
+            }
+        return stats
+
+
+_shared_model = None
+_shared_lock = threading.Lock()
+
+
+def shared_latency_model():
+    """Modelo del proceso: todos los canales de ejecución aprenden en el mismo"""
+    global _shared_model
+    with _shared_lock:
+        if _shared_model is None:
+            _shared_model = LatencyModel()
+        return _shared_model
@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 """
 Quotex Multi Executor - Ejecuta múltiples operaciones simultáneas
-Lee señales del analizador y ejecuta en ventanas separadas
+Recibe señales del analizador por el bus y ejecuta en ventanas separadas
 """
 
 import sys
-import json
+import os
 import time
 import logging
 import threading
@@ -15,6 +15,15 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+# Agregar el directorio raíz al path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.execution.signalBus import SignalSubscriber
+from src.utils.precisionClock import clock
+from src.utils.serverClock import server_clock, server_datetime
+from src.execution.latencyModel import shared_latency_model, SELENIUM_CLICK
+from src.utils.latencyMetrics import metrics
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
 
 class QuotexMultiExecutor:
@@ -27,6 +36,13 @@ class QuotexMultiExecutor:
         # Activos OTC 24/7
         self.assets = ["MICROSOFT", "ADA", "USDINR", "USDEGP", "UK BRENT", "ETH"]
         
+        # Señales del analizador: llegan por el bus en cuanto se publican
+        self.signal_subscriber = SignalSubscriber()
+        self.signal_subscriber.start()
+        
+        # Latencia medida del click: cada orden se dispara antes para llegar al segundo 0
+        self.latency_model = shared_latency_model()
+        
     def setup_chrome_instance(self, asset_name):
         """Configurar una instancia de Chrome para un activo"""
         try:
@@ -231,11 +247,15 @@ class QuotexMultiExecutor:
             logging.error(f"❌ Error preparando ventanas: {e}")
             return False
     
-    def load_current_signals(self):
-        """Cargar señales actuales del archivo"""
+    def load_current_signals(self, signals=None):
+        """Señales actuales recibidas por el bus"""
         try:
-            with open("D:/iq_quot/signals/current_signals.json", "r") as f:
-                signals = json.load(f)
+            if signals is None:
+                signals = self.signal_subscriber.latest()
+            
+            if not signals:
+                logging.error("❌ No hay señales publicadas en el bus")
+                return {}
             
             logging.info(f"📊 Señales cargadas: {len(signals)}")
             for asset, signal in signals.items():
@@ -250,30 +270,37 @@ class QuotexMultiExecutor:
             
             return signals
             
-        except FileNotFoundError:
-            logging.error("❌ No se encontró archivo de señales")
-            return {}
         except Exception as e:
             logging.error(f"❌ Error cargando señales: {e}")
             return {}
     
     def wait_for_exact_second(self, target_second=0):
-        """Esperar hasta el segundo exacto"""
+        """Esperar hasta el segundo exacto (sleep grueso + spin calibrado, sin consultar datetime en bucle)"""
         try:
-            while True:
-                now = datetime.now()
-                if now.second == target_second:
-                    return True
-                time.sleep(0.001)
+            error = clock.wait_for_exact_second(target_second)
+            logging.info(f"⏱️ Segundo exacto alcanzado (error {error*1000:.3f}ms)")
+            return True
         except Exception as e:
             logging.error(f"❌ Error esperando segundo exacto: {e}")
             return False
     
-    def execute_simultaneous_trades(self):
+    def wait_and_execute(self):
+        """Ejecutar cada publicación del analizador en cuanto llega (sin consultar archivos)"""
+        logging.info("📡 Esperando señales del bus... (Ctrl+C para volver)")
+        version = self.signal_subscriber.version
+        try:
+            while True:
+                signals, version = self.signal_subscriber.wait_for_signals(version, timeout=1.0)
+                if signals:
+                    self.execute_simultaneous_trades(signals)
+        except KeyboardInterrupt:
+            logging.info("⏹️ Modo automático detenido")
+    
+    def execute_simultaneous_trades(self, signals=None):
         """Ejecutar todas las operaciones simultáneamente"""
         try:
             # Cargar señales actuales
-            signals = self.load_current_signals()
+            signals = self.load_current_signals(signals)
             
             if not signals:
                 logging.error("❌ No hay señales para ejecutar")
@@ -314,23 +341,28 @@ class QuotexMultiExecutor:
             
             logging.info("=" * 60)
             
-            # Esperar al próximo minuto exacto
-            now = datetime.now()
+            # Esperar al próximo minuto exacto (del broker)
+            now = server_datetime()
             next_minute = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
             wait_seconds = (next_minute - now).total_seconds()
             
             logging.info(f"⏰ EJECUTANDO EN {wait_seconds:.1f}s - {next_minute.strftime('%H:%M:%S')}")
-            time.sleep(wait_seconds - 0.5)  # -500ms para preparar
             
-            # Esperar segundo exacto
-            self.wait_for_exact_second(0)
+            # Despertar antes de la mayor anticipación posible; cada hilo espera su propio disparo
+            time.sleep(max(wait_seconds - self.latency_model.max_lead - 0.5, 0))
+            
+            deadline = next_minute.timestamp()
+            lead = self.latency_model.predict(SELENIUM_CLICK)
+            logging.info(f"⏱️ Anticipación del click: {lead*1000:.0f}ms")
             
             # EJECUTAR TODAS LAS OPERACIONES AL MISMO TIEMPO
             execute_time = datetime.now()
             
             def execute_trade(trade_data):
                 try:
-                    trade_data["button"].click()
+                    self.latency_model.wait_for_fire(deadline, SELENIUM_CLICK)
+                    with self.latency_model.measure(SELENIUM_CLICK):
+                        trade_data["button"].click()
                     logging.info(f"✅ {trade_data['asset']} {trade_data['action']} EJECUTADO")
                 except Exception as e:
                     logging.error(f"❌ Error {trade_data['asset']}: {e}")
@@ -349,6 +381,8 @@ class QuotexMultiExecutor:
             for thread in threads:
                 thread.join()
             
+            self.latency_model.save()
+            
             logging.info("🎉" * 20)
             logging.info(f"🎯 *** {len(prepared_trades)} OPERACIONES EJECUTADAS SIMULTÁNEAMENTE ***")
             logging.info(f"⏰ TIEMPO: {execute_time.strftime('%H:%M:%S.%f')[:-3]}")
@@ -363,6 +397,7 @@ class QuotexMultiExecutor:
     
     def close_all(self):
         """Cerrar todas las ventanas"""
+        self.signal_subscriber.close()
         for asset, driver in self.drivers.items():
             try:
                 driver.quit()
@@ -373,6 +408,7 @@ class QuotexMultiExecutor:
 def main():
     """Función principal"""
     executor = QuotexMultiExecutor()
+    metrics.start_exporter("multi_executor")
     
     try:
         # Configurar todas las ventanas
@@ -400,6 +436,8 @@ def main():
         logging.info("💡 Comandos disponibles:")
         logging.info("   - 'execute' = Ejecutar señales actuales")
         logging.info("   - 'reload' = Recargar señales")
+        logging.info("   - 'auto' = Ejecutar cada señal al publicarse")
+        logging.info("   - 'latency' = Latencia del bus, jitter de disparo, reloj del broker y etapas del pipeline")
         logging.info("   - 'q' = Salir")
         
         while True:
@@ -414,6 +452,15 @@ def main():
                 elif command == 'reload':
                     signals = executor.load_current_signals()
                     logging.info(f"🔄 {len(signals)} señales recargadas")
+                elif command == 'auto':
+                    executor.wait_and_execute()
+                elif command == 'latency':
+                    logging.info(f"⏱️ Bus de señales: {executor.signal_subscriber.latency_stats()}")
+                    logging.info(f"⏱️ Precisión de disparo: {clock.jitter_stats()}")
+                    logging.info(f"⏱️ Reloj del broker: {server_clock.stats()}")
+                    logging.info(f"⏱️ Latencia por canal: {executor.latency_model.stats()}")
+                    for stage, values in metrics.summary().items():
+                        logging.info(f"⏱️ {stage}: {values}")
                 else:
                     logging.info("❓ Comando no reconocido")
                     
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Result Tracker - Resolución concurrente de resultados de operaciones abiertas
+Un solo hilo agenda todas las operaciones por vencimiento, acepta eventos de
+cierre del broker (resolve) y, para las que no llegan, consulta en lote las
+que ya vencieron; los resultados salen por callback y por una cola
+"""
+
+import time
+import heapq
+import queue
+import logging
+import threading
+import itertools
+
+
+class ResultTracker:
+    def __init__(self, check_batch=None, on_result=None, poll_interval=2.0, settle_delay=1.0,
+                 max_batch=50, timeout=300):
+        # check_batch([ids]) -> {id: {"result": "win"|"loss"|"equal", "profit": float}} solo de las cerradas
+        self.check_batch = check_batch
+        self.on_result = on_result
+        self.poll_interval = poll_interval
+        self.settle_delay = settle_delay
+        self.max_batch = max_batch
+        self.timeout = timeout
+
+        # Montículo (momento de consulta, secuencia, id); las entradas resueltas se descartan al salir
+        self.heap = []
+        self.sequence = itertools.count()
+        self.open_operations = {}
+        self.condition = threading.Condition()
+        self.is_running = False
+        self.worker = None
+
+        self.results = queue.Queue()
+        self.resolved_by_event = 0
+        self.resolved_by_poll = 0
+        self.timed_out = 0
+        self.polls = 0
+
+    def start(self):
+        """Iniciar el hilo que consulta las operaciones vencidas"""
+        self.is_running = True
+        self.worker = threading.Thread(target=self._run, name="result-tracker", daemon=True)
+        self.worker.start()
+        return True
+
+    def track(self, operation_id, expires_at, **meta):
+        """Registrar una operación abierta que vence en expires_at (epoch)"""
+        with self.condition:
+            self.open_operations[operation_id] = {
+                "operation_id": operation_id,
+                "expires_at": expires_at,
+                **meta
+            }
+            self._schedule(operation_id, expires_at + self.settle_delay)
+
+    def _schedule(self, operation_id, due):
+        heapq.heappush(self.heap, (due, next(self.sequence), operation_id))
+        self.condition.notify()
+
+    def resolve(self, operation_id, result, profit=None, **extra):
+        """Evento de cierre del broker: resolver sin esperar a la próxima consulta"""
+        with self.condition:
+            operation = self.open_operations.pop(operation_id, None)
+        if operation is None:
+            return False
+
+        self.resolved_by_event += 1
+        self._emit(operation, {"result": result, "profit": profit, **extra})
+        return True
+
+    def _emit(self, operation, outcome):
+        record = dict(operation)
+        record.update(outcome)
+        record["resolved_at"] = time.time()
+
+        self.results.put(record)
+        if self.on_result:
+            try:
+                self.on_result(record)
+            except Exception as e:
+                logging.error(f"❌ Error en callback de resultado {operation['operation_id']}: {e}")
+
+    def _next_due_batch(self):
+        """Esperar al próximo vencimiento y sacar hasta max_batch operaciones vencidas"""
+        with self.condition:
+            while self.is_running:
+                # Descartar entradas de operaciones ya resueltas por evento
+                while self.heap and self.heap[0][2] not in self.open_operations:
+                    heapq.heappop(self.heap)
+
+                if self.heap and self.heap[0][0] <= time.time():
+                    break
+                self.condition.wait(self.heap[0][0] - time.time() if self.heap else None)
+
+            batch = []
+            now = time.time()
+            while self.heap and self.heap[0][0] <= now and len(batch) < self.max_batch:
+                _, _, operation_id = heapq.heappop(self.heap)
+                if operation_id in self.open_operations and operation_id not in batch:
+                    batch.append(operation_id)
+            return batch
+
+    def _run(self):
+        while self.is_running:
+            batch = self._next_due_batch()
+            if not batch:
+                continue
+
+            try:
+                self.polls += 1
+                resolved = self.check_batch(batch) if self.check_batch else {}
+            except Exception as e:
+                logging.error(f"❌ Error consultando {len(batch)} resultados: {e}")
+                resolved = {}
+
+            now = time.time()
+            for operation_id in batch:
+                outcome = resolved.get(operation_id)
+
+                with self.condition:
+                    operation = self.open_operations.get(operation_id)
+                    if operation is None:
+                        continue
+
+                    if outcome is None and now - operation["expires_at"] < self.timeout:
+                        # Aún sin cerrar: volver a consultar en el próximo lote
+                        self._schedule(operation_id, now + self.poll_interval)
+                        continue
+
+                    del self.open_operations[operation_id]
+
+                if outcome is None:
+                    self.timed_out += 1
+                    logging.warning(f"⚠️ Sin resultado para {operation_id} tras {self.timeout}s")
+                    outcome = {"result": "unknown", "profit": None}
+                else:
+                    self.resolved_by_poll += 1
+
+                self._emit(operation, outcome)
+
+    def pending(self):
+        """Operaciones abiertas sin resultado"""
+        with self.condition:
+            return len(self.open_operations)
+
+    def stats(self):
+        with self.condition:
+            return {
+                "open": len(self.open_operations),
+                "resolved_by_event": self.resolved_by_event,
+                "resolved_by_poll": self.resolved_by_poll,
+                "timed_out": self.timed_out,
+                "polls": self.polls
+            }
+
+    def stop(self):
+        with self.condition:
+            self.is_running = False
+            self.condition.notify_all()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Signal Bus - Canal de señales de baja latencia entre analizador y ejecutor
+Reemplaza signals/current_signals.json: el analizador publica por un socket
+local (Unix domain socket, o TCP loopback donde no existe AF_UNIX) y cada
+ejecutor conectado recibe la señal al instante, en un frame completo o nada
+"""
+
+import os
+import json
+import time
+import socket
+import struct
+import logging
+import tempfile
+import threading
+from collections import deque
+
+from src.utils.latencyMetrics import metrics
+
+DEFAULT_SOCKET_PATH = os.path.join(tempfile.gettempdir(), "quotex_signals.sock")
+DEFAULT_TCP_ADDRESS = ("127.0.0.1", 47651)
+
+# Encabezado de cada frame: longitud del payload, momento de publicación y vencimiento (time_ns, 0 = no vence)
+FRAME_HEADER = struct.Struct("!IQQ")
+
+# Un ejecutor que no acepta el frame en este tiempo se desconecta (no frena al analizador)
+SEND_TIMEOUT = 0.05
+
+
+def default_address():
+    """Unix domain socket si el sistema lo soporta (Linux/macOS), si no TCP loopback (Windows)"""
+    return DEFAULT_SOCKET_PATH if hasattr(socket, "AF_UNIX") else DEFAULT_TCP_ADDRESS
+
+
+def _create_socket(address):
+    if isinstance(address, str):
+        return socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return sock
+
+
+def _recv_exact(sock, size):
+    """Leer exactamente `size` bytes (None si el otro extremo cerró)"""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:], size - received)
+        if not count:
+            return None
+        received += count
+    return bytes(buffer)
+
+
+class SignalPublisher:
+    def __init__(self, address=None):
+        self.address = address or default_address()
+        self.server = None
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.is_running = False
+
+        # Último frame publicado: se entrega a quien se conecte después
+        self.last_frame = None
+        self.published = 0
+
+    def start(self):
+        """Abrir el socket y aceptar ejecutores en segundo plano"""
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+        self.server = _create_socket(self.address)
+        if not isinstance(self.address, str):
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind(self.address)
+        self.server.listen(16)
+        self.is_running = True
+
+        accept_thread = threading.Thread(target=self._accept_loop, daemon=True)
+        accept_thread.start()
+
+        logging.info(f"📡 Bus de señales escuchando en {self.address}")
+        return True
+
+    def _accept_loop(self):
+        while self.is_running:
+            try:
+                connection, _ = self.server.accept()
+            except OSError:
+                break
+
+            if not isinstance(self.address, str):
+                connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection.settimeout(SEND_TIMEOUT)
+
+            with self.lock:
+                # Un ejecutor que llega tarde recibe las señales vigentes (si aún no vencieron)
+                if self.last_frame and not self._expired(self.last_frame):
+                    try:
+                        connection.sendall(self.last_frame)
+                    except OSError:
+                        connection.close()
+                        continue
+                self.subscribers.append(connection)
+
+            logging.info(f"🔗 Ejecutor conectado al bus ({len(self.subscribers)} activos)")
+
+    @staticmethod
+    def _expired(frame):
+        expires_ns = FRAME_HEADER.unpack_from(frame)[2]
+        return bool(expires_ns) and time.time_ns() >= expires_ns
+
+    def publish(self, signals, expires_at=None):
+        """
+        Enviar el dict de señales a todos los ejecutores conectados; devuelve cuántos lo recibieron
+        expires_at (epoch local): a partir de ese instante los ejecutores descartan el frame
+        """
+        started = metrics.stamp()
+        payload = json.dumps(signals, default=str).encode()
+        expires_ns = int(expires_at * 1e9) if expires_at else 0
+        frame = FRAME_HEADER.pack(len(payload), time.time_ns(), expires_ns) + payload
+
+        delivered = 0
+        with self.lock:
+            self.last_frame = frame
+            self.published += 1
+
+            for connection in list(self.subscribers):
+                try:
+                    connection.sendall(frame)
+                    delivered += 1
+                except OSError as e:
+                    # Caído o lento (socket.timeout): se desconecta; al reconectar recibe el último frame
+                    if isinstance(e, socket.timeout):
+                        logging.warning("⚠️ Ejecutor lento desconectado del bus")
+                    self.subscribers.remove(connection)
+                    connection.close()
+
+        metrics.record_since("signal_publish", started)
+        return delivered
+
+    def close(self):
+        self.is_running = False
+        with self.lock:
+            for connection in self.subscribers:
+                connection.close()
+            self.subscribers = []
+
+        if self.server:
+            self.server.close()
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+class SignalSubscriber:
+    def __init__(self, address=None, on_signals=None, reconnect_delay=1.0):
+        self.address = address or default_address()
+        self.on_signals = on_signals
+        self.reconnect_delay = reconnect_delay
+        self.is_running = False
+        self.is_connected = False
+        self.sock = None
+
+        # Últimas señales recibidas y versión para detectar publicaciones nuevas
+        self.signals = {}
+        self.version = 0
+        self.condition = threading.Condition()
+
+        # Latencias publicación -> recepción (microsegundos)
+        self.latencies = deque(maxlen=1000)
+        self.expired_frames = 0
+
+    def start(self):
+        """Conectarse al bus y escuchar en segundo plano (reconecta si el analizador reinicia)"""
+        self.is_running = True
+        reader_thread = threading.Thread(target=self._run, daemon=True)
+        reader_thread.start()
+        return True
+
+    def _run(self):
+        while self.is_running:
+            try:
+                self.sock = _create_socket(self.address)
+                self.sock.connect(self.address)
+                self.is_connected = True
+                logging.info(f"🔗 Conectado al bus de señales {self.address}")
+                self._read_frames()
+            except OSError:
+                pass
+            finally:
+                self.is_connected = False
+                if self.sock:
+                    self.sock.close()
+
+            if self.is_running:
+                time.sleep(self.reconnect_delay)
+
+    def _read_frames(self):
+        while self.is_running:
+            header = _recv_exact(self.sock, FRAME_HEADER.size)
+            if header is None:
+                return
+
+            length, published_ns, expires_ns = FRAME_HEADER.unpack(header)
+            payload = _recv_exact(self.sock, length)
+            if payload is None:
+                return
+
+            received_ns = time.time_ns()
+            if expires_ns and received_ns >= expires_ns:
+                # Señales de un minuto que ya pasó (p. ej. el último frame al reconectar): no son nuevas
+                self.expired_frames += 1
+                logging.info("⏭️ Señales vencidas descartadas del bus")
+                continue
+
+            self.latencies.append((received_ns - published_ns) / 1000)
+            metrics.record("signal_delivery", (received_ns - published_ns) / 1e9)
+            signals = json.loads(payload)
+
+            with self.condition:
+                self.signals = signals
+                self.version += 1
+                self.condition.notify_all()
+
+            if self.on_signals:
+                try:
+                    self.on_signals(signals)
+                except Exception as e:
+                    logging.error(f"❌ Error procesando señales del bus: {e}")
+
+    def latest(self):
+        """Señales vigentes (las últimas publicadas)"""
+        with self.condition:
+            return dict(self.signals)
+
+    def wait_for_signals(self, since_version=None, timeout=None):
+        """Bloquear hasta que se publiquen señales nuevas; devuelve (señales, versión) o (None, versión)"""
+        with self.condition:
+            if since_version is None:
+                since_version = self.version
+            if not self.condition.wait_for(lambda: self.version != since_version, timeout):
+                return None, self.version
+            return dict(self.signals), self.version
+
+    def latency_stats(self):
+        """Latencia publicación -> recepción en microsegundos"""
+        samples = sorted(self.latencies)
+        if not samples:
+            return {"count": 0}
+
+        return {
+            "count": len(samples),
+            "p50_us": samples[len(samples) // 2],
+            "p99_us": samples[min(len(samples) - 1, int(len(samples) * 0.99))],
+            "max_us": samples[-1]
+        }
+
+    def close(self):
+        self.is_running = False
+        if self.sock:
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
@@ -355,6 +355,7 @@ class IQOptionAIScanner {
     
     // Cerrar conexiones
     await this.iqConnector.disconnect();
+    await this.pythonBridge.close();
     await this.dataManager.close();
     
     // Cerrar servidor web si existe
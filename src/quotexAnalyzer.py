@@ -18,6 +18,12 @@ import asyncio
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from src.api.quotexAPIClient import QuotexAPIClient
+from src.api.quotexInternalAPI import QuotexInternalAPI
+from src.data.tickQueue import CoalescingTickQueue
+from src.execution.resultTracker import ResultTracker
+from src.utils.timerScheduler import shared_scheduler
+from src.utils.serverClock import server_datetime
+from src.utils.latencyMetrics import metrics
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(message)s')
 
@@ -33,8 +39,10 @@ class QuotexAnalyzer:
             "min_confidence": 75,  # 75% confianza mínima (más alto que IQ Option)
             "max_simultaneous_operations": 2,  # Máximo 2 operaciones simultáneas
             "operation_duration": 60,  # 60 segundos
+            "payout": 0.8,  # 80% de pago en operaciones ganadas
             "enabled_assets": ["UK BRENT", "MICROSOFT", "ADA", "ETH"]
         }
+        self.max_confidence = 0.95  # Tope de confianza tras el boost de tendencia
         
         # Estado del sistema
         self.is_running = False
@@ -43,10 +51,53 @@ class QuotexAnalyzer:
         self.active_operations = {}
         self.scheduled_operations = {}
         
-        # Datos de análisis (como main.js)
+        # Ejecuciones programadas: scheduler compartido en lugar de un Timer por operación
+        self.scheduler = shared_scheduler()
+        
+        # Resultados: un solo hilo resuelve todas las operaciones abiertas al vencer
+        self.result_tracker = ResultTracker(
+            check_batch=self._check_operation_results,
+            on_result=self._on_operation_result,
+            timeout=60
+        )
+        
+        # Último precio real por activo (precio, timestamp) y registro reciente para resolver resultados
+        self.last_prices = {}
+        self.price_log = defaultdict(lambda: deque(maxlen=1000))
+        self.price_lock = threading.Lock()
+        
+        # Antigüedad máxima del último precio para usarlo como entrada (si no, se consulta al ejecutar)
+        self.entry_max_age = 1.0
+        
+        # Datos de análisis (como main.js): dirección y cierre de cada vela cerrada
         self.candle_history = defaultdict(lambda: deque(maxlen=100))
         self.price_history = defaultdict(lambda: deque(maxlen=50))
         
+        # Los precios alimentan el constructor de velas del cliente; la predicción se genera al cerrar cada vela
+        self.candle_timeframe = 60
+        self.quotex_client.candle_builder.add_listener(self.on_candle_closed)
+        
+        # Inicio de la última vela agregada al historial; las velas del stream y las del backfill
+        # tras un corte llegan desde hilos distintos
+        self.last_candle_at = {}
+        self.history_lock = threading.Lock()
+        
+        # Ticks del WebSocket: cola acotada que guarda solo el último tick por activo
+        self.tick_queue = CoalescingTickQueue(max_assets=64)
+        self.poll_interval = 10
+        
+        # Stream de QuotexInternalAPI conectado en initialize(); sin él se consultan precios cada poll_interval
+        self.use_stream = True
+        self.stream_api = None
+        
+        # IDs del stream (QuotexInternalAPI) -> nombres de activo del analizador
+        self.stream_assets = {
+            "UK_BRENT": "UK BRENT",
+            "MICROSOFT": "MICROSOFT",
+            "ADA": "ADA",
+            "ETH": "ETH"
+        }
+        
         # Patrones de análisis (mejorados para Quotex)
         self.patterns = {
             ("DOWN", "DOWN", "UP"): 0.78,
@@ -70,6 +121,9 @@ class QuotexAnalyzer:
             assets = self.quotex_client.get_assets_list()
             self.logger.info(f"📊 {len(assets)} activos disponibles")
             
+            if self.use_stream:
+                self.connect_stream()
+            
             self.logger.info('✅ Analyzer inicializado correctamente')
             return True
             
@@ -89,32 +143,69 @@ class QuotexAnalyzer:
         # Iniciar hilo de análisis
         analysis_thread = threading.Thread(target=self._analysis_loop, daemon=True)
         analysis_thread.start()
+        self.result_tracker.start()
         
         self.logger.info('✅ Análisis iniciado')
     
+    def connect_stream(self):
+        """Conectar el WebSocket de QuotexInternalAPI y recibir sus ticks por la cola (opcional)"""
+        stream_api = QuotexInternalAPI()
+        if not stream_api.authenticate() or not stream_api.connect_websocket(list(self.stream_assets.keys())):
+            self.logger.warning('⚠️ Stream de precios no disponible - consultando precios cada '
+                                f'{self.poll_interval}s')
+            return False
+        
+        self.stream_api = stream_api
+        self.attach_stream(stream_api)
+        self.logger.info('📡 Ticks del stream conectados al analizador')
+        return True
+    
+    def attach_stream(self, stream_api):
+        """Recibir ticks de un stream (QuotexInternalAPI) a través de la cola en lugar de consultar cada 10s"""
+        stream_api.add_backfill_listener(self.on_backfill)
+        return stream_api.subscribe_assets(list(self.stream_assets.keys()), self.feed_tick)
+    
+    def feed_tick(self, asset_id, price, message=None):
+        """Consumidor del hilo del WebSocket: solo encola, nunca bloquea"""
+        self.tick_queue.put(self.stream_assets.get(asset_id, asset_id), price, data=message)
+    
     def _analysis_loop(self):
         """Loop principal de análisis (como main.js)"""
         while self.is_running:
             try:
-                # Escanear todos los activos
-                for asset in self.trading_config["enabled_assets"]:
-                    self._analyze_asset(asset)
+                # Ticks frescos del stream; si no llega ninguno en el intervalo, consultar precios
+                ticks = self.tick_queue.drain(timeout=self.poll_interval)
+                
+                if ticks:
+                    enabled = self.trading_config["enabled_assets"]
+                    for asset, price, timestamp, data in ticks:
+                        if asset in enabled:
+                            self._analyze_asset(asset, price, timestamp)
+                else:
+                    # Escanear todos los activos
+                    for asset in self.trading_config["enabled_assets"]:
+                        self._analyze_asset(asset)
+                
+                # Cerrar las velas cuyo minuto terminó aunque no haya llegado un precio nuevo
+                self.quotex_client.candle_builder.flush()
                 
                 # Limpiar operaciones expiradas
                 self._clean_expired_operations()
                 
-                # Esperar antes del siguiente ciclo
-                time.sleep(10)  # Análisis cada 10 segundos
-                
             except Exception as e:
                 self.logger.error(f'❌ Error en loop de análisis: {e}')
                 time.sleep(5)
     
-    def _analyze_asset(self, asset):
-        """Analizar un activo específico (como main.js)"""
+    def _analyze_asset(self, asset, stream_price=None, timestamp=None):
+        """Actualizar el precio de un activo (como main.js); el análisis corre al cerrar cada vela"""
         try:
-            # Obtener datos de mercado - SOLO REALES
-            market_data = self.quotex_client.get_live_price(asset)
+            # Obtener datos de mercado - SOLO REALES (tick del stream o consulta directa)
+            if stream_price is not None:
+                # El tick entra a la vela de su instante de llegada; las velas cerradas disparan on_candle_closed
+                self.quotex_client.candle_builder.add_tick(asset, stream_price, timestamp)
+                market_data = {"price": stream_price}
+            else:
+                market_data = self.quotex_client.get_live_price(asset)
             
             if not market_data:
                 self.logger.warning(f"⚠️ {asset}: No se pudieron obtener datos REALES - SALTANDO")
@@ -125,22 +216,95 @@ class QuotexAnalyzer:
                 self.logger.warning(f"⚠️ {asset}: Datos simulados detectados - RECHAZANDO")
                 return
             
-            price = market_data["price"]
-            direction = market_data["direction"]
-            
-            # Actualizar historial
-            self.price_history[asset].append(price)
-            self.candle_history[asset].append(direction)
-            
-            # Generar predicción
-            prediction = self._generate_prediction(asset)
-            
-            if prediction:
-                self._handle_new_prediction(prediction)
+            # La dirección de la vela en formación no entra al historial: solo on_candle_closed lo actualiza
+            self._record_price(asset, market_data["price"], timestamp or time.time())
                 
         except Exception as e:
             self.logger.error(f'❌ Error analizando {asset}: {e}')
     
+    def _record_price(self, asset, price, timestamp):
+        with self.price_lock:
+            self.last_prices[asset] = (price, timestamp)
+            self.price_log[asset].append((timestamp, price))
+    
+    def _fetch_price(self, asset):
+        """Consultar el precio real en este momento y registrarlo; None si solo hay datos simulados"""
+        market_data = self.quotex_client.get_live_price(asset)
+        if not market_data or market_data.get("source") == "simulated":
+            return None
+        self._record_price(asset, market_data["price"], time.time())
+        return market_data["price"]
+    
+    def _entry_price(self, asset, executed_at):
+        """(precio, instante) de entrada: el último precio si es de este momento, si no uno consultado ahora"""
+        last = self.last_prices.get(asset)
+        if last and abs(executed_at - last[1]) <= self.entry_max_age:
+            return last
+        
+        price = self._fetch_price(asset)
+        return (price, time.time()) if price is not None else (None, None)
+    
+    def _price_at_or_after(self, asset, moment):
+        """Primer precio registrado en `moment` o después (None si aún no llegó)"""
+        with self.price_lock:
+            for timestamp, price in self.price_log[asset]:
+                if timestamp >= moment:
+                    return price
+        return None
+    
+    def on_candle_closed(self, candle):
+        """Vela de 1 minuto cerrada: actualizar historial y generar predicción"""
+        asset = candle["asset"]
+        if candle["timeframe"] != self.candle_timeframe or asset not in self.trading_config["enabled_assets"]:
+            return
+        
+        with self.history_lock:
+            # Una vela ya recuperada por el backfill no se repite
+            last = self.last_candle_at.get(asset)
+            if last is not None and candle["timestamp"] <= last:
+                return
+            self._append_candle(asset, candle["timestamp"], candle["close"], candle["direction"])
+        
+        with metrics.timer("pattern_eval", asset=asset):
+            prediction = self._generate_prediction(asset)
+        
+        if prediction:
+            self._handle_new_prediction(prediction)
+    
+    def on_backfill(self, asset_id, candles):
+        """Velas recuperadas tras un corte del stream: completar el historial en orden, sin predecir sobre el pasado"""
+        asset = self.stream_assets.get(asset_id, asset_id)
+        if asset not in self.trading_config["enabled_assets"]:
+            return
+        
+        now = time.time()
+        recovered = 0
+        with self.history_lock:
+            for candle in sorted(candles, key=lambda c: c.get("timestamp") or 0):
+                timestamp = candle.get("timestamp")
+                if timestamp is None or timestamp + self.candle_timeframe > now:
+                    continue  # La vela abierta al volver la cierra el constructor
+                
+                last = self.last_candle_at.get(asset)
+                if last is not None and timestamp < last:
+                    continue
+                if last is not None and timestamp == last and self.candle_history[asset]:
+                    # La vela abierta al caer se cerró con ticks incompletos: vale la del broker
+                    self.price_history[asset][-1] = candle["close"]
+                    self.candle_history[asset][-1] = candle["direction"]
+                    continue
+                
+                self._append_candle(asset, timestamp, candle["close"], candle["direction"])
+                recovered += 1
+        
+        if recovered:
+            self.logger.info(f'🩹 {asset}: {recovered} velas recuperadas del corte')
+    
+    def _append_candle(self, asset, timestamp, close, direction):
+        self.price_history[asset].append(close)
+        self.candle_history[asset].append(direction)
+        self.last_candle_at[asset] = timestamp
+    
     def _generate_prediction(self, asset):
         """Generar predicción basada en patrones (como main.js)"""
         try:
@@ -157,7 +321,7 @@ class QuotexAnalyzer:
             
             # Análisis adicional de tendencia
             trend_boost = self._analyze_trend(asset)
-            final_confidence = min(base_confidence + trend_boost, 0.95)
+            final_confidence = min(base_confidence + trend_boost, self.max_confidence)
             
             # Solo generar si supera umbral mínimo
             if final_confidence < (self.trading_config["min_confidence"] / 100):
@@ -240,19 +404,18 @@ class QuotexAnalyzer:
             if not self._should_execute_trade(prediction):
                 return
             
-            # Programar ejecución al próximo minuto exacto
-            now = datetime.now()
+            # Programar ejecución al próximo minuto exacto: la señal sale de la vela t que acaba
+            # de cerrar y la orden opera la vela t+2 (SIGNAL_HORIZON del minero y el backtester)
+            now = server_datetime()
             next_minute = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
-            delay = (next_minute - now).total_seconds()
             
             self.logger.info(f'⏰ PROGRAMANDO: {asset} {prediction["direction"]} para {next_minute.strftime("%H:%M:%S")}')
             
-            # Programar ejecución
-            timer = threading.Timer(delay, self._execute_operation, args=[prediction])
-            timer.start()
+            # Programar ejecución en el minuto del broker (un solo hilo de scheduler para todas las operaciones)
+            event = self.scheduler.call_at(next_minute, self._execute_operation, prediction)
             
-            # Guardar timer para poder cancelarlo
-            self.scheduled_operations[asset] = timer
+            # Guardar evento para poder cancelarlo
+            self.scheduled_operations[asset] = event
             
         except Exception as e:
             self.logger.error(f'❌ Error en auto trading: {e}')
@@ -287,6 +450,9 @@ class QuotexAnalyzer:
             
             # Simular ejecución (aquí integrarías con quotexDual.py)
             operation_id = f"{asset}_{int(time.time())}"
+            start_time = time.time()
+            expires_at = start_time + self.trading_config["operation_duration"]
+            entry_price, entry_time = self._entry_price(asset, start_time)
             
             # Registrar operación activa
             self.active_operations[operation_id] = {
@@ -294,7 +460,10 @@ class QuotexAnalyzer:
                 "direction": direction,
                 "amount": self.trading_config["amount"],
                 "confidence": prediction["confidence"],
-                "start_time": time.time(),
+                "start_time": start_time,
+                "expires_at": expires_at,
+                "entry_price": entry_price,
+                "entry_time": entry_time,
                 "prediction": prediction
             }
             
@@ -304,13 +473,13 @@ class QuotexAnalyzer:
             if asset in self.scheduled_operations:
                 del self.scheduled_operations[asset]
             
-            # Programar verificación del resultado
-            result_timer = threading.Timer(
-                self.trading_config["operation_duration"] + 5,
-                self._check_operation_result,
-                args=[operation_id]
+            # Resultado al vencimiento (sin un Timer por operación)
+            self.result_tracker.track(
+                operation_id,
+                expires_at,
+                asset=asset,
+                amount=self.trading_config["amount"]
             )
-            result_timer.start()
             
         except Exception as e:
             self.logger.error(f'❌ Error ejecutando operación: {e}')
@@ -318,27 +487,43 @@ class QuotexAnalyzer:
             if asset in self.scheduled_operations:
                 del self.scheduled_operations[asset]
     
-    def _check_operation_result(self, operation_id):
-        """Verificar resultado de operación (como main.js)"""
-        try:
-            if operation_id not in self.active_operations:
-                return
-            
-            operation = self.active_operations[operation_id]
-            
-            # Simular resultado (aquí obtendrías resultado real de Quotex)
-            import random
-            is_win = random.random() > 0.4  # 60% win rate simulado
-            profit = operation["amount"] * 0.8 if is_win else -operation["amount"]
-            
-            result_text = "GANADA" if is_win else "PERDIDA"
-            self.logger.info(f'📊 RESULTADO {operation_id}: {result_text} - ${profit:+.2f}')
-            
-            # Remover de operaciones activas
-            del self.active_operations[operation_id]
-            
-        except Exception as e:
-            self.logger.error(f'❌ Error verificando resultado {operation_id}: {e}')
+    def _check_operation_results(self, operation_ids):
+        """Resolver en lote las operaciones vencidas con el primer precio real en o tras el vencimiento"""
+        results = {}
+        for operation_id in operation_ids:
+            operation = self.active_operations.get(operation_id)
+            if not operation or operation["entry_price"] is None:
+                continue
+            
+            close_price = self._price_at_or_after(operation["asset"], operation["expires_at"])
+            if close_price is None and self.stream_api is None:
+                # Sin stream el próximo precio llegaría hasta poll_interval tarde: consultarlo ya
+                close_price = self._fetch_price(operation["asset"])
+            if close_price is None:
+                continue  # Aún no hay precio posterior al vencimiento
+            
+            entry_price = operation["entry_price"]
+            if close_price == entry_price:
+                results[operation_id] = {"result": "equal", "profit": 0.0}
+            elif (close_price > entry_price) == (operation["direction"] == "UP"):
+                results[operation_id] = {"result": "win", "profit": operation["amount"] * self.trading_config["payout"]}
+            else:
+                results[operation_id] = {"result": "loss", "profit": -operation["amount"]}
+        
+        return results
+    
+    def _on_operation_result(self, record):
+        """Resultado de operación (como main.js)"""
+        operation_id = record["operation_id"]
+        result_text = {"win": "GANADA", "loss": "PERDIDA", "equal": "EMPATE"}.get(record["result"], "SIN RESULTADO")
+        
+        if record["profit"] is None:
+            self.logger.warning(f'⚠️ RESULTADO {operation_id}: {result_text}')
+        else:
+            self.logger.info(f'📊 RESULTADO {operation_id}: {result_text} - ${record["profit"]:+.2f}')
+        
+        # Remover de operaciones activas
+        self.active_operations.pop(operation_id, None)
     
     def _clean_expired_operations(self):
         """Limpiar operaciones expiradas (como main.js)"""
@@ -357,10 +542,14 @@ class QuotexAnalyzer:
     def stop(self):
         """Detener analyzer"""
         self.is_running = False
+        self.tick_queue.close()
+        if self.stream_api and self.stream_api.subscriptions:
+            self.stream_api.subscriptions.stop()
+        self.result_tracker.stop()
         
         # Cancelar operaciones programadas
-        for timer in self.scheduled_operations.values():
-            timer.cancel()
+        for event in self.scheduled_operations.values():
+            event.cancel()
         self.scheduled_operations.clear()
         
         self.logger.info('🛑 Analyzer detenido')
@@ -372,12 +561,16 @@ class QuotexAnalyzer:
             "active_operations": len(self.active_operations),
             "scheduled_operations": len(self.scheduled_operations),
             "total_predictions": len(self.predictions),
-            "enabled_assets": self.trading_config["enabled_assets"]
+            "enabled_assets": self.trading_config["enabled_assets"],
+            "tick_queue": self.tick_queue.stats(),
+            "stream": self.stream_api.get_stream_metrics() if self.stream_api else {},
+            "results": self.result_tracker.stats()
         }
 
 def main():
     """Función principal"""
     analyzer = QuotexAnalyzer()
+    metrics.start_exporter("quotex_analyzer")
     
     try:
         # Inicializar
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Latency Metrics - Histogramas de latencia por etapa del pipeline
+Tick recibido -> vela cerrada -> evaluación de patrón -> señal publicada ->
+orden enviada -> ack del broker; cada etapa (y activo/canal) guarda un
+histograma logarítmico tipo HDR en microsegundos (~3% de precisión, memoria
+fija) y se exporta en formato de texto Prometheus a un archivo o por HTTP
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_METRICS_DIR = os.path.join(ROOT_DIR, "data", "metrics")
+DEFAULT_METRICS_PORT = 9464
+
+METRIC_NAME = "quotex_stage_latency_seconds"
+
+# 32 sub-buckets por potencia de dos: error relativo máximo 1/32
+SUB_BUCKET_BITS = 5
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+BUCKET_COUNT = 1024
+
+# Límites "le" exportados (segundos); el histograma interno es más fino
+EXPORT_BOUNDS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+EXPORT_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def _bucket_index(micros):
+    if micros < 2 * SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - SUB_BUCKET_BITS - 1
+    return min((shift + 1) * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS, BUCKET_COUNT - 1)
+
+
+def _bucket_upper(index):
+    """Valor máximo (microsegundos) que cae en el bucket"""
+    if index < 2 * SUB_BUCKETS:
+        return index
+    shift = index // SUB_BUCKETS - 1
+    return ((index % SUB_BUCKETS + SUB_BUCKETS + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def record(self, seconds):
+        micros = int(seconds * 1e6) if seconds > 0 else 0
+        self.counts[_bucket_index(micros)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, quantile):
+        """Valor (segundos) bajo el cual está la fracción `quantile` de las muestras"""
+        if not self.count:
+            return 0.0
+
+        target = max(1, int(round(self.count * quantile)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(_bucket_upper(index) / 1e6, self.max)
+        return self.max
+
+    def cumulative(self, bounds):
+        """Conteos acumulados en cada límite (para los buckets 'le' de Prometheus)"""
+        result = []
+        seen = 0
+        index = 0
+        for bound in bounds:
+            limit = bound * 1e6
+            while index < BUCKET_COUNT and _bucket_upper(index) <= limit:
+                seen += self.counts[index]
+                index += 1
+            result.append(seen)
+        return result
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + (list(extra.items()) if extra else [])
+    if not items:
+        return ""
+    escaped = ['{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"')) for key, value in items]
+    return "{" + ",".join(escaped) + "}"
+
+
+class LatencyMetrics:
+    def __init__(self):
+        # (etapa, etiquetas ordenadas) -> histograma
+        self.histograms = {}
+        self.lock = threading.Lock()
+        self.server = None
+        self.exporting = False
+
+    @staticmethod
+    def stamp():
+        """Marca monotónica barata (ns) para medir entre etapas"""
+        return time.perf_counter_ns()
+
+    def record(self, stage, seconds, **labels):
+        """Registrar una latencia de la etapa (etiquetas opcionales: asset, channel, timeframe...)"""
+        key = (stage, tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None)))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = LatencyHistogram()
+            histogram.record(seconds)
+
+    def record_since(self, stage, start_ns, **labels):
+        """Latencia desde una marca de stamp()"""
+        self.record(stage, (time.perf_counter_ns() - start_ns) / 1e9, **labels)
+
+    @contextmanager
+    def timer(self, stage, **labels):
+        """Medir el bloque como latencia de la etapa"""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record_since(stage, start, **labels)
+
+    def summary(self, stage=None):
+        """{etapa[etiquetas]: {count, p50_ms, p99_ms, max_ms}}"""
+        with self.lock:
+            items = [(key, histogram) for key, histogram in self.histograms.items()
+                     if stage is None or key[0] == stage]
+
+            summary = {}
+            for (name, labels), histogram in items:
+                label_text = ",".join(f"{key}={value}" for key, value in labels)
+                summary[f"{name}[{label_text}]" if label_text else name] = {
+                    "count": histogram.count,
+                    "p50_ms": histogram.percentile(0.5) * 1000,
+                    "p99_ms": histogram.percentile(0.99) * 1000,
+                    "max_ms": histogram.max * 1000
+                }
+            return summary
+
+    def render_prometheus(self):
+        """Texto de exposición Prometheus: histograma + cuantiles por etapa"""
+        lines = [
+            f"# HELP {METRIC_NAME} Latencia por etapa del pipeline de trading",
+            f"# TYPE {METRIC_NAME} histogram"
+        ]
+        quantile_lines = [
+            f"# HELP {METRIC_NAME}_quantile Cuantiles de latencia por etapa (histograma HDR)",
+            f"# TYPE {METRIC_NAME}_quantile gauge"
+        ]
+
+        with self.lock:
+            for (stage, labels), histogram in sorted(self.histograms.items()):
+                base = (("stage", stage),) + labels
+                for bound, count in zip(EXPORT_BOUNDS, histogram.cumulative(EXPORT_BOUNDS)):
+                    lines.append(f"{METRIC_NAME}_bucket{_format_labels(base, {'le': bound})} {count}")
+                lines.append(f"{METRIC_NAME}_bucket{_format_labels(base, {'le': '+Inf'})} {histogram.count}")
+                lines.append(f"{METRIC_NAME}_sum{_format_labels(base)} {histogram.total:.9f}")
+                lines.append(f"{METRIC_NAME}_count{_format_labels(base)} {histogram.count}")
+
+                for quantile in EXPORT_QUANTILES:
+                    quantile_lines.append(
+                        f"{METRIC_NAME}_quantile{_format_labels(base, {'quantile': quantile})} "
+                        f"{histogram.percentile(quantile):.9f}"
+                    )
+
+        return "\n".join(lines + quantile_lines) + "\n"
+
+    def write_textfile(self, path):
+        """Escribir el archivo .prom de forma atómica (textfile collector de node_exporter)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(temp_path, path)
+
+    def serve_http(self, port=DEFAULT_METRICS_PORT, host="127.0.0.1"):
+        """Endpoint local GET /metrics"""
+        metrics = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") not in ("", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server_thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        server_thread.start()
+        logging.info(f"📈 Métricas de latencia en http://{host}:{port}/metrics")
+        return self.server
+
+    def start_exporter(self, name, port=None, interval=15):
+        """Exportar periódicamente a data/metrics/<name>.prom y, si hay puerto (o QUOTEX_METRICS_PORT), por HTTP"""
+        port = port or int(os.environ.get("QUOTEX_METRICS_PORT", 0))
+        if port:
+            try:
+                self.serve_http(port)
+            except OSError as e:
+                logging.warning(f"⚠️ No se pudo abrir el puerto de métricas {port}: {e}")
+
+        if self.exporting:
+            return
+        self.exporting = True
+        path = os.path.join(DEFAULT_METRICS_DIR, f"{name}.prom")
+
+        def export_loop():
+            while self.exporting:
+                time.sleep(interval)
+                try:
+                    self.write_textfile(path)
+                except Exception as e:
+                    logging.error(f"❌ Error exportando métricas: {e}")
+
+        export_thread = threading.Thread(target=export_loop, name="metrics-export", daemon=True)
+        export_thread.start()
+
+    def stop(self):
+        self.exporting = False
+        if self.server:
+            self.server.shutdown()
+            self.server = None
+
+
+# Registro compartido por todas las etapas del proceso
+metrics = LatencyMetrics()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Precision Clock - Espera precisa hasta un instante (inicio de minuto, segundo exacto)
+Reloj monotónico de alta resolución: sleep grueso hasta cerca del objetivo y
+un spin corto calibrado con el exceso real del sleep del sistema; registra el
+error de disparo para reportar el jitter logrado
+"""
+
+import time
+import threading
+from collections import deque
+
+from src.utils.serverClock import server_clock
+
+# Límites de la ventana de spin (segundos)
+MIN_SPIN_WINDOW = 0.0005
+MAX_SPIN_WINDOW = 0.02
+
+# Esperas contra el reloj de pared: se relee cada tramo grueso y antes del margen final (segundos)
+WALL_RESYNC_INTERVAL = 1.0
+WALL_RESYNC_LEAD = 0.05
+
+
+class PrecisionClock:
+    def __init__(self, samples=1000):
+        # Exceso observado de time.sleep (cuánto se pasa el sistema al despertar)
+        self.oversleep = deque(maxlen=64)
+        self.errors = deque(maxlen=samples)
+        self.lock = threading.Lock()
+        self.spin_window = MAX_SPIN_WINDOW
+
+    @property
+    def wall_offset(self):
+        """Reloj de pared - perf_counter en este momento (NTP puede ajustar el de pared en cualquier instante)"""
+        return time.time() - time.perf_counter()
+
+    def calibrate(self, rounds=20):
+        """Medir el exceso del sleep de 1ms para fijar la ventana de spin"""
+        for _ in range(rounds):
+            start = time.perf_counter()
+            time.sleep(0.001)
+            self.oversleep.append(time.perf_counter() - start - 0.001)
+        self._update_spin_window()
+        return self.spin_window
+
+    def _update_spin_window(self):
+        # Percentil 95 del exceso reciente: un pico aislado del sistema no deja el spin inflado
+        samples = sorted(self.oversleep)
+        typical = samples[int(len(samples) * 0.95)] if samples else MAX_SPIN_WINDOW
+        self.spin_window = min(max(typical * 1.5, MIN_SPIN_WINDOW), MAX_SPIN_WINDOW)
+
+    def record_oversleep(self, oversleep):
+        """Registrar cuánto se pasó un sleep o wait con timeout (también los del scheduler)"""
+        self.oversleep.append(oversleep)
+        self._update_spin_window()
+
+    def sleep_until(self, deadline):
+        """Esperar hasta `deadline` (perf_counter); devuelve el error de disparo en segundos"""
+        if not self.oversleep:
+            self.calibrate()
+
+        # Sleep grueso hasta la ventana de spin
+        remaining = deadline - time.perf_counter()
+        while remaining > self.spin_window:
+            planned = remaining - self.spin_window
+            start = time.perf_counter()
+            time.sleep(planned)
+            now = time.perf_counter()
+            self.record_oversleep(now - start - planned)
+            remaining = deadline - now
+
+        # Spin final: sin sleep(0), que en hosts cargados cede el núcleo por milisegundos
+        while time.perf_counter() < deadline:
+            pass
+
+        error = time.perf_counter() - deadline
+        with self.lock:
+            self.errors.append(error)
+        return error
+
+    def sleep(self, seconds):
+        return self.sleep_until(time.perf_counter() + seconds)
+
+    def wait_until_time(self, timestamp):
+        """Esperar hasta un instante epoch (o datetime) del reloj de pared"""
+        if hasattr(timestamp, "timestamp"):
+            timestamp = timestamp.timestamp()
+
+        # Tramo grueso contra el reloj de pared; el offset se recalcula justo antes del tramo
+        # fino para que un ajuste durante una espera larga no desplace el disparo
+        remaining = timestamp - time.time()
+        while remaining > WALL_RESYNC_LEAD:
+            time.sleep(min(remaining - WALL_RESYNC_LEAD, WALL_RESYNC_INTERVAL))
+            remaining = timestamp - time.time()
+        return self.sleep_until(timestamp - self.wall_offset)
+
+    def wait_for_exact_second(self, target_second=0, now=None):
+        """Esperar al inicio del próximo segundo `target_second` del minuto según el reloj
+        del servidor (si ya estamos dentro de ese segundo, vuelve de inmediato)"""
+        now = server_clock.now() if now is None else now
+        whole = int(now)
+        delta = (target_second - whole % 60) % 60
+        if delta == 0:
+            return 0.0
+        return self.wait_until_time(server_clock.to_local(whole + delta))
+
+    def jitter_stats(self):
+        """Error de disparo logrado en milisegundos"""
+        with self.lock:
+            samples = sorted(self.errors)
+        if not samples:
+            return {"count": 0}
+
+        return {
+            "count": len(samples),
+            "p50_ms": samples[len(samples) // 2] * 1000,
+            "p99_ms": samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000,
+            "max_ms": samples[-1] * 1000,
+            "spin_window_ms": self.spin_window * 1000
+        }
+
+
+# Reloj compartido por todos los ejecutores del proceso
+clock = PrecisionClock()
+
+
+def wait_until_time(timestamp):
+    return clock.wait_until_time(timestamp)
+
+
+def wait_for_exact_second(target_second=0):
+    return clock.wait_for_exact_second(target_second)
+
+
+def jitter_stats():
+    return clock.jitter_stats()
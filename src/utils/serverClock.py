@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Server Clock - Estimación del reloj del broker (offset y deriva)
+El minuto en que entra una orden lo decide el reloj del servidor, no el local:
+se toman muestras de los encabezados Date de HTTP (ida y vuelta, filtro tipo
+NTP de mínimo retardo) y de los timestamps de los ticks del WebSocket (cota
+inferior de una sola vía) e intersectando los intervalos que admite cada una;
+server_now() aplica offset + deriva al reloj local
+"""
+
+import time
+import threading
+from datetime import datetime
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+# Ventana de muestras y resolución del encabezado Date (segundos enteros)
+DEFAULT_WINDOW = 300
+DATE_HEADER_RESOLUTION = 1.0
+
+# Solo las muestras más finas que esto entran en la estimación de deriva
+DRIFT_MAX_UNCERTAINTY = 0.05
+
+# Cotas de ticks que superan la mediana por más que esto son timestamps erróneos (segundos)
+TICK_OUTLIER_TOLERANCE = 2.0
+
+
+def _to_seconds(timestamp):
+    """Timestamps de ticks en segundos, milisegundos o microsegundos -> segundos epoch"""
+    timestamp = float(timestamp)
+    if timestamp > 1e14:
+        return timestamp / 1e6
+    if timestamp > 1e11:
+        return timestamp / 1e3
+    return timestamp
+
+
+class ServerClock:
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+
+        # Muestras de ida y vuelta: (hora local media, offset mínimo, offset máximo)
+        self.round_trip = deque(maxlen=512)
+
+        # Ticks: (hora local de recepción, servidor - recepción) = cota inferior del offset
+        self.tick_bounds = deque(maxlen=2048)
+
+        # Estimación vigente: offset en reference y deriva (s/s)
+        self.offset = 0.0
+        self.drift = 0.0
+        self.reference = time.time()
+        self.uncertainty = None
+
+    def observe_round_trip(self, server_time, sent_at, received_at, resolution=0.0):
+        """Muestra de ida y vuelta: el servidor marcó [server_time, server_time + resolution)
+        en algún momento entre el envío y la recepción"""
+        with self.lock:
+            self.round_trip.append((
+                (sent_at + received_at) / 2,
+                server_time - received_at,
+                server_time + resolution - sent_at
+            ))
+            self._update(received_at)
+
+    def observe_http(self, response, sent_at=None, received_at=None):
+        """Muestra desde el encabezado Date de una respuesta de requests"""
+        date_header = response.headers.get("Date")
+        if not date_header:
+            return False
+
+        try:
+            server_time = parsedate_to_datetime(date_header).timestamp()
+        except (TypeError, ValueError):
+            return False
+
+        received_at = received_at or time.time()
+        sent_at = sent_at or received_at - response.elapsed.total_seconds()
+
+        # El Date trunca al segundo: la hora real está en [date, date + 1)
+        self.observe_round_trip(server_time, sent_at, received_at, DATE_HEADER_RESOLUTION)
+        return True
+
+    def response_hook(self, response, *args, **kwargs):
+        """Hook de requests.Session: cada respuesta HTTP alimenta el reloj"""
+        self.observe_http(response)
+        return response
+
+    def observe_tick(self, server_timestamp, received_at=None):
+        """Timestamp del servidor en un tick del WebSocket (llega después de generarse)"""
+        if not server_timestamp:
+            return False
+
+        received_at = received_at or time.time()
+        with self.lock:
+            self.tick_bounds.append((received_at, _to_seconds(server_timestamp) - received_at))
+            self._update(received_at)
+        return True
+
+    def _update(self, now):
+        """Filtro: intersección de los intervalos de la ventana (Marzullo simplificado)"""
+        horizon = now - self.window
+        while self.round_trip and self.round_trip[0][0] < horizon:
+            self.round_trip.popleft()
+        while self.tick_bounds and self.tick_bounds[0][0] < horizon:
+            self.tick_bounds.popleft()
+
+        low, high = float("-inf"), float("inf")
+        if self.round_trip:
+            low = max(sample[1] for sample in self.round_trip)
+            high = min(sample[2] for sample in self.round_trip)
+
+            if low > high:
+                # Muestras incompatibles (salto de reloj): como NTP, quedarse con la de menor retardo
+                _, low, high = min(self.round_trip, key=lambda sample: sample[2] - sample[1])
+
+        if self.tick_bounds:
+            # El offset real nunca es menor que (servidor - recepción) de ningún tick válido;
+            # un timestamp futuro no puede correrlo: se descartan las cotas despegadas de la
+            # mediana y las que superan el máximo que admite HTTP
+            bounds = sorted(bound for _, bound in self.tick_bounds)
+            ceiling = min(bounds[len(bounds) // 2] + TICK_OUTLIER_TOLERANCE, high)
+            valid = [bound for bound in bounds if bound <= ceiling]
+            if valid:
+                low = max(low, valid[-1])
+
+        if low == float("-inf"):
+            return
+
+        if high == float("inf") or high < low:
+            # Solo cotas inferiores (ticks): la mejor estimación es la más ajustada
+            offset, uncertainty = low, None
+        else:
+            offset, uncertainty = (low + high) / 2, (high - low) / 2
+
+        self.drift = self._estimate_drift()
+        self.offset = offset
+        self.reference = now
+        self.uncertainty = uncertainty
+
+    def _estimate_drift(self):
+        """Pendiente del offset en la ventana, solo con muestras de resolución fina"""
+        points = [
+            (midpoint, (low + high) / 2)
+            for midpoint, low, high in self.round_trip
+            if (high - low) / 2 <= DRIFT_MAX_UNCERTAINTY
+        ]
+        if len(points) < 3:
+            return 0.0
+
+        mean_t = sum(p[0] for p in points) / len(points)
+        mean_o = sum(p[1] for p in points) / len(points)
+        variance = sum((p[0] - mean_t) ** 2 for p in points)
+        if not variance:
+            return 0.0
+        return sum((p[0] - mean_t) * (p[1] - mean_o) for p in points) / variance
+
+    def current_offset(self, now=None):
+        """Offset servidor - local en este instante (incluye la deriva)"""
+        now = time.time() if now is None else now
+        return self.offset + self.drift * (now - self.reference)
+
+    def now(self):
+        """Hora del servidor (epoch)"""
+        local = time.time()
+        return local + self.current_offset(local)
+
+    def to_local(self, server_timestamp):
+        """Instante del servidor -> instante equivalente del reloj local"""
+        return server_timestamp - self.current_offset(server_timestamp - self.offset)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "offset_ms": self.current_offset() * 1000,
+                "drift_ppm": self.drift * 1e6,
+                "uncertainty_ms": self.uncertainty * 1000 if self.uncertainty is not None else None,
+                "http_samples": len(self.round_trip),
+                "tick_samples": len(self.tick_bounds)
+            }
+
+
+# Reloj del servidor compartido por todos los schedulers del proceso
+server_clock = ServerClock()
+
+
+def server_now():
+    """Hora del broker en epoch"""
+    return server_clock.now()
+
+
+def server_datetime():
+    """Hora del broker como datetime local (reemplazo de datetime.now() para alinear minutos)"""
+    return datetime.fromtimestamp(server_clock.now())
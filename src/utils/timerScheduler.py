@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+"""
+Timer Scheduler - Un solo hilo para todos los eventos programados
+Montículo de vencimientos sobre perf_counter con cancelación; el hilo solo
+lleva el tiempo (con el spin final de precisionClock) y entrega cada callback a un pool acotado, así miles
+de operaciones pendientes no crean un hilo (ni un threading.Timer) cada una
+"""
+
+import time
+import heapq
+import logging
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from src.utils.precisionClock import clock
+from src.utils.serverClock import server_clock
+
+
+class ScheduledEvent:
+    """Evento pendiente; cancel() lo descarta si aún no se disparó"""
+
+    __slots__ = ("scheduler", "deadline", "callback", "args", "kwargs", "cancelled", "fired")
+
+    def __init__(self, scheduler, deadline, callback, args, kwargs):
+        self.scheduler = scheduler
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.cancelled = False
+        self.fired = False
+
+    def cancel(self):
+        """Cancelar el evento; devuelve False si ya se disparó"""
+        return self.scheduler.cancel(self)
+
+    def remaining(self):
+        """Segundos que faltan para el disparo"""
+        return self.deadline - time.perf_counter()
+
+
+class TimerScheduler:
+    def __init__(self, workers=8, name="timer-scheduler"):
+        self.name = name
+
+        # Montículo (vencimiento en perf_counter, secuencia, evento); los cancelados se descartan al salir
+        self.heap = []
+        self.sequence = itertools.count()
+        self.condition = threading.Condition()
+        self.is_running = False
+        self.thread = None
+
+        # Los callbacks corren fuera del hilo del reloj para no retrasar los siguientes
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self.cancelled_in_heap = 0
+        self.max_lateness = 0.0
+
+    def start(self):
+        with self.condition:
+            if self.is_running:
+                return True
+            self.is_running = True
+
+        self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+        return True
+
+    def call_later(self, delay, callback, *args, **kwargs):
+        """Programar callback dentro de `delay` segundos"""
+        return self._push(time.perf_counter() + max(delay, 0), callback, args, kwargs)
+
+    def call_at(self, timestamp, callback, *args, **kwargs):
+        """Programar callback en un instante epoch (o datetime) del reloj del servidor"""
+        if hasattr(timestamp, "timestamp"):
+            timestamp = timestamp.timestamp()
+        return self._push(server_clock.to_local(timestamp) - clock.wall_offset, callback, args, kwargs)
+
+    def _push(self, deadline, callback, args, kwargs):
+        if not self.is_running:
+            self.start()
+
+        event = ScheduledEvent(self, deadline, callback, args, kwargs)
+        with self.condition:
+            heapq.heappush(self.heap, (deadline, next(self.sequence), event))
+            self.scheduled += 1
+
+            # Despertar al hilo solo si el nuevo evento es el más próximo
+            if self.heap[0][2] is event:
+                self.condition.notify()
+        return event
+
+    def cancel(self, event):
+        with self.condition:
+            if event.fired or event.cancelled:
+                return False
+
+            event.cancelled = True
+            self.cancelled += 1
+            self.cancelled_in_heap += 1
+
+            # Compactar si el montículo acumula demasiados cancelados
+            if len(self.heap) > 64 and self.cancelled_in_heap > len(self.heap) // 2:
+                self.heap = [entry for entry in self.heap if not entry[2].cancelled]
+                heapq.heapify(self.heap)
+                self.cancelled_in_heap = 0
+            return True
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.is_running:
+                    while self.heap and self.heap[0][2].cancelled:
+                        heapq.heappop(self.heap)
+                        self.cancelled_in_heap -= 1
+
+                    if self.heap:
+                        deadline = self.heap[0][0]
+                        wait = deadline - time.perf_counter()
+                        if wait <= 0:
+                            break
+
+                        if wait > clock.spin_window:
+                            planned_wake = deadline - clock.spin_window
+                            if not self.condition.wait(planned_wake - time.perf_counter()):
+                                # Timeout: el exceso del wait calibra la ventana de spin
+                                clock.record_oversleep(time.perf_counter() - planned_wake)
+                        else:
+                            # Último tramo: spin preciso sin retener el lock
+                            self.condition.release()
+                            try:
+                                clock.sleep_until(deadline)
+                            finally:
+                                self.condition.acquire()
+                    else:
+                        self.condition.wait()
+
+                if not self.is_running:
+                    return
+
+                # Sacar todos los vencidos de una vez
+                now = time.perf_counter()
+                due = []
+                while self.heap and self.heap[0][0] <= now:
+                    event = heapq.heappop(self.heap)[2]
+                    if event.cancelled:
+                        self.cancelled_in_heap -= 1
+                    else:
+                        event.fired = True
+                        due.append(event)
+
+            for event in due:
+                lateness = now - event.deadline
+                if lateness > self.max_lateness:
+                    self.max_lateness = lateness
+                self.fired += 1
+
+                try:
+                    self.executor.submit(self._invoke, event)
+                except RuntimeError:
+                    # Pool cerrado (stop) mientras había eventos vencidos
+                    return
+
+    def _invoke(self, event):
+        try:
+            event.callback(*event.args, **event.kwargs)
+        except Exception as e:
+            logging.error(f"❌ Error en evento programado {getattr(event.callback, '__name__', event.callback)}: {e}")
+
+    def pending(self):
+        """Eventos pendientes (sin contar cancelados)"""
+        with self.condition:
+            return len(self.heap) - self.cancelled_in_heap
+
+    def stats(self):
+        with self.condition:
+            return {
+                "pending": len(self.heap) - self.cancelled_in_heap,
+                "scheduled": self.scheduled,
+                "fired": self.fired,
+                "cancelled": self.cancelled,
+                "max_lateness_ms": self.max_lateness * 1000
+            }
+
+    def stop(self, wait=False):
+        """Detener el reloj; los eventos pendientes no se disparan"""
+        with self.condition:
+            self.is_running = False
+            self.condition.notify_all()
+        self.executor.shutdown(wait=wait)
+
+
+_shared_scheduler = None
+_shared_lock = threading.Lock()
+
+
+def shared_scheduler():
+    """Scheduler del proceso: todos los módulos comparten un único hilo de temporización"""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = TimerScheduler()
+            _shared_scheduler.start()
+        return _shared_scheduler